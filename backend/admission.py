@@ -0,0 +1,131 @@
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+# Admission control for the heavy analytic endpoints. Requests past the
+# concurrency limit wait briefly in a bounded queue instead of failing, and
+# each one reserves an estimated amount of memory so a burst of dashboard
+# loads cannot push the worker past its budget. Requests that cannot be
+# admitted in time are shed with a 503 and a Retry-After hint.
+ANALYTICS_MAX_CONCURRENT = int(os.getenv('ANALYTICS_MAX_CONCURRENT', '1'))
+ANALYTICS_MAX_WAITING = int(os.getenv('ANALYTICS_MAX_WAITING', '8'))
+ANALYTICS_WAIT_TIMEOUT = float(os.getenv('ANALYTICS_WAIT_TIMEOUT', '10'))
+MEMORY_LIMIT_MB = int(os.getenv('MEMORY_LIMIT_MB', '512'))
+
+
+class AdmissionRejected(Exception):
+    """The request was shed rather than admitted"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Server is busy ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _rss_mb():
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+class AdmissionController:
+    """Bounded concurrency, a bounded wait queue and a memory budget"""
+
+    def __init__(self, name, max_concurrent, max_waiting, wait_timeout, memory_limit_mb):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._reserved_mb = 0.0
+        self._counters = {
+            'admitted': 0,
+            'admitted_after_wait': 0,
+            'shed_queue_full': 0,
+            'shed_timeout': 0,
+            'shed_memory': 0,
+            'peak_waiting': 0,
+            'total_wait_seconds': 0.0,
+        }
+
+    def _fits(self, cost_mb):
+        """Whether the current RSS plus in-flight reservations leave room for cost_mb"""
+        return _rss_mb() + self._reserved_mb + cost_mb <= self.memory_limit_mb
+
+    def _can_start(self, cost_mb):
+        return self._in_flight < self.max_concurrent and self._fits(cost_mb)
+
+    def _shed(self, reason, counter):
+        self._counters[counter] += 1
+        print(f"Admission ({self.name}): shed request, {reason}")
+        raise AdmissionRejected(reason, retry_after=max(1, int(self.wait_timeout)))
+
+    def acquire(self, cost_mb):
+        with self._condition:
+            if not self._can_start(cost_mb):
+                if self._waiting >= self.max_waiting:
+                    self._shed('wait queue is full', 'shed_queue_full')
+                if self._in_flight == 0:
+                    # Nothing running will free memory for us: collect once, and
+                    # shed the request if that does not make room
+                    gc.collect()
+                    if not self._fits(cost_mb):
+                        self._shed('memory budget exhausted', 'shed_memory')
+
+                self._waiting += 1
+                self._counters['peak_waiting'] = max(self._counters['peak_waiting'], self._waiting)
+                start = time.monotonic()
+                try:
+                    admitted = self._condition.wait_for(lambda: self._can_start(cost_mb), self.wait_timeout)
+                finally:
+                    self._waiting -= 1
+                    self._counters['total_wait_seconds'] += time.monotonic() - start
+                if not admitted:
+                    self._shed('timed out waiting for a slot', 'shed_timeout')
+                self._counters['admitted_after_wait'] += 1
+
+            self._in_flight += 1
+            self._reserved_mb += cost_mb
+            self._counters['admitted'] += 1
+
+    def release(self, cost_mb):
+        with self._condition:
+            self._in_flight -= 1
+            self._reserved_mb -= cost_mb
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, cost_mb):
+        """Hold a slot and a memory reservation for the duration of the block"""
+        self.acquire(cost_mb)
+        try:
+            yield
+        finally:
+            self.release(cost_mb)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'name': self.name,
+                'max_concurrent': self.max_concurrent,
+                'max_waiting': self.max_waiting,
+                'wait_timeout': self.wait_timeout,
+                'memory_limit_mb': self.memory_limit_mb,
+                'rss_mb': round(_rss_mb(), 1),
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'reserved_mb': round(self._reserved_mb, 1),
+                **{key: round(value, 3) if isinstance(value, float) else value
+                   for key, value in self._counters.items()},
+            }
+
+
+analytics = AdmissionController(
+    'analytics', ANALYTICS_MAX_CONCURRENT, ANALYTICS_MAX_WAITING,
+    ANALYTICS_WAIT_TIMEOUT, MEMORY_LIMIT_MB
+)
@@ -0,0 +1,78 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+# Final chat answers, keyed by the normalised question, the data version
+# and today's date, so a repeat question is answered without running the
+# agent. Ingest and offcut updates bump the data version, which retires
+# every answer computed from older data; the date retires answers to
+# relative questions ("last month") at midnight. Entries also expire
+# after a TTL and the least recently used are evicted past the size cap.
+CHAT_CACHE_SIZE = int(os.getenv('CHAT_CACHE_SIZE', '256'))
+CHAT_CACHE_TTL_SECONDS = int(os.getenv('CHAT_CACHE_TTL_SECONDS', '3600'))
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.]+$')
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (stored_at, answer)
+_stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+
+
+def normalise_question(question):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    question = _WHITESPACE.sub(' ', question.strip().lower())
+    return _TRAILING_PUNCTUATION.sub('', question)
+
+
+def cache_key(question, data_version):
+    return (normalise_question(question), data_version, date.today().isoformat())
+
+
+def get(key):
+    """The cached answer for key, or None"""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            _stats['misses'] += 1
+            return None
+        stored_at, answer = entry
+        if time.monotonic() - stored_at > CHAT_CACHE_TTL_SECONDS:
+            del _entries[key]
+            _stats['expired'] += 1
+            _stats['misses'] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats['hits'] += 1
+        return answer
+
+
+def put(key, answer):
+    with _lock:
+        _entries[key] = (time.monotonic(), answer)
+        _entries.move_to_end(key)
+        while len(_entries) > CHAT_CACHE_SIZE:
+            _entries.popitem(last=False)
+            _stats['evicted'] += 1
+
+
+def stats():
+    with _lock:
+        lookups = _stats['hits'] + _stats['misses']
+        return {
+            **_stats,
+            'hit_rate': round(_stats['hits'] / lookups, 3) if lookups else 0.0,
+            'entries': len(_entries),
+            'max_entries': CHAT_CACHE_SIZE,
+            'ttl_seconds': CHAT_CACHE_TTL_SECONDS,
+        }
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        for counter in _stats:
+            _stats[counter] = 0
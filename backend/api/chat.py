@@ -1,10 +1,18 @@
+import json
+
 from flask import Blueprint, Response, request, stream_with_context
-from backend.chat_agent import stream_final_answer
+from backend.chat_agent import stream_answer_events
 
 chat_bp = Blueprint('chat', __name__)
 
 @chat_bp.route('/stream', methods=['POST'])
 def chat_stream():
+    """Stream the agent's progress and answer as server-sent events.
+
+    Each frame is a JSON object: {"type": "status", "text"} for a step,
+    {"type": "token", "text"} for part of the answer, then
+    {"type": "done", "answer"} or {"type": "error", "error"}.
+    """
     data = request.json
     prompt = data.get('prompt')
     
@@ -12,10 +20,15 @@ def chat_stream():
         return {'error': 'No prompt provided'}, 400
 
     def generate():
-        for chunk in stream_final_answer(prompt):
-            yield chunk
+        for event in stream_answer_events(prompt):
+            if event is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            yield f'data: {json.dumps(event)}\n\n'
 
     return Response(
         stream_with_context(generate()),
-        mimetype='text/event-stream'
-    ) 
\ No newline at end of file
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    ) 
@@ -11,9 +11,10 @@ CORS(app, resources={
     r"/api/*": {
         "origins": ["https://offcut-recommender.netlify.app"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization", "Accept"],
+        "allow_headers": ["Content-Type", "Authorization", "Accept", "If-None-Match"],
         "supports_credentials": True,
-        "expose_headers": ["Content-Range", "X-Content-Range"],
+        "expose_headers": ["Content-Range", "X-Content-Range", "ETag", "Retry-After",
+                           "X-Has-More", "X-Next-Cursor", "Link"],
         "max_age": 3600
     }
 })
@@ -67,6 +68,12 @@ app.register_blueprint(visualization_bp, url_prefix='/api/visualizations')
 app.register_blueprint(reports_bp, url_prefix='/api/reports')
 app.register_blueprint(admin_bp, url_prefix='/api/admin')
 
+# Database migration and query-plan commands (flask --app wsgi db-upgrade, db-check-plans)
+from backend.migrations import register_commands
+register_commands(app)
+from backend.query_plans import register_commands as register_query_plan_commands
+register_query_plan_commands(app)
+
 
 if __name__ == '__main__':
     app.run(debug=True)
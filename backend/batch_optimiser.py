@@ -0,0 +1,213 @@
+import time
+import numpy as np
+from backend.pair_matching import match_double_cuts
+
+# Upper bound on how long the local search may run for one batch, in seconds
+DEFAULT_TIME_BUDGET = 0.5
+MAX_TIME_BUDGET = 5.0
+
+
+def _units(instruction):
+    return 2 if instruction.get('double_cut', False) else 1
+
+
+def _served(instruction):
+    """Length of new bar saved when an instruction is cut from offcuts"""
+    return instruction['required_length'] * _units(instruction)
+
+
+def _used(offcuts):
+    return sum(length_mm for length_mm, _ in offcuts)
+
+
+def is_sibling_pair(index, offcuts):
+    """True when two offcuts were cut together, one naming the other as related"""
+    if len(offcuts) != 2:
+        return False
+    (_, a), (_, b) = offcuts
+    return index.related_id(a) == b or index.related_id(b) == a
+
+
+def optimise_assignments(cutting_instructions, index, time_budget=DEFAULT_TIME_BUDGET):
+    """Assign offcuts to a whole batch of cutting instructions at once.
+
+    Works profile by profile. Each seeding strategy below builds a full
+    assignment; the best one is kept and a local search then re-seats
+    instructions until no move helps or the time budget runs out. The
+    objective is to maximise the required length served from offcuts and,
+    among equal solutions, minimise the leftover (offcut length minus
+    required length). Seeding with input order means the result is never
+    worse than the greedy path.
+
+    Returns a dict of instruction position -> list of (length_mm,
+    legacy_offcut_id) tuples taken from the index.
+    """
+    deadline = time.perf_counter() + min(time_budget, MAX_TIME_BUDGET)
+
+    positions_by_profile = {}
+    for pos, instruction in enumerate(cutting_instructions):
+        positions_by_profile.setdefault(instruction['material_profile'], []).append(pos)
+
+    assignments = {}
+    for material_profile, positions in positions_by_profile.items():
+        best, best_score = None, None
+        for seed in SEEDS:
+            seeded = seed(material_profile, positions, cutting_instructions, index)
+            score = _score(seeded, cutting_instructions)
+            # Put the offcuts back so the next strategy starts from the same pool
+            for offcuts in seeded.values():
+                for offcut in offcuts:
+                    index.add(material_profile, offcut)
+            if best is None or score > best_score:
+                best, best_score = seeded, score
+        for offcuts in best.values():
+            for offcut in offcuts:
+                index.remove(material_profile, offcut)
+        assignments.update(best)
+
+    for material_profile, positions in positions_by_profile.items():
+        _local_search(material_profile, positions, cutting_instructions, index, assignments, deadline)
+
+    return assignments
+
+
+def _score(assignments, cutting_instructions):
+    served = sum(_served(cutting_instructions[pos]) for pos in assignments)
+    leftover = sum(_used(offcuts) for offcuts in assignments.values()) - served
+    return served, -leftover
+
+
+def _seed_pairs_first(material_profile, positions, cutting_instructions, index):
+    """Pair all double cuts in one vectorised pass, then best-fit the singles"""
+    assignments = {}
+    doubles = [pos for pos in positions if cutting_instructions[pos].get('double_cut', False)]
+    offcuts = index.offcuts(material_profile)
+    if doubles and len(offcuts) >= 2:
+        lengths = np.fromiter((length_mm for length_mm, _ in offcuts), dtype=np.int64, count=len(offcuts))
+        legacy_ids = np.fromiter((legacy_id for _, legacy_id in offcuts), dtype=np.int64, count=len(offcuts))
+        related_ids = np.fromiter(
+            (-1 if index.related_id(legacy_id) is None else index.related_id(legacy_id)
+             for _, legacy_id in offcuts),
+            dtype=np.int64, count=len(offcuts)
+        )
+        required = np.fromiter((cutting_instructions[pos]['required_length'] for pos in doubles),
+                               dtype=np.int64, count=len(doubles))
+
+        first, second, _ = match_double_cuts(required, lengths, legacy_ids, related_ids)
+        for pos, a, b in zip(doubles, first.tolist(), second.tolist()):
+            if a < 0:
+                continue
+            pair = [offcuts[a], offcuts[b]]
+            for offcut in pair:
+                index.remove(material_profile, offcut)
+            assignments[pos] = pair
+
+    remaining = [pos for pos in positions if pos not in assignments]
+    assignments.update(_seed_best_fit_decreasing(material_profile, remaining, cutting_instructions, index))
+    return assignments
+
+
+def _seed_best_fit_decreasing(material_profile, positions, cutting_instructions, index):
+    """Seat the longest instructions first, each on the smallest offcut(s) that fit"""
+    order = sorted(
+        positions,
+        key=lambda pos: (-cutting_instructions[pos]['required_length'],
+                         -_units(cutting_instructions[pos]),
+                         pos)
+    )
+    return _seat_in_order(material_profile, order, cutting_instructions, index)
+
+
+def _seed_input_order(material_profile, positions, cutting_instructions, index):
+    """The greedy path: serve instructions in the order they were given"""
+    return _seat_in_order(material_profile, positions, cutting_instructions, index)
+
+
+def _seat_in_order(material_profile, order, cutting_instructions, index):
+    assignments = {}
+    for pos in order:
+        instruction = cutting_instructions[pos]
+        offcuts = index.take(material_profile, instruction['required_length'], _units(instruction))
+        if offcuts:
+            assignments[pos] = offcuts
+    return assignments
+
+
+# Tried in this order; on an exact tie the earlier strategy wins, so sibling
+# pairs are preferred whenever they cost nothing
+SEEDS = (_seed_pairs_first, _seed_best_fit_decreasing, _seed_input_order)
+
+
+def _local_search(material_profile, positions, cutting_instructions, index, assignments, deadline):
+    """Improve a profile's assignment until no move helps or the deadline passes"""
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = _rescue_unmatched(material_profile, positions, cutting_instructions,
+                                     index, assignments, deadline)
+        improved = _tighten(material_profile, positions, cutting_instructions,
+                            index, assignments, deadline) or improved
+
+
+def _tighten(material_profile, positions, cutting_instructions, index, assignments, deadline):
+    """Move matched instructions onto smaller offcuts freed by earlier moves"""
+    improved = False
+    for pos in positions:
+        if time.perf_counter() >= deadline:
+            break
+        current = assignments.get(pos)
+        # Sibling pairs are kept together even when a looser pair would be shorter
+        if not current or is_sibling_pair(index, current):
+            continue
+        instruction = cutting_instructions[pos]
+        for offcut in current:
+            index.add(material_profile, offcut)
+        # The released offcuts are back in the pool, so this always succeeds
+        retaken = index.take(material_profile, instruction['required_length'], _units(instruction))
+        assignments[pos] = retaken
+        if _used(retaken) < _used(current):
+            improved = True
+    return improved
+
+
+def _rescue_unmatched(material_profile, positions, cutting_instructions, index, assignments, deadline):
+    """Give an unmatched instruction the offcuts of a matched one that serves less.
+
+    The displaced instruction is re-seated on whatever still fits, so a move
+    is only kept when the profile's total served length goes up.
+    """
+    improved = False
+    unmatched = sorted(
+        (pos for pos in positions if pos not in assignments),
+        key=lambda pos: -_served(cutting_instructions[pos])
+    )
+    for pos in unmatched:
+        instruction = cutting_instructions[pos]
+        matched = sorted(
+            (p for p in positions
+             if p in assignments and _served(cutting_instructions[p]) < _served(instruction)),
+            key=lambda p: _served(cutting_instructions[p])
+        )
+        for other in matched:
+            if time.perf_counter() >= deadline:
+                return improved
+            released = assignments.pop(other)
+            for offcut in released:
+                index.add(material_profile, offcut)
+
+            offcuts = index.take(material_profile, instruction['required_length'], _units(instruction))
+            if not offcuts:
+                # Undo: the released offcuts were not enough to seat this instruction
+                for offcut in released:
+                    index.remove(material_profile, offcut)
+                assignments[other] = released
+                continue
+
+            assignments[pos] = offcuts
+            other_instruction = cutting_instructions[other]
+            reseated = index.take(material_profile, other_instruction['required_length'],
+                                  _units(other_instruction))
+            if reseated:
+                assignments[other] = reseated
+            improved = True
+            break
+    return improved
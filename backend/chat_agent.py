@@ -1,12 +1,18 @@
 import os
+import queue
+import threading
 from dotenv import load_dotenv
+from flask import current_app
 #from together import Together
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits import SQLDatabaseToolkit
 #from langchain_together import Together
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+from backend import services
+from backend.schema_context import get_schema_context
+from backend.data_version import get_data_version
+from backend import answer_cache
+
+# langchain and the OpenAI client take seconds to import and the agent
+# reflects the whole schema, so everything below is built on the first chat
+# request (see backend/services.py) rather than when a worker boots.
 
 # Load environment variables from the .env file
 load_dotenv()
@@ -29,16 +35,25 @@ if not OPENAI_API_KEY:
 #     max_tokens=4096
 # )
 
+# Seconds without an agent event before the stream sends a keep-alive
+CHAT_KEEPALIVE_SECONDS = int(os.getenv('CHAT_KEEPALIVE_SECONDS', '15'))
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is required")
 
-# Initialize database connection with error handling
-try:
-    db = SQLDatabase.from_uri(DATABASE_URL)
-except Exception as e:
-    print(f"Error connecting to database: {e}")
-    raise
+@services.service('chat_database')
+def _build_database():
+    """Reflected schema for the agent; it borrows read-only connections from the app's shared pool"""
+    from langchain_community.utilities import SQLDatabase
+    from backend.db_pool import get_analytics_engine
+
+    # Initialize database connection with error handling
+    try:
+        return SQLDatabase(get_analytics_engine())
+    except Exception as e:
+        print(f"Error connecting to database: {e}")
+        raise
 
 # Initialize LLM with error handling
 # try:
@@ -53,23 +68,19 @@ except Exception as e:
 #     raise
 
 
-# Initialize LLM with OpenAI GPT-4o
-llm = ChatOpenAI(
-    api_key=OPENAI_API_KEY,
-    model_name="gpt-4o",  # or gpt-3.5-turbo
-    temperature=0.0,
-    max_tokens=None,
-    )
-
-# Initialize toolkit with error handling
-try:
-    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-    toolkit.model_rebuild()
-except Exception as e:
-    print(f"Error initializing toolkit: {e}")
-    raise
+@services.service('chat_llm')
+def _build_llm():
+    from langchain_openai import ChatOpenAI
 
-tools = toolkit.get_tools()
+    # Initialize LLM with OpenAI GPT-4o
+    return ChatOpenAI(
+        api_key=OPENAI_API_KEY,
+        model_name="gpt-4o",  # or gpt-3.5-turbo
+        temperature=0.0,
+        max_tokens=None,
+        # Tokens reach the chat stream's callback handler as they arrive
+        streaming=True,
+        )
 
 
 REACT_TEMPLATE = """You are an agent designed to interact with a PostgreSQL database.
@@ -82,9 +93,10 @@ You MUST double check your query before executing it. If you get an error while
 
 DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP etc.) to the database.
 
-To start you should ALWAYS look at the tables in the database to see what you can query.
-Do NOT skip this step.
-Then you should query the schema of the most relevant tables.
+The database schema is described below, with column meanings, foreign keys (->) and sample values.
+Write your query from it directly. Only list the tables or fetch a table's schema if this description does not answer your question.
+
+{schema}
 
 You have access to the following tools for interacting with the database:
 {tools}
@@ -105,22 +117,102 @@ Begin!
 Question: {input}
 Thought: {agent_scratchpad}"""
 
-# Create the agent with react prompt template
-agent = create_react_agent(
-    llm=llm,
-    tools=tools,
-    prompt=PromptTemplate.from_template(REACT_TEMPLATE)
-)
-
-# Create the agent executor
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
-
-
-
+@services.service('chat_agent_executor')
+def _build_agent_executor():
+    from langchain_community.agent_toolkits import SQLDatabaseToolkit
+    from langchain.agents import AgentExecutor, create_react_agent
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.tools import StructuredTool
+    from backend.sql_guard import run_guarded_query
+
+    llm = services.get('chat_llm')
+
+    # Initialize toolkit with error handling
+    try:
+        toolkit = SQLDatabaseToolkit(db=services.get('chat_database'), llm=llm)
+        toolkit.model_rebuild()
+    except Exception as e:
+        print(f"Error initializing toolkit: {e}")
+        raise
+
+    # The agent's own queries go through the read-only, time- and size-limited runner
+    tools = [
+        StructuredTool.from_function(
+            func=run_guarded_query, name=tool.name,
+            description=tool.description, args_schema=tool.args_schema
+        ) if tool.name == 'sql_db_query' else tool
+        for tool in toolkit.get_tools()
+    ]
+
+    # Create the agent with react prompt template
+    agent = create_react_agent(
+        llm=llm,
+        tools=tools,
+        prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
 
-def stream_final_answer(prompt):
-    for chunk in agent_executor.stream({"input": prompt}):
-        if isinstance(chunk, dict) and 'output' in chunk:
-            yield chunk['output']
-        elif isinstance(chunk, str) and 'Final Answer:' in chunk:
-            yield chunk.split('Final Answer:')[1].strip()
\ No newline at end of file
+    # Create the agent executor
+    return AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
+
+
+def _run_agent(app, inputs, events, cancelled):
+    """Run the agent in a background thread, reporting through the events queue"""
+    from backend.chat_events import ChatEventHandler, ChatCancelled
+
+    with app.app_context():
+        try:
+            agent_executor = services.get('chat_agent_executor')
+            handler = ChatEventHandler(events, cancelled)
+            result = agent_executor.invoke(inputs, config={'callbacks': [handler]})
+            # 'cache' is for stream_answer_events only and is not sent to the client
+            events.put({'type': 'done', 'answer': result['output'], 'cache': handler.final_answer})
+        except ChatCancelled:
+            print("Chat run cancelled: client disconnected")
+        except Exception as e:
+            print(f"Error running chat agent: {str(e)}")
+            events.put({'type': 'error', 'error': str(e)})
+
+
+def stream_answer_events(prompt):
+    """Yield status, token and done events for prompt as the agent works.
+
+    Yields None every CHAT_KEEPALIVE_SECONDS without an event so the caller
+    can send a keep-alive.
+    """
+    # A repeat of a question already answered against the same data skips the agent
+    key = answer_cache.cache_key(prompt, get_data_version())
+    cached = answer_cache.get(key)
+    if cached is not None:
+        yield {'type': 'done', 'answer': cached}
+        return
+
+    yield {'type': 'status', 'text': 'Thinking…'}
+    events = queue.Queue()
+    cancelled = threading.Event()
+    worker = threading.Thread(
+        target=_run_agent,
+        args=(current_app._get_current_object(),
+              {"input": prompt, "schema": get_schema_context()}, events, cancelled),
+        daemon=True,
+    )
+    worker.start()
+    try:
+        while True:
+            try:
+                event = events.get(timeout=CHAT_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield None
+                continue
+            cache = event.pop('cache', False)
+            yield event
+            if event['type'] == 'done':
+                # Only real final answers are cached, not the message
+                # AgentExecutor returns when it hits its iteration limit
+                if cache:
+                    answer_cache.put(key, event['answer'])
+                return
+            if event['type'] == 'error':
+                return
+    finally:
+        # Stops the agent at its next step if the client disconnected
+        cancelled.set()
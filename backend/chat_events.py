@@ -0,0 +1,88 @@
+import re
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Turns the agent's callbacks into the events /api/chat/stream sends: a
+# status line for each step (thinking, reading a schema, querying tables)
+# and the final answer token by token as the model writes it. The ReAct
+# model writes its reasoning and tool calls in the same token stream, so
+# tokens are held back until "Final Answer:" appears.
+FINAL_ANSWER = 'Final Answer:'
+
+_TABLES = re.compile(r'\b(?:from|join)\s+"?(\w+)', re.IGNORECASE)
+
+
+class ChatCancelled(Exception):
+    """The client went away, so the agent run is abandoned"""
+
+
+def _tool_status(name, tool_input):
+    if name == 'sql_db_query':
+        tables = list(dict.fromkeys(_TABLES.findall(tool_input)))
+        return f"Querying {', '.join(tables)}…" if tables else 'Querying the database…'
+    if name == 'sql_db_schema':
+        return f"Reading the schema for {tool_input.strip()}…"
+    if name == 'sql_db_list_tables':
+        return 'Listing tables…'
+    if name == 'sql_db_query_checker':
+        return 'Checking the query…'
+    return f"Running {name}…"
+
+
+class ChatEventHandler(BaseCallbackHandler):
+    """Put status and token events on a queue as the agent runs"""
+
+    # Raising from a callback is how a cancelled run is stopped
+    raise_error = True
+
+    def __init__(self, events, cancelled):
+        self.events = events
+        self.cancelled = cancelled
+        self._text = ''
+        self._answering = False
+        self._started = False
+        # Whether the run ended with the model's own final answer, rather
+        # than AgentExecutor stopping it at the iteration or time limit
+        self.final_answer = False
+
+    def _check_cancelled(self):
+        if self.cancelled.is_set():
+            raise ChatCancelled()
+
+    def _put_token(self, token):
+        if not self._started:
+            token = token.lstrip()
+            if not token:
+                return
+            self._started = True
+        self.events.put({'type': 'token', 'text': token})
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._check_cancelled()
+        self._text = ''
+        self._answering = False
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.on_llm_start(serialized, [], **kwargs)
+
+    def on_llm_new_token(self, token, **kwargs):
+        self._check_cancelled()
+        if self._answering:
+            self._put_token(token)
+            return
+        self._text += token
+        if FINAL_ANSWER in self._text:
+            self._answering = True
+            self._put_token(self._text.split(FINAL_ANSWER, 1)[1])
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._check_cancelled()
+        name = (serialized or {}).get('name') or kwargs.get('name') or 'tool'
+        self.events.put({'type': 'status', 'text': _tool_status(name, input_str)})
+
+    def on_agent_finish(self, finish, **kwargs):
+        self.final_answer = FINAL_ANSWER in (finish.log or '')
+
+    def on_tool_end(self, output, **kwargs):
+        self._check_cancelled()
+        self.events.put({'type': 'status', 'text': 'Thinking…'})
@@ -17,3 +17,21 @@ class Config:
         raise ValueError("SECRET_KEY environment variable is required but not set.")
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Disable SQLAlchemy event notifications
+
+    # One connection pool per process, shared by the ORM, the charts and the
+    # chat agent (see backend/db_pool.py). Sized for every thread that can hold
+    # a connection at once: the gunicorn request threads plus the background
+    # job workers, with a little overflow for the chat agent's streaming.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,  # Replace connections the server has dropped
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    }
+    if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_size': int(os.getenv(
+                'DB_POOL_SIZE',
+                str(int(os.getenv('GUNICORN_THREADS', '2')) + int(os.getenv('JOB_WORKERS', '2')))
+            )),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '2')),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        })
@@ -1,143 +1,372 @@
 import os
 import pandas as pd
+import numpy as np
 import re
-from llama_parse import LlamaParse
+from array import array
 from datetime import datetime
 from backend.app import db
-from backend.models import Batch, BatchDetail, Item, Offcut, BatchItem, BatchOffcutSuggestion, OffcutUsageHistory
-from tempfile import NamedTemporaryFile
+from backend import parse_cache
+from backend.staging import stage_dataframe
+from backend.data_version import bump_data_version
+from backend.models import (
+    Batch, BatchDetail, Item, Offcut, BatchItem, BatchOffcutSuggestion, OffcutUsageHistory, MonthlyItemRollup
+)
+from sqlalchemy import insert, delete, select, func, extract, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def preprocess_pdf(file_path, batch_date=None):
-    """Preprocess single PDF file using LlamaParse"""
+# Maximum number of LlamaParse calls in flight for one multi-file upload
+PDF_PARSE_CONCURRENCY = int(os.getenv('PDF_PARSE_CONCURRENCY', '4'))
+
+def _report(progress, stage, percent, message=None):
+    """Forward a progress update to the caller's callback, if any"""
+    if progress is not None:
+        progress(stage, percent, message)
+
+def extract_pdf_text(file_path):
+    """Extract the text of a PDF file, reusing the parse cache when the same bytes were parsed before"""
+    if not os.path.isfile(file_path):
+        raise ValueError(f"File not found: {file_path}")
+    return parse_cache.get_or_parse(file_path, parse_pdf_text)
+
+def parse_pdf_text(file_path):
+    """Extract the text of a PDF file using LlamaParse"""
+    # Deferred: llama_parse pulls in llama_index, seconds of import time
+    from llama_parse import LlamaParse
+    parser_text = LlamaParse(result_type="text")
+    docs_text = parser_text.load_data(file_path)
+    if not docs_text:
+        raise ValueError(f"No text content extracted from {file_path}")
+    return "\n\n".join([doc.get_content() for doc in docs_text])
+
+def build_pdf_dataframe(text_data, file_path, batch_date):
+    """Parse a PDF's text into a DataFrame of cutting records"""
+    parsed_data = parse_data(text_data)
+    
+    # Early batch code validation
+    batch_code = parsed_data[0].get('Batch No') if parsed_data else None
+    if not batch_code:
+        raise ValueError(f"No batch code found in {os.path.basename(file_path)}")
+    
+    # Convert to DataFrame
+    df = create_dataframe(parsed_data)
+    df['source_file'] = os.path.basename(file_path)
+    df['batch_date'] = batch_date
+    return df
+
+def find_duplicate_batches(dataframes):
+    """Return a duplicate_batch error if any batch code already exists or repeats across files"""
+    seen = {}
+    for df in dataframes:
+        for batch_code in df['Batch No'].unique().tolist():
+            if batch_code in seen:
+                return {
+                    'error': 'duplicate_batch',
+                    'batch_code': batch_code,
+                    'message': f"Batch code {batch_code} appears in both {seen[batch_code]} and {df['source_file'].iloc[0]}"
+                }
+            seen[batch_code] = df['source_file'].iloc[0]
+    
+    existing = Batch.query.filter(Batch.batch_code.in_(list(seen))).first()
+    if existing:
+        return {
+            'error': 'duplicate_batch',
+            'batch_code': existing.batch_code,
+            'message': f"Batch code {existing.batch_code} already exists in database"
+        }
+    return None
+
+def preprocess_pdfs(file_paths, batch_date=None, max_concurrency=PDF_PARSE_CONCURRENCY, progress=None):
+    """Preprocess several PDF files into one validated DataFrame
+
+    LlamaParse calls, which spend nearly all their time waiting on the
+    network, run on up to max_concurrency threads. The parsed results are
+    then merged in the order the files were given.
+
+    progress, if given, is called as progress(stage, percent, message) as
+    the files move through the parse, extract and validate stages.
+    Returns a duplicate_batch error dict instead of a DataFrame when a batch
+    code already exists in the database or appears in more than one file.
+    """
     if batch_date is None:
         raise ValueError("batch_date must be provided for preprocessing")
-        
-    parser_text = LlamaParse(result_type="text")
+    if not file_paths:
+        raise ValueError("No files provided for preprocessing")
+    
+    names = [os.path.basename(path) for path in file_paths]
+    _report(progress, 'parse', 10, f"Parsing {', '.join(names)}")
+    
+    texts = [None] * len(file_paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(file_paths)))) as executor:
+        futures = {executor.submit(extract_pdf_text, path): pos for pos, path in enumerate(file_paths)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            pos = futures[future]
+            try:
+                texts[pos] = future.result()
+            except Exception as e:
+                for pending in futures:
+                    pending.cancel()
+                raise Exception(f"Failed to process PDF {file_paths[pos]}: {str(e)}")
+            _report(progress, 'parse', 10 + 40 * done // len(file_paths),
+                    f"Parsed {done} of {len(file_paths)} files")
+    
+    _report(progress, 'extract', 50, "Extracting cutting records")
     all_data = []
+    for path, text_data in zip(file_paths, texts):
+        try:
+            all_data.append(build_pdf_dataframe(text_data, path, batch_date))
+        except Exception as e:
+            raise Exception(f"Failed to process PDF {path}: {str(e)}")
     
+    _report(progress, 'validate', 70, f"Validating {sum(len(df) for df in all_data)} records")
+    duplicate = find_duplicate_batches(all_data)
+    if duplicate:
+        return duplicate
+    
+    if not all_data:
+        raise Exception("No valid data found for processing")
+    
+    df = pd.concat(all_data, ignore_index=True)
+    validate_input_data(df)
+    validate_dataframe_for_ingestion(df)
+    return df
+
+def preprocess_pdf(file_path, batch_date=None, progress=None):
+    """Preprocess single PDF file using LlamaParse"""
+    return preprocess_pdfs([file_path], batch_date, progress=progress)
+
+def process_uploads(file_paths, batch_date, auto_ingest=False, progress=None):
+    """Background job body for uploaded PDFs: preprocess, stage and optionally ingest.
+
+    Returns a JSON-serialisable summary holding the staging ID and a
+    preview. Raises with a dict argument for errors the client should act
+    on, such as a duplicate batch. The uploaded files are always removed.
+    """
     try:
-        if not os.path.isfile(file_path):
-            raise ValueError(f"File not found: {file_path}")
-            
-        docs_text = parser_text.load_data(file_path)
-        if not docs_text:
-            raise ValueError(f"No text content extracted from {file_path}")
-        text_data = "\n\n".join([doc.get_content() for doc in docs_text])
+        result = preprocess_pdfs(file_paths, batch_date, progress=progress)
         
-        # Parse the text data
-        parsed_data = parse_data(text_data)
+        if isinstance(result, dict) and 'error' in result:
+            raise Exception(result)
         
-        # Early batch code validation
-        batch_code = parsed_data[0].get('Batch No') if parsed_data else None
-        if not batch_code:
-            raise ValueError(f"No batch code found in {os.path.basename(file_path)}")
-            
-        # Check if batch exists - return specific error type
-        if Batch.query.filter_by(batch_code=batch_code).first():
-            return {
-                'error': 'duplicate_batch',
-                'batch_code': batch_code,
-                'message': f"Batch code {batch_code} already exists in database"
-            }
+        processed_df = result
+        if processed_df is None or processed_df.empty:
+            raise Exception({'error': 'No data could be extracted from PDF'})
         
-        # Convert to DataFrame
-        df = create_dataframe(parsed_data)
-        df['source_file'] = os.path.basename(file_path)
-        df['batch_date'] = batch_date
-        all_data.append(df)
+        _report(progress, 'stage', 85, "Storing processed data")
+        summary = {
+            'files': [os.path.basename(path) for path in file_paths],
+            'rows': len(processed_df),
+            'batch_codes': sorted(processed_df['Batch No'].unique().tolist()),
+            'preview': processed_df.head(20).to_dict('records')
+        }
         
-    except Exception as e:
-        raise Exception(f"Failed to process PDF {file_path}: {str(e)}")
-
-    if not all_data:
-        raise Exception("No valid data found for processing")
+        if auto_ingest:
+            _report(progress, 'ingest', 90, f"Ingesting {len(processed_df)} records")
+            try:
+                summary['ingest'] = ingest_data(processed_df)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        else:
+            summary['staging_id'] = stage_dataframe(processed_df)
         
-    return pd.concat(all_data, ignore_index=True)
+        return summary
+    
+    finally:
+        for file_path in file_paths:
+            if os.path.exists(file_path):
+                print(f"Cleaning up file: {file_path}")
+                os.remove(file_path)
 
-def parse_data(text_data):
-    data = []
+# Optimiser report grammar, compiled once. One scan of a section finds every
+# field keyword; values are captured in lookaheads so a keyword inside another
+# field's value is still seen, as it would be by a separate search.
+_SECTION_HEADING = 'BAR OPTIMISING'
+_WHITESPACE = re.compile(r'\s*')
+_BATCH_PATTERN = re.compile(r'BATCH:\s*(\S+)')
+_SAW_PATTERN = re.compile(r'Saw:\s*(.+)')
+_TOKENS = re.compile(
+    r'Product Code:(?:(?=\s*(?P<code>\S+)))?'
+    r'|Description:(?=\s*(?P<description>.+))'
+    r'|Bar Length:(?=\s*(?P<bar_length>\d+))'
+    r'|Use Offcuts?:(?=\s*(?P<suggested>[\d\s&]*))'
+    r'|Total Used:(?=\s*(?P<used>\d+))'
+    r'|Save Offcuts?:(?=\s*(?P<created>[\d\s&]*))'
+    r'|(?P<double_cut>\*\*\* Double Cut Bars \*\*\*)'
+)
+# (token group, record key, pattern matching the field within one product)
+_FIELDS = (
+    ('code', 'Product Code', re.compile(r'Product Code:\s*(\S+)')),
+    ('description', 'Product Description', re.compile(r'Description:\s*(.+)')),
+    ('bar_length', 'Input Bar Length', re.compile(r'Bar Length:\s*(\d+)')),
+    ('suggested', 'Suggested Offcut ID(s)', re.compile(r'Use Offcut[s]?:\s*([\d\s&]*)')),
+    ('used', 'Bar Length Used', re.compile(r'Total Used:\s*(\d+)')),
+    ('created', 'Offcut ID(s) Created', re.compile(r'Save Offcut[s]?:\s*([\d\s&]*)')),
+)
+_INT_FIELDS = {'Input Bar Length', 'Bar Length Used'}
+
+def _split_sections(text_data):
+    """Split on the report heading and the whitespace around it.
+
+    Same result as re.split(r'\\s*BAR OPTIMISING\\s*', text_data), without
+    rescanning each run of layout padding once per character.
+    """
+    sections = []
+    pos = 0
+    while True:
+        heading = text_data.find(_SECTION_HEADING, pos)
+        if heading < 0:
+            sections.append(text_data[pos:])
+            return sections
+        sections.append(text_data[pos:heading].rstrip())
+        pos = _WHITESPACE.match(text_data, heading + len(_SECTION_HEADING)).end()
+
+def _product_record(section, tokens, end, batch_no, saw_name):
+    """Build one product's record from the first token of each field.
+
+    A product runs from its 'Product Code: <code>' to the next
+    'Product Code:' or the end of the section. A value captured past that
+    end is re-matched within the product alone.
+    """
+    item = {
+        'Batch No': batch_no,
+        'Saw Name': saw_name,
+    }
+    for group, key, pattern in _FIELDS:
+        match = tokens.get(group)
+        if match is None:
+            value = None
+        elif match.end(group) <= end:
+            value = match.group(group).strip()
+        else:
+            bounded = pattern.search(section, tokens['code'].start(), end)
+            value = bounded.group(1).strip() if bounded else None
+
+        if value is None:
+            item[key] = 'None' if 'ID' in key else 0
+        else:
+            item[key] = int(value) if key in _INT_FIELDS else value
+
+    item['Double Cut'] = 'Yes' if 'double_cut' in tokens else 'No'
+    return item
+
+def iter_parse_data(text_data):
+    """Yield one record per product in an optimiser report's text"""
     batch_no = None
     saw_name = None
 
-    sections = re.split(r'\s*BAR OPTIMISING\s*', text_data)
-
-    for section in sections:
+    for section in _split_sections(text_data):
         if "BATCH:" in section:
-            batch_no_match = re.search(r'BATCH:\s*(\S+)', section)
+            batch_no_match = _BATCH_PATTERN.search(section)
             if batch_no_match:
                 batch_no = batch_no_match.group(1).strip()
 
         if "Saw:" in section:
-            saw_name_match = re.search(r'Saw:\s*(.+)', section)
+            saw_name_match = _SAW_PATTERN.search(section)
             if saw_name_match:
                 saw_name = saw_name_match.group(1).strip()
 
-        products = re.findall(r'(Product Code:\s*\S+[\s\S]*?)(?=Product Code:|$)', section)
-        for product in products:
-            item = {
-                'Batch No': batch_no,
-                'Saw Name': saw_name,
-            }
-
-            # Extract data using optimized regex patterns
-            patterns = {
-                'Product Code': r'Product Code:\s*(\S+)',
-                'Product Description': r'Description:\s*(.+)',
-                'Input Bar Length': r'Bar Length:\s*(\d+)',
-                'Suggested Offcut ID(s)': r'Use Offcut[s]?:\s*([\d\s&]*)',
-                'Bar Length Used': r'Total Used:\s*(\d+)',
-                'Offcut ID(s) Created': r'Save Offcut[s]?:\s*([\d\s&]*)'
-            }
-
-            for key, pattern in patterns.items():
-                match = re.search(pattern, product)
-                if match:
-                    value = match.group(1).strip()
-                    if key in ['Input Bar Length', 'Bar Length Used']:
-                        value = int(value)
-                    item[key] = value
-                else:
-                    item[key] = 'None' if 'ID' in key else 0
-
-            item['Double Cut'] = 'Yes' if "*** Double Cut Bars ***" in product else 'No'
-            data.append(item)
-
-    return data
+        # A trailing newline is never part of the last product
+        section_end = len(section) - 1 if section.endswith('\n') else len(section)
+        tokens = None
+        code_end = 0
+        for match in _TOKENS.finditer(section):
+            group = match.lastgroup
+            if group is None or group == 'code':
+                # A 'Product Code:' keyword closes the open product, unless it
+                # sits inside that product's own code value
+                if match.start() < code_end:
+                    continue
+                if tokens is not None:
+                    yield _product_record(section, tokens, match.start(), batch_no, saw_name)
+                    tokens = None
+                if group == 'code':
+                    tokens = {'code': match}
+                    code_end = match.end('code')
+            elif tokens is not None and group not in tokens:
+                tokens[group] = match
+
+        if tokens is not None:
+            yield _product_record(section, tokens, section_end, batch_no, saw_name)
+
+def parse_data(text_data):
+    """Parse an optimiser report's text into a list of product records"""
+    return list(iter_parse_data(text_data))
+
+# Parsed fields collected straight into typed columns: lengths as int32,
+# repetitive strings as categoricals, offcut ID lists as plain strings
+_CATEGORICAL_FIELDS = {
+    'Batch No': 'Batch No',
+    'Saw Name': 'Saw Name',
+    'Item Code': 'Product Code',
+    'Item Description': 'Product Description',
+    'Double Cut': 'Double Cut',
+}
+_STRING_FIELDS = {
+    'Suggested Offcut ID(s)': 'Suggested Offcut ID(s)',
+    'Offcut ID(s) Created': 'Offcut ID(s) Created',
+}
+
+def _percentage(numerator, denominator):
+    """numerator / denominator * 100, or 0 where the denominator is 0"""
+    out = np.zeros(len(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out * 100
 
 def create_dataframe(parsed_data):
-    """Convert parsed data to DataFrame"""
-    rows = []
+    """Convert parsed records (a list or the parser's generator) to a DataFrame"""
+    strings = {column: [] for column in (*_CATEGORICAL_FIELDS, *_STRING_FIELDS)}
+    input_lengths = array('i')
+    used_lengths = array('i')
     for item in parsed_data:
-        quantity = 2 if item['Double Cut'] == 'Yes' else 1
-        total_length_used = quantity * item['Bar Length Used']
-        offcut_length_created = item['Input Bar Length'] - item['Bar Length Used']
-        total_input_length = item['Input Bar Length'] * quantity
-        total_offcut_length_created = quantity * offcut_length_created
-
-        row = {
-            'Batch No': item['Batch No'],
-            'Saw Name': item['Saw Name'],
-            'Item Code': item['Product Code'],
-            'Item Description': item['Product Description'],
-            'Input Bar Length': item['Input Bar Length'],
-            'Total Input Length': total_input_length,
-            'Suggested Offcut ID(s)': item['Suggested Offcut ID(s)'],
-            'Double Cut': item['Double Cut'],
-            'Quantity': quantity,
-            'Bar Length Used': item['Bar Length Used'],
-            'Total Length Used': total_length_used,
-            'Offcut Length Created': offcut_length_created,
-            'Total Offcut Length Created': total_offcut_length_created,
-            'Offcut ID(s) Created': item['Offcut ID(s) Created'],
-        }
-        rows.append(row)
+        for column, field in _CATEGORICAL_FIELDS.items():
+            strings[column].append(item[field])
+        for column, field in _STRING_FIELDS.items():
+            strings[column].append(item[field])
+        input_lengths.append(item['Input Bar Length'])
+        used_lengths.append(item['Bar Length Used'])
+
+    input_bar_length = np.frombuffer(input_lengths, dtype=np.int32)
+    bar_length_used = np.frombuffer(used_lengths, dtype=np.int32)
+    double_cut = pd.Categorical(strings['Double Cut'])
+    quantity = np.where(double_cut == 'Yes', 2, 1).astype(np.int32)
+    offcut_length_created = input_bar_length - bar_length_used
+    total_input_length = quantity * input_bar_length
+    total_length_used = quantity * bar_length_used
+    total_offcut_length_created = quantity * offcut_length_created
+
+    df = pd.DataFrame({
+        'Batch No': pd.Categorical(strings['Batch No']),
+        'Saw Name': pd.Categorical(strings['Saw Name']),
+        'Item Code': pd.Categorical(strings['Item Code']),
+        'Item Description': pd.Categorical(strings['Item Description']),
+        'Input Bar Length': input_bar_length,
+        'Total Input Length': total_input_length,
+        'Suggested Offcut ID(s)': pd.Series(strings['Suggested Offcut ID(s)'], dtype=object),
+        'Double Cut': double_cut,
+        'Quantity': quantity,
+        'Bar Length Used': bar_length_used,
+        'Total Length Used': total_length_used,
+        'Offcut Length Created': offcut_length_created,
+        'Total Offcut Length Created': total_offcut_length_created,
+        'Offcut ID(s) Created': pd.Series(strings['Offcut ID(s) Created'], dtype=object),
+    })
+    # Both are relative to all the bar fed in, so a double cut counts two bars
+    df['Waste Percentage'] = _percentage(total_offcut_length_created, total_input_length)
+    df['Usage Efficiency'] = _percentage(total_length_used, total_input_length)
 
-    df = pd.DataFrame(rows)
-    df['Waste Percentage'] = (df['Total Offcut Length Created'] / df['Input Bar Length']) * 100
-    df['Usage Efficiency'] = (df['Total Length Used'] / df['Input Bar Length']) * 100
-  
     return df
 
+def _none_for_missing(series):
+    """A categorical or object column as plain objects, with None where a value is missing.
+
+    Missing values come back from a categorical as NaN, which would
+    otherwise be written to the database instead of NULL.
+    """
+    return series.astype(object).where(series.notna(), None)
+
 def validate_input_data(df):
     """Validate required columns are present in DataFrame"""
     expected_columns = [
@@ -186,7 +415,12 @@ def validate_dataframe_for_ingestion(df):
         raise ValueError(f"DataFrame validation failed: {str(e)}")
 
 def ingest_data(df):
-    """Ingest DataFrame directly into database"""
+    """Ingest DataFrame into the database with set-based inserts.
+
+    Item descriptions are resolved in one IN query and the missing items are
+    upserted together; batch items, offcuts and suggestions are collected
+    per batch and written with one executemany INSERT each.
+    """
     try:
         print("Starting data ingestion...")
         # Validate input data
@@ -197,13 +431,17 @@ def ingest_data(df):
         # Filter out Steel Saw records before processing
         df = df[df['Saw Name'] != 'Steel Saw'].copy()
         print(f"Processing {len(df)} records after filtering")
+        for column in ('Saw Name', 'Item Code'):
+            df[column] = _none_for_missing(df[column])
         
-        batch_ids = {}
-        item_ids = {}
-        batch_detail_ids = {}
+        # Resolve (and create where missing) every item in the upload up front
+        item_ids = resolve_item_ids(
+            df['Item Description'].tolist(),
+            df['Item Code'].tolist()
+        )
         
         # Process each batch
-        for batch_code, batch_group in df.groupby('Batch No'):
+        for batch_code, batch_group in df.groupby('Batch No', observed=True):
             print(f"Processing batch: {batch_code}")
             try:
                 batch_date = pd.to_datetime(batch_group['batch_date'].iloc[0]).date()
@@ -216,7 +454,6 @@ def ingest_data(df):
                 batch = Batch(batch_code=batch_code, batch_date=batch_date)
                 db.session.add(batch)
                 db.session.flush()
-            batch_ids[batch_code] = batch.batch_id
             
             try:
                 batch_detail = BatchDetail(
@@ -226,56 +463,29 @@ def ingest_data(df):
                 )
                 db.session.add(batch_detail)
                 db.session.flush()
-                batch_detail_ids[batch_code] = batch_detail.batch_detail_id
                 
-                # Process items and batch items
-                for idx, item_row in batch_group.iterrows():
-                    try:
-                        # Process item
-                        item = Item.query.filter_by(item_description=item_row['Item Description']).first()
-                        if not item:
-                            item = Item(
-                                item_code=item_row['Item Code'],
-                                item_description=item_row['Item Description']
-                            )
-                            db.session.add(item)
-                            db.session.flush()
-                        item_ids[item_row['Item Description']] = item.item_id
-                        
-                        # Create batch item
-                        batch_item = BatchItem(
-                            batch_id=batch.batch_id,
-                            item_id=item.item_id,
-                            quantity=item_row['Quantity'],
-                            input_bar_length_mm=item_row['Input Bar Length'],
-                            bar_length_used_mm=item_row['Bar Length Used'],
-                            total_length_used_mm=item_row['Total Length Used'],
-                            offcut_length_created_mm=item_row['Offcut Length Created'],
-                            total_offcut_length_created_mm=item_row['Total Offcut Length Created'],
-                            double_cut=item_row['Double Cut'] == 'Yes',
-                            waste_percentage=item_row['Waste Percentage'],
-                            usage_efficiency=item_row['Usage Efficiency']
-                        )
-                        db.session.add(batch_item)
-                        
-                        # Process offcuts and suggestions with error handling
-                        if pd.notna(item_row['Offcut ID(s) Created']) and str(item_row['Offcut ID(s) Created']).lower() != 'none':
-                            process_offcuts(item_row, batch_detail, db.session)
-                        
-                        if pd.notna(item_row['Suggested Offcut ID(s)']):
-                            try:
-                                process_suggestions(item_row, batch, batch_detail, db.session)
-                            except Exception as e:
-                                print(f"Warning: Failed to process suggestions for item {idx}: {str(e)}")
-                                # Continue processing other items
-                                continue
-                                
-                    except Exception as e:
-                        raise ValueError(f"Failed to process item at index {idx}: {str(e)}")
+                batch_item_rows, offcut_rows, suggestion_rows = build_batch_rows(
+                    batch_group, batch.batch_id, batch_detail.batch_detail_id, item_ids
+                )
+                
+                # One executemany per table instead of one INSERT per row. Core
+                # inserts keep NULLs in the statement; the ORM bulk path drops
+                # them and splits the batch wherever a NULL column comes or goes.
+                db.session.execute(insert(BatchItem.__table__), batch_item_rows)
+                if offcut_rows:
+                    db.session.execute(insert(Offcut.__table__), offcut_rows)
+                if suggestion_rows:
+                    db.session.execute(insert(BatchOffcutSuggestion.__table__), suggestion_rows)
+                # Same transaction, so the rollups only move when the batch commits
+                update_monthly_rollups(batch.batch_date, batch_item_rows)
+                print(f"Inserted {len(batch_item_rows)} batch items, {len(offcut_rows)} offcuts "
+                      f"and {len(suggestion_rows)} suggestions")
                         
             except Exception as e:
                 raise ValueError(f"Failed to process batch {batch_code}: {str(e)}")
                 
+        # Charts and other cached views are stale once this commits
+        bump_data_version()
         print("All batches processed successfully")
         return {"message": "Data ingestion completed successfully"}
         
@@ -283,54 +493,241 @@ def ingest_data(df):
         print(f"Error during data ingestion: {str(e)}")
         raise Exception(f"Data ingestion failed: {str(e)}")
 
-def store_dataframe_temp(df):
-    """Store DataFrame in a temporary file"""
-    with NamedTemporaryFile(prefix='processed_data_', suffix='.pkl', delete=False) as temp_file:
-        df.to_pickle(temp_file.name)
-        return temp_file.name
+def insert_for_dialect(model):
+    """INSERT construct supporting ON CONFLICT for the bound database dialect"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql_insert(model)
+    if dialect == 'sqlite':
+        return sqlite_insert(model)
+    raise ValueError(f"Unsupported database dialect for upserts: {dialect}")
 
-def retrieve_dataframe_temp(file_path):
-    """Retrieve DataFrame from temporary file"""
-    try:
-        df = pd.read_pickle(file_path)
-        os.unlink(file_path)  # Clean up the temporary file
-        return df
-    except Exception as e:
-        if os.path.exists(file_path):
-            os.unlink(file_path)
-        raise Exception(f"Failed to retrieve DataFrame: {str(e)}")
-
-def process_offcuts(item_row, batch_detail, session):
-    """Helper function to process offcuts"""
-    offcut_ids = str(item_row['Offcut ID(s) Created']).split('&')
-    for i, offcut_id in enumerate(offcut_ids):
-        related_id = int(offcut_ids[i-1].strip()) if item_row['Double Cut'] == 'Yes' and i > 0 else None
+def resolve_item_ids(descriptions, codes):
+    """Map item descriptions to item IDs, inserting items that don't exist yet.
+
+    The first code seen for a description is used when the item is created.
+    """
+    first_codes = {}
+    for description, code in zip(descriptions, codes):
+        first_codes.setdefault(description, code)
+    if not first_codes:
+        return {}
+    
+    item_ids = dict(
+        db.session.query(Item.item_description, Item.item_id)
+        .filter(Item.item_description.in_(list(first_codes)))
+        .all()
+    )
+    
+    missing = [
+        {'item_code': code, 'item_description': description}
+        for description, code in first_codes.items()
+        if description not in item_ids
+    ]
+    if missing:
+        print(f"Creating {len(missing)} new items")
+        # ON CONFLICT keeps concurrent ingests from failing on the unique description
+        db.session.execute(
+            insert_for_dialect(Item).values(missing)
+            .on_conflict_do_nothing(index_elements=['item_description'])
+        )
+        item_ids.update(
+            db.session.query(Item.item_description, Item.item_id)
+            .filter(Item.item_description.in_([row['item_description'] for row in missing]))
+            .all()
+        )
+    
+    return item_ids
+
+def build_batch_rows(batch_group, batch_id, batch_detail_id, item_ids):
+    """Build batch_items, offcuts and suggestion rows for one batch.
+
+    Columns are read out of the DataFrame once as native Python lists, so
+    the rows hold plain ints/floats/strings ready for executemany.
+    """
+    columns = {
+        col: batch_group[col].tolist()
+        for col in [
+            'Item Description', 'Quantity', 'Input Bar Length', 'Bar Length Used',
+            'Total Length Used', 'Offcut Length Created', 'Total Offcut Length Created',
+            'Double Cut', 'Waste Percentage', 'Usage Efficiency',
+            'Offcut ID(s) Created', 'Suggested Offcut ID(s)'
+        ]
+    }
+    
+    batch_item_rows = []
+    offcut_rows = []
+    suggestion_rows = []
+    
+    for pos, idx in enumerate(batch_group.index):
+        description = columns['Item Description'][pos]
+        double_cut = columns['Double Cut'][pos] == 'Yes'
+        offcut_length = columns['Offcut Length Created'][pos]
+        
+        batch_item_rows.append({
+            'batch_id': batch_id,
+            'item_id': item_ids[description],
+            'quantity': columns['Quantity'][pos],
+            'input_bar_length_mm': columns['Input Bar Length'][pos],
+            'bar_length_used_mm': columns['Bar Length Used'][pos],
+            'total_length_used_mm': columns['Total Length Used'][pos],
+            'offcut_length_created_mm': offcut_length,
+            'total_offcut_length_created_mm': columns['Total Offcut Length Created'][pos],
+            'double_cut': double_cut,
+            'waste_percentage': columns['Waste Percentage'][pos],
+            'usage_efficiency': columns['Usage Efficiency'][pos]
+        })
         
-        offcut = Offcut(
-            legacy_offcut_id=int(offcut_id.strip()),
-            length_mm=item_row['Offcut Length Created'],
-            material_profile=item_row['Item Description'],
-            created_in_batch_detail_id=batch_detail.batch_detail_id,
-            related_legacy_offcut_id=related_id,
-            is_available=True,
-            reuse_count=0
+        offcuts_created = columns['Offcut ID(s) Created'][pos]
+        if pd.notna(offcuts_created) and str(offcuts_created).lower() != 'none':
+            try:
+                offcut_rows.extend(build_offcut_rows(
+                    offcuts_created, offcut_length, description, double_cut, batch_detail_id
+                ))
+            except Exception as e:
+                raise ValueError(f"Failed to process item at index {idx}: {str(e)}")
+        
+        suggested = columns['Suggested Offcut ID(s)'][pos]
+        if pd.notna(suggested):
+            try:
+                suggestion = build_suggestion_row(
+                    suggested, offcut_length, description, batch_id, batch_detail_id
+                )
+            except Exception as e:
+                print(f"Warning: Failed to process suggestions for item {idx}: {str(e)}")
+                continue
+            if suggestion:
+                suggestion_rows.append(suggestion)
+    
+    return batch_item_rows, offcut_rows, suggestion_rows
+
+def update_monthly_rollups(batch_date, batch_item_rows):
+    """Add one batch's items to the monthly per-item rollups with a single upsert"""
+    totals = {}
+    for row in batch_item_rows:
+        used, offcut, efficiency_sum, efficiency_count = totals.get(row['item_id'], (0, 0, 0.0, 0))
+        efficiency = row['usage_efficiency']
+        if efficiency is not None and not pd.isna(efficiency):
+            # batch_items stores the efficiency to 2 decimal places
+            efficiency_sum += round(efficiency, 2)
+            efficiency_count += 1
+        totals[row['item_id']] = (
+            used + (row['total_length_used_mm'] or 0),
+            offcut + (row['total_offcut_length_created_mm'] or 0),
+            efficiency_sum,
+            efficiency_count
         )
-        session.add(offcut)
+    if not totals:
+        return
+    
+    rows = [
+        {
+            'item_id': item_id,
+            'year': batch_date.year,
+            'month': batch_date.month,
+            'total_length_used_mm': used,
+            'total_offcut_length_created_mm': offcut,
+            'usage_efficiency_sum': efficiency_sum,
+            'usage_efficiency_count': efficiency_count
+        }
+        for item_id, (used, offcut, efficiency_sum, efficiency_count) in totals.items()
+    ]
+    table = MonthlyItemRollup.__table__
+    stmt = insert_for_dialect(MonthlyItemRollup).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['item_id', 'year', 'month'],
+        set_={
+            column: table.c[column] + stmt.excluded[column]
+            for column in ('total_length_used_mm', 'total_offcut_length_created_mm',
+                           'usage_efficiency_sum', 'usage_efficiency_count')
+        }
+    ))
 
-def process_suggestions(item_row, batch, batch_detail, session):
-    """Helper function to process suggestions"""
-    # Skip if no valid suggestions
-    if pd.isna(item_row['Suggested Offcut ID(s)']) or str(item_row['Suggested Offcut ID(s)']).lower() == 'none':
+ROLLUP_COLUMNS = ['item_id', 'year', 'month', 'total_length_used_mm', 'total_offcut_length_created_mm',
+                  'usage_efficiency_sum', 'usage_efficiency_count']
+
+def _rollup_aggregate():
+    """batch_items totals per item and month, plus the year and month expressions"""
+    year = extract('year', Batch.batch_date)
+    month = extract('month', Batch.batch_date)
+    aggregate = (
+        select(
+            BatchItem.item_id,
+            year,
+            month,
+            func.coalesce(func.sum(BatchItem.total_length_used_mm), 0),
+            func.coalesce(func.sum(BatchItem.total_offcut_length_created_mm), 0),
+            func.coalesce(func.sum(BatchItem.usage_efficiency), 0),
+            func.count(BatchItem.usage_efficiency)
+        )
+        .join(Batch, BatchItem.batch_id == Batch.batch_id)
+        .where(BatchItem.item_id.isnot(None))
+        .group_by(BatchItem.item_id, year, month)
+    )
+    return aggregate, year, month
+
+def rebuild_monthly_rollups(executor=None):
+    """Recompute every monthly rollup from batch_items in one INSERT ... SELECT.
+
+    executor is a Session or Connection; defaults to db.session. Returns the
+    number of rollup rows written.
+    """
+    executor = executor if executor is not None else db.session
+    aggregate, _, _ = _rollup_aggregate()
+    table = MonthlyItemRollup.__table__
+    executor.execute(delete(table))
+    result = executor.execute(insert(table).from_select(ROLLUP_COLUMNS, aggregate))
+    return result.rowcount
+
+def refresh_monthly_rollups(item_months):
+    """Recompute the rollups for a set of (item_id, year, month) keys from batch_items.
+
+    Deletes call this after removing their rows, in the same transaction,
+    so the months they touched stop counting the deleted data.
+    """
+    item_months = {tuple(int(part) for part in key) for key in item_months}
+    if not item_months:
         return
+    table = MonthlyItemRollup.__table__
+    db.session.execute(delete(table).where(
+        tuple_(table.c.item_id, table.c.year, table.c.month).in_(item_months)
+    ))
+    aggregate, year, month = _rollup_aggregate()
+    db.session.execute(insert(table).from_select(
+        ROLLUP_COLUMNS,
+        aggregate.where(tuple_(BatchItem.item_id, year, month).in_(item_months))
+    ))
+
+def build_offcut_rows(offcut_ids_created, offcut_length, material_profile, double_cut, batch_detail_id):
+    """Build offcut rows for the offcut ID(s) created by one item"""
+    offcut_ids = [int(offcut_id.strip()) for offcut_id in str(offcut_ids_created).split('&')]
+    return [
+        {
+            'legacy_offcut_id': offcut_id,
+            'length_mm': offcut_length,
+            'material_profile': material_profile,
+            'created_in_batch_detail_id': batch_detail_id,
+            'related_legacy_offcut_id': offcut_ids[i-1] if double_cut and i > 0 else None,
+            'is_available': True,
+            'reuse_count': 0
+        }
+        for i, offcut_id in enumerate(offcut_ids)
+    ]
+
+def build_suggestion_row(suggested_offcut_ids, offcut_length, material_profile, batch_id, batch_detail_id):
+    """Build the suggestion row for one item, or None if it has no valid suggestion"""
+    # Skip if no valid suggestions
+    if pd.isna(suggested_offcut_ids) or str(suggested_offcut_ids).lower() == 'none':
+        return None
         
-    suggested_ids = str(item_row['Suggested Offcut ID(s)']).split('&')
+    suggested_ids = str(suggested_offcut_ids).split('&')
     
     # Validate first ID
     try:
         primary_id = int(suggested_ids[0].strip())
     except (ValueError, TypeError):
         print(f"Invalid primary offcut ID: {suggested_ids[0]}")
-        return
+        return None
         
     # Validate second ID if it exists
     secondary_id = None
@@ -341,12 +738,11 @@ def process_suggestions(item_row, batch, batch_detail, session):
             print(f"Invalid secondary offcut ID: {suggested_ids[1]}")
             # Continue with only primary ID
     
-    suggestion = BatchOffcutSuggestion(
-        batch_id=batch.batch_id,
-        offcut_legacy_id_1=primary_id,
-        offcut_legacy_id_2=secondary_id,
-        matched_profile=item_row['Item Description'],
-        suggested_length_mm=item_row['Offcut Length Created'],
-        batch_detail_id=batch_detail.batch_detail_id
-    )
-    session.add(suggestion)
\ No newline at end of file
+    return {
+        'batch_id': batch_id,
+        'offcut_legacy_id_1': primary_id,
+        'offcut_legacy_id_2': secondary_id,
+        'matched_profile': material_profile,
+        'suggested_length_mm': offcut_length,
+        'batch_detail_id': batch_detail_id
+    }
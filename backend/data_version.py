@@ -0,0 +1,26 @@
+from sqlalchemy import insert, select, update
+
+from backend.app import db
+from backend.models import DataVersion
+
+# A single counter covers batches, items, offcuts and their usage history.
+# Caches of derived data (rendered charts, chat answers) key on it, so any
+# worker sees a change as soon as the transaction that bumped it commits.
+DATA = 'data'
+
+
+def bump_data_version(name=DATA):
+    """Advance a data version inside the caller's transaction"""
+    table = DataVersion.__table__
+    result = db.session.execute(
+        update(table).where(table.c.name == name).values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(name=name, version=1))
+
+
+def get_data_version(name=DATA):
+    """Current committed data version, 0 if nothing has bumped it yet"""
+    return db.session.execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar() or 0
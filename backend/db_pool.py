@@ -0,0 +1,92 @@
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+
+from backend.app import app, db
+
+# Every database user in the process borrows from the same pool: the ORM
+# through db.session, and the charts and the chat agent through
+# get_engine()/get_analytics_engine(). Analytics can run under a separate
+# read-only role by pointing ANALYTICS_DATABASE_URL at it; otherwise they
+# share the main pool with read-only transactions on PostgreSQL.
+ANALYTICS_DATABASE_URL = os.getenv('ANALYTICS_DATABASE_URL')
+
+_lock = threading.Lock()
+_engine = None
+_analytics_engine = None
+_counters = {}
+
+
+def _instrument(engine, name):
+    """Count connection lifecycle events for pool_stats()"""
+    counters = _counters.setdefault(name, {'connects': 0, 'checkouts': 0, 'checkins': 0, 'invalidated': 0})
+
+    def bump(key):
+        def listener(*args):
+            counters[key] += 1
+        return listener
+
+    event.listen(engine, 'connect', bump('connects'))
+    event.listen(engine, 'checkout', bump('checkouts'))
+    event.listen(engine, 'checkin', bump('checkins'))
+    event.listen(engine, 'invalidate', bump('invalidated'))
+
+
+def get_engine():
+    """The process-wide engine behind db.session"""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                with app.app_context():
+                    engine = db.engine
+                _instrument(engine, 'primary')
+                _engine = engine
+    return _engine
+
+
+def get_analytics_engine():
+    """Engine for read-only reporting queries (charts, the chat agent)"""
+    global _analytics_engine
+    if _analytics_engine is not None:
+        return _analytics_engine
+
+    engine = get_engine()
+    with _lock:
+        if _analytics_engine is None:
+            if ANALYTICS_DATABASE_URL:
+                _analytics_engine = create_engine(
+                    ANALYTICS_DATABASE_URL, **app.config['SQLALCHEMY_ENGINE_OPTIONS']
+                )
+                _instrument(_analytics_engine, 'analytics')
+            elif engine.dialect.name == 'postgresql':
+                # Same pool; each checkout runs its transactions READ ONLY
+                _analytics_engine = engine.execution_options(postgresql_readonly=True)
+            else:
+                _analytics_engine = engine
+    return _analytics_engine
+
+
+def _describe(engine):
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__, 'status': pool.status()}
+    for attribute in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, attribute):
+            stats[attribute] = getattr(pool, attribute)()
+    return stats
+
+
+def pool_stats():
+    """Current pool occupancy plus lifetime connection counters, per engine"""
+    primary = get_engine()
+    analytics = get_analytics_engine()
+    stats = {'primary': {**_describe(primary), **_counters.get('primary', {})}}
+    if analytics.pool is not primary.pool:
+        stats['analytics'] = {'mode': 'separate read-only role', **_describe(analytics),
+                              **_counters.get('analytics', {})}
+    elif analytics is not primary:
+        stats['analytics'] = {'mode': 'read-only transactions on the primary pool'}
+    else:
+        stats['analytics'] = {'mode': 'primary pool'}
+    return stats
@@ -1,15 +1,13 @@
 import os
-from pandasai import SmartDataframe
-from langchain_openai import ChatOpenAI
-from pandasai.llm import LangchainLLM
 import pandas as pd
-from sqlalchemy import create_engine
-import plotly.express as px
-from backend.chat_agent import llm, DATABASE_URL
-#from backend.chat_agent import DATABASE_URL  # Import your existing LLM and DB connection
+import numpy as np
+import orjson
+from decimal import Decimal
+from backend.db_pool import get_analytics_engine
 from datetime import datetime, timedelta
 import logging
 import gc
+import calendar
 from sqlalchemy import text
 
 # from dotenv import load_dotenv
@@ -20,89 +18,104 @@ from sqlalchemy import text
 # llm = ChatOpenAI(model="gpt-4o", api_key=openai_api_key)  # Example: Replace 'gpt-4' with your desired model
 
 
-def get_materials_data(force_refresh=False, chunk_size=1000):
-    """Get materials data with chunking support"""
+# One aggregate query per chart over the monthly rollups. The database does
+# the grouping, ordering and limiting, so only the plotted rows come back.
+USAGE_OVER_TIME_QUERY = text("""
+    SELECT r.year, r.month AS month_num,
+           SUM(r.total_length_used_mm) AS total_length_used
+    FROM monthly_item_rollups r
+    GROUP BY r.year, r.month
+    ORDER BY r.month, r.year
+""")
+
+TOP_MATERIALS_BY_USAGE_QUERY = text("""
+    SELECT i.item_description, SUM(r.total_length_used_mm) AS total_length_used
+    FROM monthly_item_rollups r
+    JOIN items i ON r.item_id = i.item_id
+    GROUP BY i.item_description
+    ORDER BY total_length_used DESC, i.item_description
+    LIMIT 10
+""")
+
+TOP_ITEMS_BY_OFFCUT_QUERY = text("""
+    SELECT i.item_description, SUM(r.total_offcut_length_created_mm) AS total_offcut_length_created
+    FROM monthly_item_rollups r
+    JOIN items i ON r.item_id = i.item_id
+    GROUP BY i.item_description
+    ORDER BY total_offcut_length_created DESC, i.item_description
+    LIMIT 10
+""")
+
+# Weighted by the batch item counts, i.e. AVG(usage_efficiency) over batch_items
+_EFFICIENCY_BY_ITEM = """
+    SELECT i.item_description,
+           CAST(SUM(r.usage_efficiency_sum) AS FLOAT) / SUM(r.usage_efficiency_count) AS usage_efficiency
+    FROM monthly_item_rollups r
+    JOIN items i ON r.item_id = i.item_id
+    GROUP BY i.item_description
+    HAVING SUM(r.usage_efficiency_count) > 0
+"""
+TOP_EFFICIENCY_QUERY = text(_EFFICIENCY_BY_ITEM + " ORDER BY usage_efficiency DESC, i.item_description LIMIT 5")
+BOTTOM_EFFICIENCY_QUERY = text(_EFFICIENCY_BY_ITEM + " ORDER BY usage_efficiency ASC, i.item_description LIMIT 5")
+
+
+def _fetch(*queries):
+    """Run each aggregate query and return its rows as a DataFrame"""
     try:
-        engine = create_engine(DATABASE_URL)
-        with engine.connect() as connection:
-            # Test query first
-            test_query = "SELECT COUNT(*) FROM batch_items"
-            result = connection.execute(text(test_query)).scalar()
-            print(f"Number of records in batch_items: {result}")
-            
-            if result == 0:
-                raise Exception("No records found in batch_items table")
-            
-            # Query with proper JOINs
-            query = text("""
-                SELECT b.batch_date, i.item_description, 
-                       bi.total_length_used_mm as total_length_used,
-                       bi.total_offcut_length_created_mm as total_offcut_length_created,
-                       bi.usage_efficiency
-                FROM batch_items bi
-                JOIN batches b ON bi.batch_id = b.batch_id
-                JOIN items i ON bi.item_id = i.item_id
-                ORDER BY b.batch_date
-            """)
-            
-            # Execute query with chunking
-            result = connection.execution_options(stream_results=True).execute(query)
-            while True:
-                chunk = result.fetchmany(chunk_size)
-                if not chunk:
-                    break
-                df_chunk = pd.DataFrame(chunk)
-                if not df_chunk.empty:
-                    yield df_chunk
-                    
+        # Borrowed from the shared pool, so no new connection per chart
+        with get_analytics_engine().connect() as connection:
+            frames = []
+            for query in queries:
+                result = connection.execute(query)
+                frames.append(pd.DataFrame(result.fetchall(), columns=list(result.keys())))
+            return frames
     except Exception as e:
-        logging.error(f"Database error in get_materials_data: {str(e)}")
+        logging.error(f"Database error in visualization query: {str(e)}")
         raise
-    finally:
-        engine.dispose()
+
+
+def usage_over_time_data():
+    """Total length used per month, one row per year and month, in metres"""
+    agg_data, = _fetch(USAGE_OVER_TIME_QUERY)
+    agg_data['month_name'] = agg_data['month_num'].astype(int).map(lambda month: calendar.month_abbr[month])
+    # Convert year to string so that Plotly treats it as a discrete category.
+    agg_data['year'] = agg_data['year'].astype(int).astype(str)
+    # Convert total_length_used from millimeters to meters
+    agg_data['total_length_used'] = agg_data['total_length_used'].astype(float) / 1000
+    return agg_data
+
+
+def top_materials_by_usage_data():
+    """The 10 items with the most length used, in metres"""
+    top_materials, = _fetch(TOP_MATERIALS_BY_USAGE_QUERY)
+    top_materials['total_length_used'] = top_materials['total_length_used'].astype(float) / 1000
+    return top_materials
+
+
+def top_items_by_offcut_data():
+    """The 10 items with the most offcut length created, smallest first for a horizontal chart"""
+    top_offcuts, = _fetch(TOP_ITEMS_BY_OFFCUT_QUERY)
+    top_offcuts['total_offcut_length_created'] = top_offcuts['total_offcut_length_created'].astype(float)
+    return top_offcuts.iloc[::-1].reset_index(drop=True)
+
+
+def efficiency_extremes_data():
+    """The 5 most and 5 least efficient items, each block in descending order"""
+    top_5, bottom_5 = _fetch(TOP_EFFICIENCY_QUERY, BOTTOM_EFFICIENCY_QUERY)
+    efficiency_data = pd.concat([top_5, bottom_5.iloc[::-1]], ignore_index=True)
+    efficiency_data['usage_efficiency'] = efficiency_data['usage_efficiency'].astype(float)
+    return efficiency_data
+
 
 def create_visualization(query_prompt: str):
+    # Deferred: plotly.express is only needed once a chart is rendered
+    import plotly.express as px
+
     try:
-        chunks = list(get_materials_data())
-        
-        if not chunks:
-            raise Exception("No data available in the database")
-            
         if query_prompt == "Create bar charts showing total material usage over time":
-            all_data = []
-            
-            for chunk in chunks:
-                if chunk.empty:
-                    continue
-                    
-                try:
-                    # Convert batch_date to datetime and extract year and month details
-                    chunk['batch_date'] = pd.to_datetime(chunk['batch_date'])
-                    chunk['year'] = chunk['batch_date'].dt.year
-                    chunk['month_num'] = chunk['batch_date'].dt.month
-                    chunk['month_name'] = chunk['batch_date'].dt.strftime('%b')
-                    
-                    # Group by year and month, summing total_length_used for each group
-                    chunk_data = chunk.groupby(['year', 'month_num', 'month_name'])['total_length_used'].sum().reset_index()
-                    all_data.append(chunk_data)
-                except Exception as e:
-                    logging.error(f"Error processing chunk: {str(e)}")
-                    continue
-            
-            if not all_data:
-                raise Exception("No valid data available for visualization")
-            
-            agg_data = pd.concat(all_data, ignore_index=True)
-            # Consolidate groups that may be split across chunks
-            agg_data = agg_data.groupby(['year', 'month_num', 'month_name'])['total_length_used'].sum().reset_index()
-            # Sort the data by month number and year
-            agg_data = agg_data.sort_values(['month_num', 'year'])
-            
-            # Convert year to string so that Plotly treats it as a discrete category.
-            agg_data['year'] = agg_data['year'].astype(str)
-
-            # Convert total_length_used from millimeters to meters
-            agg_data['total_length_used'] = agg_data['total_length_used'] / 1000
+            agg_data = usage_over_time_data()
+            if agg_data.empty:
+                raise Exception("No data available in the database")
             
             # Create an unstacked (grouped) column chart using Plotly Express with light green and light blue colors
             fig = px.bar(
@@ -124,29 +137,12 @@ def create_visualization(query_prompt: str):
             # Ensure the legend is shown with an appropriate title
             fig.update_layout(legend_title_text='Year', showlegend=True)
             
-            return _make_json_serializable(fig)
+            return figure_json(fig)
         
         elif query_prompt == "Create a bar chart showing the top 10 materials by Total Length Used":
-            # Process chunks individually and maintain running totals
-            material_totals = {}
-            
-            for chunk in chunks:
-                # Process each chunk
-                chunk_totals = chunk.groupby('item_description')['total_length_used'].sum()
-                
-                # Update running totals
-                for material, total in chunk_totals.items():
-                    material_totals[material] = material_totals.get(material, 0) + total
-            
-            # Convert to DataFrame and get top 10
-            top_materials = (pd.Series(material_totals)
-                             .sort_values(ascending=False)
-                             .head(10)
-                             .reset_index())
-            top_materials.columns = ['item_description', 'total_length_used']
-            
-            # Convert total_length_used from millimeters to meters
-            top_materials['total_length_used'] = top_materials['total_length_used'] / 1000
+            top_materials = top_materials_by_usage_data()
+            if top_materials.empty:
+                raise Exception("No data available in the database")
             
             # Explicitly set a built-in template and override the default pattern shape sequence
             fig = px.bar(
@@ -163,26 +159,12 @@ def create_visualization(query_prompt: str):
             )
             
             fig.update_xaxes(tickangle=-35)
-            return _make_json_serializable(fig)
+            return figure_json(fig)
         
         elif query_prompt == "Create a bar chart showing top 10 items by total offcut length":
-            # Process chunks individually and maintain running totals
-            offcut_totals = {}
-            
-            for chunk in chunks:
-                # Process each chunk
-                chunk_totals = chunk.groupby('item_description')['total_offcut_length_created'].sum()
-                
-                # Update running totals
-                for item, total in chunk_totals.items():
-                    offcut_totals[item] = offcut_totals.get(item, 0) + total
-            
-            # Convert to DataFrame and get top 10
-            top_offcuts = (pd.Series(offcut_totals)
-                          .sort_values(ascending=True)
-                          .head(10)
-                          .reset_index())
-            top_offcuts.columns = ['item_description', 'total_offcut_length_created']
+            top_offcuts = top_items_by_offcut_data()
+            if top_offcuts.empty:
+                raise Exception("No data available in the database")
             
             fig = px.bar(top_offcuts,
                         x='total_offcut_length_created',
@@ -193,45 +175,12 @@ def create_visualization(query_prompt: str):
                                'total_offcut_length_created': 'Total Offcut Length (mm)'})
             
             fig.update_yaxes(tickangle=-5)
-            return _make_json_serializable(fig)
+            return figure_json(fig)
         
         elif query_prompt == "Create a visualization of top and bottom 5 materials by efficiency":
-            # Process chunks individually and maintain running averages
-            efficiency_totals = {}
-            efficiency_counts = {}
-            
-            for chunk in chunks:
-                # Process each chunk
-                chunk_groups = chunk.groupby('item_description')
-                
-                # Update running totals and counts for calculating mean
-                for name, group in chunk_groups:
-                    # Convert usage_efficiency to numeric, handling any non-numeric values
-                    eff_values = pd.to_numeric(group['usage_efficiency'], errors='coerce')
-                    eff_sum = eff_values.sum()
-                    eff_count = eff_values.count()  # Only counts non-null values
-                    
-                    if eff_count > 0:  # Only update if we have valid values
-                        efficiency_totals[name] = efficiency_totals.get(name, 0) + eff_sum
-                        efficiency_counts[name] = efficiency_counts.get(name, 0) + eff_count
-            
-            # Calculate averages and ensure numeric type
-            avg_efficiency = {
-                name: float(efficiency_totals[name] / efficiency_counts[name])
-                for name in efficiency_totals.keys()
-                if efficiency_counts[name] > 0
-            }
-            
-            # Convert to Series with explicit numeric dtype
-            avg_efficiency = pd.Series(avg_efficiency, dtype=float)
-            
-            # Get top and bottom 5
-            top_5 = avg_efficiency.nlargest(5)
-            bottom_5 = avg_efficiency.nsmallest(5).sort_values(ascending=False)
-            
-            # Combine and reset index
-            efficiency_data = pd.concat([top_5, bottom_5]).reset_index()
-            efficiency_data.columns = ['item_description', 'usage_efficiency']
+            efficiency_data = efficiency_extremes_data()
+            if efficiency_data.empty:
+                raise Exception("No data available in the database")
             
             colors = ['green']*5 + ['red']*5
             
@@ -247,7 +196,7 @@ def create_visualization(query_prompt: str):
             fig.update_layout(yaxis={'autorange': 'reversed'})
             fig.update_yaxes(tickangle=-5)
             
-            return _make_json_serializable(fig)
+            return figure_json(fig)
         
         else:
             raise Exception("Invalid visualization type selected")
@@ -256,25 +205,25 @@ def create_visualization(query_prompt: str):
         logging.error(f"Visualization error: {str(e)}")
         raise
 
-def _make_json_serializable(fig):
-    """Convert a Plotly figure to JSON-serializable format"""
-    # First convert the figure to a dict
-    fig_dict = fig.to_dict()
-    
-    # Function to convert numpy types to native Python types
-    def convert_numpy(obj):
-        import numpy as np
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, dict):
-            return {key: convert_numpy(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [convert_numpy(item) for item in obj]
-        return obj
-    
-    # Convert all numpy types in the figure dict
-    return convert_numpy(fig_dict)
\ No newline at end of file
+def _json_default(obj):
+    """Encode the values orjson has no native support for"""
+    if isinstance(obj, np.ndarray):
+        # Object and non-contiguous arrays, e.g. the category labels
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def figure_json(fig):
+    """Encode a Plotly figure straight to JSON bytes in a single pass.
+
+    to_plotly_json() hands back the figure's own dicts without the deep copy
+    to_dict() makes, and orjson writes NumPy arrays from their buffers.
+    """
+    return orjson.dumps(fig.to_plotly_json(), default=_json_default,
+                        option=orjson.OPT_SERIALIZE_NUMPY)
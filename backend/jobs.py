@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Job records live in a small SQLite file so every gunicorn worker on the
+# instance can report on a job, whichever worker is running it.
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'offcut_jobs.sqlite3'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Finished job records are removed after this many seconds
+JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', str(24 * 3600)))
+# A progress stream ends after this many seconds and the client reconnects.
+# The sync worker holds one request at a time and only heartbeats between
+# requests, so a stream that lasted the whole job would block every other
+# request and get the worker killed once a parse ran past gunicorn's timeout.
+JOB_STREAM_SECONDS = int(os.getenv('JOB_STREAM_SECONDS', '5'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+TERMINAL_STATUSES = {SUCCEEDED, FAILED}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@contextmanager
+def _connect():
+    """Short-lived connection that commits on success and is always closed.
+
+    The schema is ensured on every connect, not once per process: the file
+    lives in the temp dir and may be cleaned up under a running worker.
+    """
+    os.makedirs(os.path.dirname(JOB_DB_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(JOB_DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    try:
+        _create_schema(conn)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _create_schema(conn):
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            stage TEXT,
+            progress INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            pid INTEGER,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+        return _executor
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def create_job(kind):
+    """Record a new queued job and return its ID"""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, kind, status, stage, progress, pid, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+            (job_id, kind, QUEUED, 'queued', os.getpid(), now, now)
+        )
+        # Opportunistically drop old finished jobs
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (SUCCEEDED, FAILED, now - JOB_RETENTION_SECONDS)
+        )
+    return job_id
+
+
+def update_job(job_id, **fields):
+    """Update a job record; result and error values are stored as JSON"""
+    for key in ('result', 'error'):
+        if key in fields:
+            fields[key] = json.dumps(fields[key], default=str)
+    fields['updated_at'] = time.time()
+    assignments = ', '.join(f"{key} = ?" for key in fields)
+    with _connect() as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+
+def get_job(job_id):
+    """Return a job record as a dict, or None if it doesn't exist"""
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+
+    job = dict(row)
+    for key in ('result', 'error'):
+        if job[key] is not None:
+            job[key] = json.loads(job[key])
+
+    # A job left running by a worker that has since exited will never finish
+    if job['status'] not in TERMINAL_STATUSES and job['pid'] and not _pid_alive(job['pid']):
+        job['status'] = FAILED
+        job['error'] = {'error': 'interrupted', 'message': 'The worker running this job stopped'}
+        update_job(job_id, status=FAILED, error=job['error'])
+    return job
+
+
+def submit_job(kind, app, fn, *args, **kwargs):
+    """Run fn(*args, progress=..., **kwargs) on the worker pool.
+
+    fn runs inside an application context and reports progress by calling
+    progress(stage, percent, message=None). Its return value becomes the
+    job result. If it raises, the job fails with the error message, or with
+    the exception's first argument when that is a dict.
+    """
+    job_id = create_job(kind)
+
+    def progress(stage, percent, message=None):
+        update_job(job_id, status=RUNNING, stage=stage, progress=percent, message=message)
+
+    def run():
+        with app.app_context():
+            update_job(job_id, status=RUNNING, stage='starting')
+            try:
+                result = fn(*args, progress=progress, **kwargs)
+                update_job(job_id, status=SUCCEEDED, stage='complete', progress=100, result=result)
+            except Exception as e:
+                print(f"Job {job_id} ({kind}) failed: {str(e)}")
+                print("Traceback:", traceback.format_exc())
+                error = e.args[0] if e.args and isinstance(e.args[0], dict) else {'error': str(e)}
+                update_job(job_id, status=FAILED, error=error)
+
+    _get_executor().submit(run)
+    return job_id
+
+
+def watch_job(job_id, poll_interval=0.5, keepalive_seconds=15, max_seconds=None):
+    """Yield the job record each time it changes, until it finishes.
+
+    Yields None every keepalive_seconds without a change so a caller
+    streaming to a client can send a keep-alive. With max_seconds, stops
+    after that long even if the job is still running.
+    """
+    last_seen = None
+    last_sent = started = time.monotonic()
+    while max_seconds is None or time.monotonic() - started < max_seconds:
+        job = get_job(job_id)
+        if job is None:
+            return
+        if job['updated_at'] != last_seen or job['status'] in TERMINAL_STATUSES:
+            last_seen = job['updated_at']
+            last_sent = time.monotonic()
+            yield job
+            if job['status'] in TERMINAL_STATUSES:
+                return
+        elif time.monotonic() - last_sent >= keepalive_seconds:
+            last_sent = time.monotonic()
+            yield None
+        time.sleep(poll_interval)
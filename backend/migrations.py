@@ -0,0 +1,112 @@
+from datetime import datetime
+
+import click
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+
+from backend.app import db
+
+# Versioned schema changes, applied in order by `flask --app wsgi db-upgrade`.
+# Every migration must be safe to re-run: tables created by db.create_all()
+# before the migration was recorded are detected rather than recreated.
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register fn(connection) as the migration for a schema version"""
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return fn
+    return register
+
+
+def current_version(connection=None):
+    """Highest applied migration version, or 0 before any have run"""
+    if connection is None:
+        with db.engine.connect() as connection:
+            return current_version(connection)
+    if not inspect(connection).has_table('schema_migrations'):
+        return 0
+    return connection.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def upgrade():
+    """Apply every pending migration, each in its own transaction"""
+    with db.engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        applied = current_version(connection)
+
+    pending = [entry for entry in MIGRATIONS if entry[0] > applied]
+    for version, name, fn in pending:
+        with db.engine.begin() as connection:
+            fn(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()
+            ))
+        print(f"Applied migration {version}: {name}")
+    if not pending:
+        print(f"Database schema is up to date at version {applied}")
+    return len(pending)
+
+
+def register_commands(app):
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """Apply pending database migrations."""
+        upgrade()
+
+    @app.cli.command('db-version')
+    def db_version_command():
+        """Show the current database schema version."""
+        click.echo(current_version())
+
+
+@migration(1, 'monthly item rollups')
+def _create_monthly_item_rollups(connection):
+    from backend.models import MonthlyItemRollup
+    from backend.data_pipeline import rebuild_monthly_rollups
+
+    MonthlyItemRollup.__table__.create(connection, checkfirst=True)
+    rebuild_monthly_rollups(connection)
+
+
+@migration(2, 'data versions')
+def _create_data_versions(connection):
+    from backend.models import DataVersion
+
+    DataVersion.__table__.create(connection, checkfirst=True)
+    exists = connection.execute(
+        select(DataVersion.version).where(DataVersion.name == 'data')
+    ).first()
+    if exists is None:
+        connection.execute(DataVersion.__table__.insert().values(name='data', version=1))
+
+
+@migration(3, 'hot filter indexes')
+def _create_hot_filter_indexes(connection):
+    from backend.models import Batch, BatchDetail, BatchItem, Offcut, OffcutUsageHistory
+
+    for model in (Batch, BatchDetail, BatchItem, Offcut, OffcutUsageHistory):
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+
+@migration(4, 'cascade item deletes to monthly rollups')
+def _cascade_rollup_item_fk(connection):
+    from backend.models import MonthlyItemRollup
+    from backend.data_pipeline import rebuild_monthly_rollups
+
+    # The rollups are derived data, so the table is recreated with the
+    # ON DELETE CASCADE foreign key and refilled rather than altered
+    table = MonthlyItemRollup.__table__
+    table.drop(connection, checkfirst=True)
+    table.create(connection)
+    rebuild_monthly_rollups(connection)
@@ -8,6 +8,9 @@ class Batch(db.Model):
     batch_date = db.Column(db.Date, nullable=False)
     details = db.relationship('BatchDetail', backref='batch', lazy=True)
     items = db.relationship('BatchItem', backref='batch', lazy=True)
+    __table_args__ = (
+        db.Index('ix_batches_batch_date', 'batch_date'),
+    )
 
 class BatchDetail(db.Model):
     __tablename__ = 'batch_details'
@@ -15,6 +18,9 @@ class BatchDetail(db.Model):
     batch_id = db.Column(db.Integer, db.ForeignKey('batches.batch_id', ondelete='CASCADE'), nullable=False)
     saw_name = db.Column(db.String(50))
     source_file = db.Column(db.Text)
+    __table_args__ = (
+        db.Index('ix_batch_details_batch_id', 'batch_id'),
+    )
 
 class Item(db.Model):
     __tablename__ = 'items'
@@ -34,6 +40,18 @@ class Offcut(db.Model):
     is_available = db.Column(db.Boolean, default=True)
     reuse_count = db.Column(db.Integer, default=0)
     usage_history = db.relationship('OffcutUsageHistory', backref='offcut', lazy=True)
+    __table_args__ = (
+        # Recommendation lookups: available offcuts of a profile by length.
+        # Partial, so offcuts that have been used never enter the index.
+        db.Index('ix_offcuts_available_profile_length', 'material_profile', 'length_mm',
+                 postgresql_where=db.text('is_available'),
+                 sqlite_where=db.text('is_available = 1'),
+                 postgresql_include=['legacy_offcut_id', 'related_legacy_offcut_id']),
+        # The admin listing of available offcuts, newest batch first
+        db.Index('ix_offcuts_available_created', 'created_in_batch_detail_id', 'offcut_id',
+                 postgresql_where=db.text('is_available'),
+                 sqlite_where=db.text('is_available = 1')),
+    )
 
 class BatchItem(db.Model):
     __tablename__ = 'batch_items'
@@ -49,6 +67,9 @@ class BatchItem(db.Model):
     double_cut = db.Column(db.Boolean)
     waste_percentage = db.Column(db.Numeric(5, 2))
     usage_efficiency = db.Column(db.Numeric(5, 2))
+    __table_args__ = (
+        db.Index('ix_batch_items_batch_id', 'batch_id'),
+    )
 
 class BatchOffcutSuggestion(db.Model):
     __tablename__ = 'batch_offcut_suggestions'
@@ -67,3 +88,23 @@ class OffcutUsageHistory(db.Model):
     batch_id = db.Column(db.Integer, db.ForeignKey('batches.batch_id'), nullable=False)
     reuse_success = db.Column(db.Boolean)
     reuse_date = db.Column(db.Date, default=func.current_date())
+    __table_args__ = (
+        db.Index('ix_offcut_usage_history_offcut_id', 'offcut_id'),
+    )
+
+class MonthlyItemRollup(db.Model):
+    """Batch item totals per item per calendar month, kept up to date by ingest"""
+    __tablename__ = 'monthly_item_rollups'
+    item_id = db.Column(db.Integer, db.ForeignKey('items.item_id', ondelete='CASCADE'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    total_length_used_mm = db.Column(db.BigInteger, nullable=False, default=0)
+    total_offcut_length_created_mm = db.Column(db.BigInteger, nullable=False, default=0)
+    usage_efficiency_sum = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    usage_efficiency_count = db.Column(db.Integer, nullable=False, default=0)
+
+class DataVersion(db.Model):
+    """Counter bumped in the same transaction as any change the dashboards read"""
+    __tablename__ = 'data_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,101 @@
+from bisect import bisect_left, insort
+from backend.models import Offcut
+
+
+def available_offcuts_query(material_profiles):
+    """Query for every available offcut in the given material profiles"""
+    return Offcut.query.with_entities(
+        Offcut.material_profile,
+        Offcut.length_mm,
+        Offcut.legacy_offcut_id,
+        Offcut.related_legacy_offcut_id
+    ).filter(
+        Offcut.is_available == True,
+        Offcut.material_profile.in_(list(material_profiles))
+    )
+
+
+def available_offcuts_listing():
+    """Query and page keys for the admin listing of available offcuts, newest batch first"""
+    return (
+        Offcut.query.filter_by(is_available=True),
+        [(Offcut.created_in_batch_detail_id, True), (Offcut.offcut_id, True)]
+    )
+
+
+class OffcutIndex:
+    """In-memory index of available offcuts, kept sorted per material profile.
+
+    Each profile holds a list of (length_mm, legacy_offcut_id) tuples in
+    ascending order so the smallest offcut that fits a required length is a
+    single bisect away. Ties on length are broken by legacy_offcut_id so the
+    result does not depend on the order rows came back from the database.
+    """
+
+    def __init__(self, rows=()):
+        self._profiles = {}
+        self._related = {}
+        for material_profile, length_mm, legacy_offcut_id, related_legacy_offcut_id in rows:
+            self._profiles.setdefault(material_profile, []).append((length_mm, legacy_offcut_id))
+            self._related[legacy_offcut_id] = related_legacy_offcut_id
+        for offcuts in self._profiles.values():
+            offcuts.sort()
+
+    @classmethod
+    def load(cls, material_profiles):
+        """Load available offcuts for the given profiles in a single query"""
+        material_profiles = set(material_profiles)
+        if not material_profiles:
+            return cls()
+        return cls(available_offcuts_query(material_profiles).all())
+
+    def profiles(self):
+        return list(self._profiles)
+
+    def offcuts(self, material_profile):
+        """Sorted (length_mm, legacy_offcut_id) tuples still available for a profile"""
+        return list(self._profiles.get(material_profile, ()))
+
+    def related_id(self, legacy_offcut_id):
+        return self._related.get(legacy_offcut_id)
+
+    def count(self, material_profile):
+        return len(self._profiles.get(material_profile, ()))
+
+    def find(self, material_profile, required_length, n=1):
+        """Return the n smallest offcuts with length >= required_length.
+
+        Returns an empty list when fewer than n offcuts fit, mirroring the
+        all-or-nothing behaviour double cuts need.
+        """
+        offcuts = self._profiles.get(material_profile)
+        if not offcuts:
+            return []
+        start = bisect_left(offcuts, (required_length,))
+        if len(offcuts) - start < n:
+            return []
+        return offcuts[start:start + n]
+
+    def remove(self, material_profile, offcut):
+        """Remove a (length_mm, legacy_offcut_id) entry from the index"""
+        offcuts = self._profiles[material_profile]
+        pos = bisect_left(offcuts, offcut)
+        if pos == len(offcuts) or offcuts[pos] != offcut:
+            raise KeyError(f"Offcut {offcut[1]} is not indexed under {material_profile}")
+        del offcuts[pos]
+
+    def add(self, material_profile, offcut):
+        """Return a (length_mm, legacy_offcut_id) entry to the index"""
+        insort(self._profiles.setdefault(material_profile, []), offcut)
+
+    def take(self, material_profile, required_length, n=1):
+        """Find and remove the n smallest offcuts that fit required_length"""
+        offcuts = self._profiles.get(material_profile)
+        if not offcuts:
+            return []
+        start = bisect_left(offcuts, (required_length,))
+        if len(offcuts) - start < n:
+            return []
+        found = offcuts[start:start + n]
+        del offcuts[start:start + n]
+        return found
@@ -0,0 +1,58 @@
+from sqlalchemy import func, insert, update
+
+from backend.app import db
+from backend.models import Offcut, OffcutUsageHistory
+
+
+class InvalidOffcutIds(ValueError):
+    """The offcut IDs are not a list of integers"""
+
+
+def normalise_offcut_ids(offcut_ids):
+    """offcut_ids from a request body as ints; numeric strings such as "12" are accepted"""
+    if not isinstance(offcut_ids, (list, tuple)):
+        raise InvalidOffcutIds('offcut_ids must be a list of integers')
+    normalised = []
+    for offcut_id in offcut_ids:
+        if isinstance(offcut_id, bool) or not isinstance(offcut_id, (int, str)):
+            raise InvalidOffcutIds(f'Invalid offcut ID: {offcut_id!r}')
+        try:
+            normalised.append(int(offcut_id))
+        except ValueError:
+            raise InvalidOffcutIds(f'Invalid offcut ID: {offcut_id!r}')
+    return normalised
+
+
+def reserve_offcuts(offcut_ids, batch_id, reuse_date=None):
+    """Mark offcuts as used by a batch and record their usage history.
+
+    One UPDATE ... RETURNING claims every requested offcut that is still
+    available, and one executemany inserts their history rows. The
+    is_available condition makes concurrent reservations safe: the second
+    transaction to reach a row waits on its lock, re-checks the condition
+    and skips it. Returns (reserved_ids, unavailable_ids); the caller
+    decides whether a partial reservation should be committed. Raises
+    InvalidOffcutIds if an ID is not an integer.
+    """
+    offcut_ids = list(dict.fromkeys(normalise_offcut_ids(offcut_ids)))
+    if not offcut_ids:
+        return [], []
+
+    table = Offcut.__table__
+    result = db.session.execute(
+        update(table)
+        .where(table.c.offcut_id.in_(offcut_ids), table.c.is_available == True)
+        .values(is_available=False, reuse_count=func.coalesce(table.c.reuse_count, 0) + 1)
+        .returning(table.c.offcut_id)
+    )
+    reserved = set(result.scalars())
+
+    history = {'batch_id': batch_id, 'reuse_success': True}
+    if reuse_date is not None:
+        history['reuse_date'] = reuse_date
+    rows = [dict(history, offcut_id=offcut_id) for offcut_id in offcut_ids if offcut_id in reserved]
+    if rows:
+        db.session.execute(insert(OffcutUsageHistory.__table__), rows)
+
+    return ([offcut_id for offcut_id in offcut_ids if offcut_id in reserved],
+            [offcut_id for offcut_id in offcut_ids if offcut_id not in reserved])
@@ -0,0 +1,150 @@
+import base64
+import binascii
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import and_, or_, false
+from sqlalchemy.orm import load_only
+
+# Keyset pagination for the listing endpoints. A page is the next `limit`
+# rows after the cursor in a fixed key order, so every page costs the same
+# however large the table grows: no OFFSET scan and no COUNT(*). One extra
+# row is fetched to tell whether another page follows.
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '500'))
+
+Page = namedtuple('Page', ['limit', 'cursor', 'fields'])
+
+
+class PaginationError(ValueError):
+    """The limit, cursor or fields parameter is invalid"""
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(values, list):
+        raise PaginationError('Invalid cursor')
+    return values
+
+
+def parse_page_args(allowed_fields):
+    """Read limit, cursor and fields from the query string"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise PaginationError('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise PaginationError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    cursor = request.args.get('cursor')
+    cursor = decode_cursor(cursor) if cursor else None
+
+    fields = request.args.get('fields')
+    if fields:
+        fields = tuple(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return Page(limit, cursor, fields or None)
+
+
+def _cursor_value(column, value):
+    """value checked, or converted back from its JSON form, for column's type"""
+    if value is None:
+        if column.nullable:
+            return None
+        raise PaginationError('Invalid cursor')
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    # Dates and decimals were written to the cursor as strings
+    if python_type in (date, datetime, Decimal) and isinstance(value, str):
+        try:
+            return Decimal(value) if python_type is Decimal else python_type.fromisoformat(value)
+        except (ValueError, InvalidOperation):
+            raise PaginationError('Invalid cursor')
+    if isinstance(value, bool) != (python_type is bool) or not isinstance(value, python_type):
+        raise PaginationError('Invalid cursor')
+    return value
+
+
+def _order(column, descending):
+    # NULLs sort as the largest value, PostgreSQL's B-tree order, so one
+    # ascending index serves the key in either direction. Spelled out so
+    # SQLite, where NULLs are smallest, pages the same way.
+    return column.desc().nullsfirst() if descending else column.asc().nullslast()
+
+
+def _after(column, descending, value):
+    """Rows that sort strictly after value in this column"""
+    if descending:
+        return column.isnot(None) if value is None else column < value
+    if value is None:
+        return false()
+    return or_(column > value, column.is_(None)) if column.nullable else column > value
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def page_query(query, keys, page):
+    """query narrowed to one page: rows after the cursor in key order, plus one.
+
+    keys is a list of (column, descending) pairs that ends with a unique
+    column, such as the primary key, so the order is total.
+    """
+    if page.cursor is not None:
+        if len(page.cursor) != len(keys):
+            raise PaginationError('Invalid cursor')
+        cursor = [_cursor_value(column, value) for (column, _), value in zip(keys, page.cursor)]
+        clauses = []
+        for i, (column, descending) in enumerate(keys):
+            prefix = [_equal(keys[j][0], cursor[j]) for j in range(i)]
+            clauses.append(and_(*prefix, _after(column, descending, cursor[i])))
+        query = query.filter(or_(*clauses))
+
+    if page.fields:
+        model = query.column_descriptions[0]['entity']
+        names = dict.fromkeys(list(page.fields) + [column.key for column, _ in keys])
+        query = query.options(load_only(*(getattr(model, name) for name in names)))
+
+    return query.order_by(*(_order(column, descending) for column, descending in keys))\
+        .limit(page.limit + 1)
+
+
+def fetch_page(query, keys, page):
+    """Return (rows, next_cursor) for one page of query, ordered by keys"""
+    rows = page_query(query, keys, page).all()
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column, _ in keys])
+
+
+def page_headers(page, next_cursor):
+    """X-Has-More, X-Next-Cursor and a Link to the next page"""
+    headers = {'X-Has-More': 'true' if next_cursor else 'false'}
+    if next_cursor:
+        args = request.args.to_dict()
+        args.update(cursor=next_cursor, limit=str(page.limit))
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return headers
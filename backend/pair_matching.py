@@ -0,0 +1,154 @@
+import numpy as np
+
+
+def match_double_cuts(required_lengths, lengths, legacy_ids, related_ids, prefer_siblings=True):
+    """Pair every double-cut instruction of one profile with two offcuts.
+
+    required_lengths holds one entry per double-cut instruction. lengths,
+    legacy_ids and related_ids describe the available offcuts, sorted by
+    (length, legacy id); related_ids uses -1 where an offcut has no sibling.
+
+    Instructions are served shortest first, each on the shortest offcuts
+    that still fit, which matches as many instructions as possible. With
+    prefer_siblings, pairs that were cut together (linked through
+    related_legacy_offcut_id) then replace loose pairs wherever that still
+    leaves every one of those instructions served, so siblings never cost
+    a match.
+
+    Returns (first, second, is_sibling): offcut positions for each instruction
+    in the order given (-1 when unmatched) and whether the pair are siblings.
+    """
+    required_lengths = np.asarray(required_lengths, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    legacy_ids = np.asarray(legacy_ids, dtype=np.int64)
+    related_ids = np.asarray(related_ids, dtype=np.int64)
+
+    first = np.full(len(required_lengths), -1, dtype=np.int64)
+    second = np.full(len(required_lengths), -1, dtype=np.int64)
+    is_sibling = np.zeros(len(required_lengths), dtype=bool)
+    if len(required_lengths) == 0 or len(lengths) < 2:
+        return first, second, is_sibling
+
+    # Shortest requirement first; stable so equal lengths keep input order
+    order = np.argsort(required_lengths, kind='stable')
+    # Loose pairing serves the longest prefix of that order that can be served
+    slots = _assign_slots(lengths, required_lengths[order], stride=2)
+    servable = order[slots + 1 < len(lengths)]
+    pending = servable
+    used = np.zeros(len(lengths), dtype=bool)
+
+    if prefer_siblings and len(servable):
+        pair_a, pair_b = _sibling_pairs(legacy_ids, related_ids)
+        served, a, b = _place_siblings(required_lengths[servable], lengths, pair_a, pair_b)
+        if len(served):
+            instructions = servable[served]
+            first[instructions] = a
+            second[instructions] = b
+            is_sibling[instructions] = True
+            used[a] = True
+            used[b] = True
+            pending = np.delete(servable, served)
+
+    if len(pending):
+        free = np.flatnonzero(~used)
+        slots = _assign_slots(lengths[free], required_lengths[pending], stride=2)
+        matched = slots + 1 < len(free)
+        served = pending[matched]
+        first[served] = free[slots[matched]]
+        second[served] = free[slots[matched] + 1]
+
+    return first, second, is_sibling
+
+
+def _place_siblings(required, lengths, pair_a, pair_b):
+    """Give sibling pairs to requirements without losing any requirement.
+
+    required is sorted and can all be served by loose pairs. By Hall's
+    condition that holds while, for every suffix of required starting at j,
+    at least twice its size of free offcuts reach required[j]; slack[j] is
+    the surplus. Handing pair (a <= b) to requirement k removes k and both
+    offcuts, which costs 2 slack at each later j with required[j] <= a and
+    1 where a < required[j] <= b. So each pair, shortest first, goes to the
+    longest unserved requirement it fits, and only if no slack goes negative.
+
+    Returns (requirement positions, shorter offcut, longer offcut) per pair placed.
+    """
+    if len(pair_a) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # Keep the shorter offcut first, as the loose path does
+    swap = lengths[pair_b] < lengths[pair_a]
+    short, long = np.where(swap, pair_b, pair_a), np.where(swap, pair_a, pair_b)
+    by_length = np.argsort(lengths[short], kind='stable')
+    short, long = short[by_length], long[by_length]
+
+    count = len(required)
+    reach = len(lengths) - np.searchsorted(lengths, required, side='left')
+    slack = reach - 2 * (count - np.arange(count, dtype=np.int64))
+    fits_short = np.searchsorted(required, lengths[short], side='right')
+    fits_long = np.searchsorted(required, lengths[long], side='right')
+
+    # unserved[k] is the nearest unserved position at or before k (-1 for none)
+    unserved = list(range(count))
+
+    def nearest_unserved(k):
+        root = k
+        while root >= 0 and unserved[root] != root:
+            root = unserved[root]
+        while k >= 0 and unserved[k] != k:
+            unserved[k], k = root, unserved[k]
+        return root
+
+    placed = []
+    for i in range(len(short)):
+        if fits_short[i] == 0:
+            continue
+        k = nearest_unserved(fits_short[i] - 1)
+        if k < 0:
+            continue
+        both, one = slack[k + 1:fits_short[i]], slack[fits_short[i]:fits_long[i]]
+        if (len(both) and both.min() < 2) or (len(one) and one.min() < 1):
+            continue
+        both -= 2
+        one -= 1
+        unserved[k] = k - 1
+        placed.append((k, short[i], long[i]))
+
+    if not placed:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    served, a, b = (np.array(column, dtype=np.int64) for column in zip(*placed))
+    return served, a, b
+
+
+def _assign_slots(sorted_lengths, sorted_required, stride):
+    """Earliest non-overlapping slot for each requirement, vectorised.
+
+    Requirement i needs `stride` consecutive slots starting at or after the
+    first length that fits it, and after the slots of requirement i - 1:
+    s[i] = max(fit[i], s[i-1] + stride). Subtracting stride * i turns the
+    recurrence into a running maximum, so no Python loop is needed.
+    """
+    fit = np.searchsorted(sorted_lengths, sorted_required, side='left')
+    offset = stride * np.arange(len(sorted_required), dtype=np.int64)
+    return offset + np.maximum.accumulate(fit - offset)
+
+
+def _sibling_pairs(legacy_ids, related_ids):
+    """Positions of offcut pairs where one names the other as its related offcut.
+
+    Offcuts that appear in more than one pair (chains of three or more) are
+    left to the loose pairing so no offcut can be handed out twice.
+    """
+    by_id = np.argsort(legacy_ids, kind='stable')
+    sorted_ids = legacy_ids[by_id]
+
+    has_related = np.flatnonzero(related_ids >= 0)
+    lookup = np.searchsorted(sorted_ids, related_ids[has_related])
+    lookup = np.minimum(lookup, len(sorted_ids) - 1)
+    found = sorted_ids[lookup] == related_ids[has_related]
+
+    pair_a = by_id[lookup[found]]
+    pair_b = has_related[found]
+
+    counts = np.bincount(np.concatenate([pair_a, pair_b]), minlength=len(legacy_ids))
+    unique = (counts[pair_a] == 1) & (counts[pair_b] == 1)
+    return pair_a[unique], pair_b[unique]
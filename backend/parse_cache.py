@@ -0,0 +1,157 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Extracted PDF text is cached on local disk, keyed by the SHA-256 of the PDF
+# bytes, so re-processing a file skips LlamaParse entirely.
+PARSE_CACHE_DIR = os.getenv('PARSE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'offcut_parse_cache'))
+PARSE_CACHE_MAX_BYTES = int(os.getenv('PARSE_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+_TEXT_SUFFIX = '.txt'
+_evict_lock = threading.Lock()
+
+
+def file_digest(file_path):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_path(digest):
+    return os.path.join(PARSE_CACHE_DIR, digest + _TEXT_SUFFIX)
+
+
+@contextmanager
+def _stats_db():
+    """Hit/miss counters, shared by every worker process on the instance"""
+    os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(PARSE_CACHE_DIR, 'stats.sqlite3'), timeout=10)
+    try:
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            yield conn
+    finally:
+        conn.close()
+
+
+def _count(name):
+    try:
+        with _stats_db() as conn:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,)
+            )
+    except sqlite3.Error as e:
+        # Counters are diagnostics only; never fail a parse over them
+        print(f"Warning: failed to update parse cache counter {name}: {str(e)}")
+
+
+def get(digest):
+    """Return cached text for a digest, or None, recording a hit or miss"""
+    path = _entry_path(digest)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        # Bump the modification time so eviction sees this entry as recently used
+        os.utime(path)
+    except FileNotFoundError:
+        _count('misses')
+        return None
+    _count('hits')
+    return text
+
+
+def put(digest, text):
+    """Store text for a digest, then evict least recently used entries over the size bound"""
+    os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PARSE_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, _entry_path(digest))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _evict()
+
+
+def _entries():
+    """(mtime, size, path) for every cached text, oldest first"""
+    entries = []
+    try:
+        names = os.listdir(PARSE_CACHE_DIR)
+    except FileNotFoundError:
+        return entries
+    for name in names:
+        if not name.endswith(_TEXT_SUFFIX):
+            continue
+        path = os.path.join(PARSE_CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    return entries
+
+
+def _evict():
+    with _evict_lock:
+        entries = _entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= PARSE_CACHE_MAX_BYTES:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def get_or_parse(file_path, parse):
+    """Return the text for a PDF from the cache, calling parse(file_path) on a miss"""
+    digest = file_digest(file_path)
+    text = get(digest)
+    if text is None:
+        text = parse(file_path)
+        try:
+            put(digest, text)
+        except OSError as e:
+            # A full or read-only disk only costs us the cache, not the parse
+            print(f"Warning: failed to cache parsed text for {file_path}: {str(e)}")
+    return text
+
+
+def stats():
+    with _stats_db() as conn:
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+    entries = _entries()
+    hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        'entries': len(entries),
+        'size_bytes': sum(size for _, size, _ in entries),
+        'max_bytes': PARSE_CACHE_MAX_BYTES
+    }
+
+
+def clear():
+    """Remove every cached text and reset the counters"""
+    for _, _, path in _entries():
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    with _stats_db() as conn:
+        conn.execute("DELETE FROM counters")
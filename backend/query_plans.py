@@ -0,0 +1,107 @@
+import click
+from sqlalchemy import text
+
+from backend.app import db
+
+# EXPLAIN checks for the hot query paths. Each entry names the tables the
+# query must reach through an index; a sequential scan of any of them is
+# reported as a regression. Run against a local Postgres (or SQLite as a
+# stand-in) with `flask --app wsgi db-check-plans`.
+
+
+def hot_queries():
+    """(name, statement, tables that must not be scanned in full)"""
+    from backend.models import Batch, BatchItem, OffcutUsageHistory
+    from backend.offcut_index import available_offcuts_query, available_offcuts_listing
+    from backend.pagination import Page, DEFAULT_PAGE_SIZE, page_query
+    from backend.routes.reports_routes import batch_report_query
+
+    # The same query and keys the admin route pages through
+    listing, listing_keys = available_offcuts_listing()
+
+    return [
+        ('recommendation offcut lookup',
+         available_offcuts_query(['PROFILE']).statement,
+         ['offcuts']),
+        ('admin available offcuts first page',
+         page_query(listing, listing_keys, Page(DEFAULT_PAGE_SIZE, None, None)).statement,
+         ['offcuts']),
+        ('admin available offcuts next page',
+         page_query(listing, listing_keys, Page(DEFAULT_PAGE_SIZE, [1, 1], None)).statement,
+         ['offcuts']),
+        ('offcut usage history',
+         OffcutUsageHistory.query.filter_by(offcut_id=1).statement,
+         ['offcut_usage_history']),
+        ('batch items of a batch',
+         BatchItem.query.filter_by(batch_id=1).statement,
+         ['batch_items']),
+        ('batches in a date range',
+         Batch.query.filter(Batch.batch_date.between('2024-01-01', '2024-01-31')).statement,
+         ['batches']),
+        ('batch report',
+         batch_report_query('2024-01-01', '2024-01-31').statement,
+         ['batches', 'batch_details']),
+    ]
+
+
+def _compile(connection, statement):
+    return str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _postgres_scans(connection, sql):
+    # With sequential scans priced out, one still appearing means no index
+    # can serve the query, however small the local tables are
+    with connection.begin():
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+        plan = connection.execute(text('EXPLAIN (FORMAT JSON) ' + sql)).scalar()
+
+    scans, nodes, lines = set(), [plan[0]['Plan']], []
+    while nodes:
+        node = nodes.pop()
+        lines.append(f"{node['Node Type']} {node.get('Relation Name', '')}".strip())
+        if node['Node Type'] == 'Seq Scan':
+            scans.add(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return scans, lines
+
+
+def _sqlite_scans(connection, sql):
+    rows = connection.execute(text('EXPLAIN QUERY PLAN ' + sql)).fetchall()
+    scans, lines = set(), []
+    for row in rows:
+        detail = row[-1]
+        lines.append(detail)
+        # "SCAN t USING INDEX ..." walks an index in order; a bare "SCAN t" reads the table
+        words = detail.split()
+        if words[0] == 'SCAN' and 'INDEX' not in words:
+            scans.add(words[1])
+    return scans, lines
+
+
+def check_plans(verbose=False):
+    """EXPLAIN every hot query, returning the names of those that regressed"""
+    failures = []
+    with db.engine.connect() as connection:
+        explain = _postgres_scans if connection.dialect.name == 'postgresql' else _sqlite_scans
+        for name, statement, indexed_tables in hot_queries():
+            scans, lines = explain(connection, _compile(connection, statement))
+            regressed = sorted(scans.intersection(indexed_tables))
+            if regressed:
+                failures.append(name)
+                print(f"FAIL  {name}: sequential scan of {', '.join(regressed)}")
+            else:
+                print(f"ok    {name}")
+            if verbose or regressed:
+                for line in lines:
+                    print(f"        {line}")
+    return failures
+
+
+def register_commands(app):
+    @app.cli.command('db-check-plans')
+    @click.option('--verbose', is_flag=True, help='Print every plan, not just failing ones.')
+    def db_check_plans_command(verbose):
+        """EXPLAIN the hot queries and fail on sequential scans."""
+        failures = check_plans(verbose)
+        if failures:
+            raise SystemExit(1)
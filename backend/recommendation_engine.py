@@ -1,65 +1,84 @@
 from backend.app import db
-from backend.models import Offcut, OffcutUsageHistory
-import openai  # or your preferred LLM client library
+from backend.models import OffcutUsageHistory
+from backend.offcut_index import OffcutIndex
+from backend.batch_optimiser import optimise_assignments, is_sibling_pair, DEFAULT_TIME_BUDGET
 
-def get_recommendations(cutting_instructions):
-    recommendations = []
-    used_offcut_ids = set()  # Track used offcut IDs
+RECOMMENDATION_MODES = ('greedy', 'optimal')
+
+def get_recommendations(cutting_instructions, mode='greedy', time_budget=DEFAULT_TIME_BUDGET):
+    """Recommend offcuts for a batch of cutting instructions.
+
+    'greedy' serves instructions in input order, each taking the smallest
+    offcut that fits. 'optimal' assigns the whole batch at once within
+    time_budget seconds (see backend.batch_optimiser).
+    """
+    if mode not in RECOMMENDATION_MODES:
+        raise ValueError(f"Invalid recommendation mode: {mode}")
+    
+    print(f"Processing cutting instructions ({mode}): {cutting_instructions}")
+    
+    # Load every available offcut for the batch's profiles in one round trip
+    index = OffcutIndex.load(i['material_profile'] for i in cutting_instructions)
     
-    print(f"Processing cutting instructions: {cutting_instructions}")
+    if mode == 'optimal':
+        assignments = optimise_assignments(cutting_instructions, index, time_budget)
+    else:
+        assignments = _greedy_assignments(cutting_instructions, index)
+    
+    recommendations = [
+        _build_recommendation(cutting_instructions[pos], assignments[pos],
+                              siblings=mode == 'optimal' and is_sibling_pair(index, assignments[pos]))
+        for pos in sorted(assignments)
+    ]
+    
+    print(f"Returning {len(recommendations)} recommendations")
+    return recommendations
+
+def _greedy_assignments(cutting_instructions, index):
+    """Serve instructions in input order, each taking the smallest offcut(s) that fit"""
+    assignments = {}
     
-    for instruction in cutting_instructions:
+    for pos, instruction in enumerate(cutting_instructions):
         material_profile = instruction['material_profile']
         required_length = instruction['required_length']
         is_double_cut = instruction.get('double_cut', False)
         
         print(f"Searching for: profile={material_profile}, length>={required_length}, double_cut={is_double_cut}")
         
-        if is_double_cut:
-            # For double cuts, find two matching offcuts that haven't been used
-            offcuts = Offcut.query.filter_by(
-                is_available=True,
-                material_profile=material_profile
-            ).filter(
-                Offcut.length_mm >= required_length,
-                ~Offcut.legacy_offcut_id.in_(list(used_offcut_ids))  # Exclude used offcuts
-            ).order_by(Offcut.length_mm.asc()).limit(2).all()
-            
-            if len(offcuts) >= 2:
-                # Add both offcut IDs to used set
-                used_offcut_ids.add(offcuts[0].legacy_offcut_id)
-                used_offcut_ids.add(offcuts[1].legacy_offcut_id)
-                
-                recommendations.append({
-                    'legacy_offcut_id': offcuts[0].legacy_offcut_id,
-                    'related_legacy_offcut_id': offcuts[1].legacy_offcut_id,
-                    'matched_profile': offcuts[0].material_profile,
-                    'suggested_length': offcuts[0].length_mm,
-                    'is_double_cut': True,
-                    'reasoning': f"Matched pair of offcuts for double cut {material_profile} with required length {required_length}mm"
-                })
+        # Taken offcuts are removed from the index so they can't be reused
+        offcuts = index.take(material_profile, required_length, n=2 if is_double_cut else 1)
+        if offcuts:
+            assignments[pos] = offcuts
+    
+    return assignments
+
+def _build_recommendation(instruction, offcuts, siblings=False):
+    """Format the offcut(s) assigned to an instruction as a recommendation"""
+    material_profile = instruction['material_profile']
+    required_length = instruction['required_length']
+    
+    if instruction.get('double_cut', False):
+        if siblings:
+            reasoning = f"Matched sibling offcuts cut together, for double cut {material_profile} with required length {required_length}mm"
         else:
-            # Single-cut logic with exclusion of used offcuts
-            offcut = Offcut.query.filter_by(
-                is_available=True,
-                material_profile=material_profile
-            ).filter(
-                Offcut.length_mm >= required_length,
-                ~Offcut.legacy_offcut_id.in_(list(used_offcut_ids))  # Exclude used offcuts
-            ).order_by(Offcut.length_mm.asc()).first()
-            
-            if offcut:
-                used_offcut_ids.add(offcut.legacy_offcut_id)
-                recommendations.append({
-                    'legacy_offcut_id': offcut.legacy_offcut_id,
-                    'matched_profile': offcut.material_profile,
-                    'suggested_length': offcut.length_mm,
-                    'is_double_cut': False,
-                    'reasoning': f"Best matching offcut for {material_profile} with required length {required_length}mm"
-                })
+            reasoning = f"Matched pair of offcuts for double cut {material_profile} with required length {required_length}mm"
+        return {
+            'legacy_offcut_id': offcuts[0][1],
+            'related_legacy_offcut_id': offcuts[1][1],
+            'matched_profile': material_profile,
+            'suggested_length': offcuts[0][0],
+            'is_double_cut': True,
+            'reasoning': reasoning
+        }
     
-    print(f"Returning {len(recommendations)} recommendations")
-    return recommendations
+    length_mm, legacy_offcut_id = offcuts[0]
+    return {
+        'legacy_offcut_id': legacy_offcut_id,
+        'matched_profile': material_profile,
+        'suggested_length': length_mm,
+        'is_double_cut': False,
+        'reasoning': f"Best matching offcut for {material_profile} with required length {required_length}mm"
+    }
 
 def _get_historical_context():
     """Fetch relevant historical data about offcut reuse patterns"""
@@ -84,6 +103,7 @@ def _calculate_success_rate(offcut_id):
 
 def _get_llm_recommendation(prompt):
     """Interface with LLM to get recommendation"""
+    import openai  # or your preferred LLM client library
     # Replace with your actual LLM integration
     try:
         response = openai.ChatCompletion.create(
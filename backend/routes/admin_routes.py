@@ -1,19 +1,27 @@
-from flask import Blueprint, request, jsonify, session, Response
+from flask import Blueprint, request, jsonify, session, Response, current_app, url_for, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 from backend.app import db
-from backend.models import Batch, BatchDetail, Item, Offcut, OffcutUsageHistory
+from backend.models import Batch, BatchDetail, Item, Offcut
 from backend.data_pipeline import (
-    preprocess_pdf, 
-    ingest_data, 
-    store_dataframe_temp, 
-    retrieve_dataframe_temp
+    process_uploads,
+    ingest_data,
+    rebuild_monthly_rollups
 )
+from backend.staging import load_staged, discard, StagingNotFound
+from backend import parse_cache, answer_cache, sql_guard
+from backend.db_pool import pool_stats
+from backend.admission import analytics
+from backend.pagination import parse_page_args, fetch_page, page_headers, PaginationError
+from backend.data_version import bump_data_version
+from backend.offcut_usage import reserve_offcuts, InvalidOffcutIds
+from backend.offcut_index import available_offcuts_listing
+from backend.jobs import submit_job, get_job, watch_job, SUCCEEDED, FAILED, JOB_STREAM_SECONDS
 from datetime import datetime
+import json
 import shutil
 from tempfile import NamedTemporaryFile
 from flask_sse import sse
-import time
 
 admin_bp = Blueprint('admin_bp', __name__)
 
@@ -51,26 +59,58 @@ def validate_batch_codes(df):
 
 @admin_bp.route('/upload', methods=['POST'])
 def upload_files():
-    """Handle single PDF file upload for preprocessing"""
-    if 'file' not in request.files:
+    """Handle PDF file upload for preprocessing
+
+    Accepts a single file under 'file' or several under 'files'.
+    """
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
         return jsonify({'error': 'No file provided'}), 400
     
-    file = request.files['file']
+    if not all(file and allowed_file(file.filename) for file in files):
+        return jsonify({'error': 'Invalid file format'}), 400
     
-    if file and allowed_file(file.filename):
+    filenames = []
+    for file in files:
         filename = secure_filename(file.filename)
         filepath = os.path.join(UPLOAD_FOLDER, filename)
         file.save(filepath)
-        return jsonify({
-            'message': 'File uploaded successfully',
-            'filename': filename
-        }), 200
+        filenames.append(filename)
+    
+    return jsonify({
+        'message': 'File uploaded successfully' if len(filenames) == 1 else f'{len(filenames)} files uploaded successfully',
+        'filename': filenames[0],
+        'filenames': filenames
+    }), 200
+
+def _queue_processing(filenames, batch_date, auto_ingest):
+    """Queue a background job to preprocess uploaded files; returns a Flask response"""
+    file_paths = [os.path.join(UPLOAD_FOLDER, secure_filename(filename)) for filename in filenames]
+    missing = [path for path in file_paths if not os.path.exists(path)]
+    if missing:
+        print(f"Files not found: {missing}")
+        return jsonify({'error': 'File not found', 'missing': [os.path.basename(path) for path in missing]}), 404
     
-    return jsonify({'error': 'Invalid file format'}), 400
+    # LlamaParse can outlast the request timeout, so parse off the request thread
+    job_id = submit_job(
+        'process_pdf', current_app._get_current_object(),
+        process_uploads, file_paths, batch_date,
+        auto_ingest=bool(auto_ingest)
+    )
+    print(f"Queued processing job {job_id} for {file_paths}")
+    # Lets an /ingest call from the same browser omit the job_id
+    session['job_id'] = job_id
+    
+    return jsonify({
+        'message': 'File queued for processing' if len(file_paths) == 1 else f'{len(file_paths)} files queued for processing',
+        'job_id': job_id,
+        'status_url': url_for('admin_bp.process_status', job_id=job_id),
+        'job_url': url_for('admin_bp.get_job_status', job_id=job_id)
+    }), 202
 
 @admin_bp.route('/process', methods=['POST'])
 def process_files():
-    """Preprocess single uploaded PDF file"""
+    """Queue preprocessing of a single uploaded PDF file as a background job"""
     try:
         print("Starting process_files endpoint")
         
@@ -87,50 +127,8 @@ def process_files():
         if not batch_date or not filename:
             print(f"Missing required fields: batch_date={batch_date}, filename={filename}")
             return jsonify({'error': 'batch_date and filename are required'}), 400
-            
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        if not os.path.exists(file_path):
-            print(f"File not found at path: {file_path}")
-            return jsonify({'error': 'File not found'}), 404
-            
-        try:
-            print(f"Processing PDF file: {file_path}")
-            result = preprocess_pdf(file_path, batch_date)
-            
-            # Check if result is an error dictionary
-            if isinstance(result, dict) and 'error' in result:
-                if result['error'] == 'duplicate_batch':
-                    return jsonify({
-                        'error': 'duplicate_batch',
-                        'batch_code': result['batch_code'],
-                        'message': result['message']
-                    }), 409
-                    
-            processed_df = result  # If no error, result is the DataFrame
-            
-            if processed_df is None or processed_df.empty:
-                print("No data extracted from PDF")
-                return jsonify({'error': 'No data could be extracted from PDF'}), 400
-            
-            print("PDF processed successfully, storing DataFrame")
-            # Store DataFrame in temporary file
-            temp_file_path = store_dataframe_temp(processed_df)
-            session['temp_file_path'] = temp_file_path
-            session['has_processed_data'] = True
-            
-            # Create preview data once and use it in the response
-            preview_data = processed_df.head(20).to_dict('records')
-            
-            print("Returning successful response")
-            return jsonify({
-                'message': 'File processed successfully',
-                'preview': preview_data
-            }), 200
-                
-        finally:
-            if os.path.exists(file_path):
-                print(f"Cleaning up file: {file_path}")
-                os.remove(file_path)
+        
+        return _queue_processing([filename], batch_date, data.get('auto_ingest', False))
                 
     except Exception as e:
         print(f"Error in process_files: {str(e)}")
@@ -141,23 +139,56 @@ def process_files():
             'details': str(e)
         }), 500
 
+@admin_bp.route('/process-multiple', methods=['POST'])
+def process_multiple_files():
+    """Queue preprocessing of several uploaded PDF files into one merged batch set"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Invalid JSON data'}), 400
+        
+        batch_date = data.get('batch_date')
+        filenames = data.get('filenames')
+        
+        if not batch_date or not filenames or not isinstance(filenames, list):
+            return jsonify({'error': 'batch_date and a list of filenames are required'}), 400
+        
+        return _queue_processing(filenames, batch_date, data.get('auto_ingest', False))
+    
+    except Exception as e:
+        print(f"Error in process_multiple_files: {str(e)}")
+        return jsonify({
+            'error': 'Processing failed',
+            'details': str(e)
+        }), 500
+
 @admin_bp.route('/ingest', methods=['POST'])
 def ingest_processed_data():
     """Ingest preprocessed data into database"""
     try:
         print("Starting ingest_processed_data endpoint")
         
-        if not session.get('has_processed_data', False):
-            print("No processed data flag in session")
-            return jsonify({'error': 'No processed data found'}), 400
+        data = request.get_json(silent=True) or {}
+        staging_id = data.get('staging_id')
+        if not staging_id:
+            job_id = data.get('job_id') or session.get('job_id')
+            if not job_id:
+                print("No processing job given")
+                return jsonify({'error': 'No processed data found'}), 400
             
-        temp_file_path = session.get('temp_file_path')
-        if not temp_file_path or not os.path.exists(temp_file_path):
-            print(f"Temp file not found: {temp_file_path}")
+            job = get_job(job_id)
+            if not job or job['status'] != SUCCEEDED:
+                print(f"Processing job {job_id} has no result: {job and job['status']}")
+                return jsonify({'error': 'No processed data found'}), 400
+            staging_id = (job['result'] or {}).get('staging_id')
+            
+        try:
+            processed_df = load_staged(staging_id)
+        except StagingNotFound as e:
+            print(f"Staged data not found: {str(e)}")
             return jsonify({'error': 'Processed data not found'}), 400
             
         try:
-            processed_df = retrieve_dataframe_temp(temp_file_path)
             print(f"Retrieved DataFrame with {len(processed_df)} rows")
             
             # Start transaction here
@@ -167,9 +198,9 @@ def ingest_processed_data():
                 result = ingest_data(processed_df)
                 db.session.commit()
                 
-                # Clear session
-                session.pop('temp_file_path', None)
-                session.pop('has_processed_data', None)
+                # Kept until now so a failed ingest can be retried
+                discard(staging_id)
+                session.pop('job_id', None)
                 
                 return jsonify({
                     'message': 'Data ingested successfully',
@@ -216,39 +247,140 @@ def get_ingestion_status():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@admin_bp.route('/process-status')
-def process_status():
+def _job_payload(job):
+    """Client-facing view of a job record"""
+    payload = {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'message': job['message']
+    }
+    if job['status'] == SUCCEEDED:
+        payload['result'] = job['result']
+    elif job['status'] == FAILED:
+        payload['error'] = job['error']
+    return payload
+
+@admin_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Current state of a background processing job"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_payload(job)), 200
+
+@admin_bp.route('/rollups/rebuild', methods=['POST'])
+def rebuild_rollups():
+    """Recompute the monthly per-item rollups from batch_items"""
+    try:
+        rows = rebuild_monthly_rollups()
+        bump_data_version()
+        db.session.commit()
+        return jsonify({'message': 'Rollups rebuilt', 'rows': rows}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error rebuilding rollups: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/db-pool', methods=['GET'])
+def get_db_pool_stats():
+    """Connection pool occupancy and counters for this worker process"""
+    try:
+        return jsonify({'pid': os.getpid(), **pool_stats()}), 200
+    except Exception as e:
+        print(f"Error reading pool stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admission', methods=['GET'])
+def get_admission_stats():
+    """Concurrency, queueing and load-shedding counters for this worker process"""
+    try:
+        return jsonify({'pid': os.getpid(), 'analytics': analytics.stats()}), 200
+    except Exception as e:
+        print(f"Error reading admission stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/parse-cache', methods=['GET'])
+def get_parse_cache_stats():
+    """Hit/miss counters and disk usage of the parsed PDF text cache"""
+    try:
+        return jsonify(parse_cache.stats()), 200
+    except Exception as e:
+        print(f"Error reading parse cache stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/parse-cache', methods=['DELETE'])
+def clear_parse_cache():
+    """Drop every cached text and reset the counters"""
+    try:
+        parse_cache.clear()
+        return jsonify({'message': 'Parse cache cleared'}), 200
+    except Exception as e:
+        print(f"Error clearing parse cache: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/chat-cache', methods=['GET'])
+def get_chat_cache_stats():
+    """Hit/miss counters and size of this worker's chat answer and SQL result caches"""
+    try:
+        return jsonify({'pid': os.getpid(), **answer_cache.stats(), 'sql': sql_guard.stats()}), 200
+    except Exception as e:
+        print(f"Error reading chat cache stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/chat-cache', methods=['DELETE'])
+def clear_chat_cache():
+    """Drop every cached chat answer in this worker and reset the counters"""
+    try:
+        answer_cache.clear()
+        return jsonify({'message': 'Chat cache cleared'}), 200
+    except Exception as e:
+        print(f"Error clearing chat cache: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/process-status/<job_id>')
+def process_status(job_id):
+    """Stream a processing job's progress as server-sent events.
+
+    Each stream lasts at most JOB_STREAM_SECONDS so the worker is not held
+    for the whole job; EventSource reconnects and picks up the current state.
+    """
+    if not get_job(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    
     def generate():
-        stages = [
-            ("Parsing PDF", 20),
-            ("Extracting Data", 40),
-            ("Validating Content", 60),
-            ("Preparing Database Records", 80),
-            ("Completing Process", 100)
-        ]
-        
-        for stage, progress in stages:
-            yield f'data: {{"status": "{stage}", "progress": {progress}}}\n\n'
-            time.sleep(1)  # Simulate processing time
+        # Reconnect quickly once this stream ends
+        yield 'retry: 500\n\n'
+        for job in watch_job(job_id, max_seconds=JOB_STREAM_SECONDS):
+            if job is None:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            yield f'data: {json.dumps(_job_payload(job), default=str)}\n\n'
             
-    return Response(generate(), mimetype='text/event-stream')
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+AVAILABLE_OFFCUT_FIELDS = ('offcut_id', 'legacy_offcut_id', 'length_mm', 'material_profile',
+                           'created_in_batch_detail_id', 'reuse_count')
 
 @admin_bp.route('/available-offcuts', methods=['GET'])
 def get_available_offcuts():
-    """Retrieve all available offcuts."""
+    """Retrieve available offcuts a page at a time, newest batch first."""
     try:
-        offcuts = Offcut.query.filter_by(is_available=True)\
-            .order_by(Offcut.created_in_batch_detail_id.desc())\
-            .all()
-        
-        return jsonify([{
-            'offcut_id': o.offcut_id,
-            'legacy_offcut_id': o.legacy_offcut_id,
-            'length_mm': o.length_mm,
-            'material_profile': o.material_profile,
-            'created_in_batch_detail_id': o.created_in_batch_detail_id,
-            'reuse_count': o.reuse_count
-        } for o in offcuts]), 200
+        page = parse_page_args(AVAILABLE_OFFCUT_FIELDS)
+        query, keys = available_offcuts_listing()
+        offcuts, next_cursor = fetch_page(query, keys, page)
+        fields = page.fields or AVAILABLE_OFFCUT_FIELDS
+        return jsonify([
+            {field: getattr(o, field) for field in fields} for o in offcuts
+        ]), 200, page_headers(page, next_cursor)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -269,26 +401,25 @@ def update_offcut_usage():
         if not batch:
             return jsonify({'error': 'Invalid batch code'}), 404
 
-        # Update each offcut
-        for offcut_id in offcut_ids:
-            offcut = Offcut.query.get(offcut_id)
-            if offcut:
-                # Create usage history entry
-                usage_history = OffcutUsageHistory(
-                    offcut_id=offcut_id,
-                    batch_id=batch.batch_id,
-                    reuse_success=True,
-                    reuse_date=datetime.strptime(reuse_date, '%Y-%m-%d').date()
-                )
-                db.session.add(usage_history)
-
-                # Update offcut status
-                offcut.is_available = False
-                offcut.reuse_count += 1
+        # Claim every offcut in one statement; any already used (e.g. by a
+        # concurrent confirmation) fails the whole update
+        reserved, unavailable = reserve_offcuts(
+            offcut_ids, batch.batch_id, datetime.strptime(reuse_date, '%Y-%m-%d').date()
+        )
+        if unavailable:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Some offcuts are no longer available',
+                'unavailable_offcut_ids': unavailable
+            }), 409
 
+        bump_data_version()
         db.session.commit()
         return jsonify({'message': 'Usage history updated successfully'}), 200
 
+    except InvalidOffcutIds as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
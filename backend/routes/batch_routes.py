@@ -2,8 +2,11 @@
 
 from flask import Blueprint, request, jsonify
 from backend.app import db
-from backend.models import Batch
+from backend.models import Batch, BatchItem
+from backend.data_pipeline import refresh_monthly_rollups
 from backend.schemas import BatchSchema
+from backend.data_version import bump_data_version
+from backend.pagination import parse_page_args, fetch_page, page_headers, PaginationError
 from datetime import datetime
 
 batch_bp = Blueprint('batch_bp', __name__)
@@ -12,10 +15,15 @@ batches_schema = BatchSchema(many=True)
 
 @batch_bp.route('/', methods=['GET'])
 def get_batches():
-    """Retrieve all batches."""
-    batches = Batch.query.all()
-    result = batches_schema.dump(batches)
-    return jsonify(result), 200
+    """Retrieve batches a page at a time, in batch_id order."""
+    try:
+        page = parse_page_args(batches_schema.fields)
+        batches, next_cursor = fetch_page(Batch.query, [(Batch.batch_id, False)], page)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    schema = BatchSchema(many=True, only=page.fields) if page.fields else batches_schema
+    result = schema.dump(batches)
+    return jsonify(result), 200, page_headers(page, next_cursor)
 
 @batch_bp.route('/', methods=['POST'])
 def create_batch():
@@ -30,6 +38,7 @@ def create_batch():
         date=datetime.strptime(data['date'], '%Y-%m-%d')
     )
     db.session.add(new_batch)
+    bump_data_version()
     db.session.commit()
     result = batch_schema.dump(new_batch)
     return jsonify(result), 201
@@ -54,6 +63,7 @@ def update_batch(id):
         batch.batch_code = data['batch_code']
     if 'date' in data:
         batch.date = datetime.strptime(data['date'], '%Y-%m-%d')
+    bump_data_version()
     db.session.commit()
     result = batch_schema.dump(batch)
     return jsonify(result), 200
@@ -62,7 +72,15 @@ def update_batch(id):
 def delete_batch(id):
     """Delete a batch."""
     batch = Batch.query.get_or_404(id)
+    item_ids = db.session.execute(
+        db.select(BatchItem.item_id).where(BatchItem.batch_id == id).distinct()
+    ).scalars()
+    item_months = [(item_id, batch.batch_date.year, batch.batch_date.month)
+                   for item_id in item_ids if item_id is not None]
     db.session.delete(batch)
+    db.session.flush()
+    refresh_monthly_rollups(item_months)
+    bump_data_version()
     db.session.commit()
     return '', 204
 
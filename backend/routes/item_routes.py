@@ -2,8 +2,11 @@
 
 from flask import Blueprint, request, jsonify
 from backend.app import db
-from backend.models import Item
+from backend.models import Item, MonthlyItemRollup
+from backend.data_pipeline import refresh_monthly_rollups
 from backend.schemas import ItemSchema
+from backend.data_version import bump_data_version
+from backend.pagination import parse_page_args, fetch_page, page_headers, PaginationError
 
 item_bp = Blueprint('item_bp', __name__)
 item_schema = ItemSchema()
@@ -11,10 +14,15 @@ items_schema = ItemSchema(many=True)
 
 @item_bp.route('/', methods=['GET'])
 def get_items():
-    """Retrieve all items."""
-    items = Item.query.all()
-    result = items_schema.dump(items)
-    return jsonify(result), 200
+    """Retrieve items a page at a time, in item_id order."""
+    try:
+        page = parse_page_args(items_schema.fields)
+        items, next_cursor = fetch_page(Item.query, [(Item.item_id, False)], page)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    schema = ItemSchema(many=True, only=page.fields) if page.fields else items_schema
+    result = schema.dump(items)
+    return jsonify(result), 200, page_headers(page, next_cursor)
 
 @item_bp.route('/', methods=['POST'])
 def create_item():
@@ -29,6 +37,7 @@ def create_item():
         description=data.get('description')
     )
     db.session.add(new_item)
+    bump_data_version()
     db.session.commit()
     result = item_schema.dump(new_item)
     return jsonify(result), 201
@@ -53,6 +62,7 @@ def update_item(id):
         item.item_code = data['item_code']
     if 'description' in data:
         item.description = data['description']
+    bump_data_version()
     db.session.commit()
     result = item_schema.dump(item)
     return jsonify(result), 200
@@ -61,6 +71,14 @@ def update_item(id):
 def delete_item(id):
     """Delete an item."""
     item = Item.query.get_or_404(id)
+    item_months = db.session.execute(
+        db.select(MonthlyItemRollup.item_id, MonthlyItemRollup.year, MonthlyItemRollup.month)
+        .where(MonthlyItemRollup.item_id == id)
+    ).all()
     db.session.delete(item)
+    db.session.flush()
+    # Also covers SQLite, which does not enforce the rollups' ON DELETE CASCADE
+    refresh_monthly_rollups(item_months)
+    bump_data_version()
     db.session.commit()
     return '', 204
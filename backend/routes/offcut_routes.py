@@ -4,6 +4,8 @@ from flask import Blueprint, request, jsonify
 from backend.app import db
 from backend.models import Offcut
 from backend.schemas import OffcutSchema
+from backend.data_version import bump_data_version
+from backend.pagination import parse_page_args, fetch_page, page_headers, PaginationError
 
 offcut_bp = Blueprint('offcut_bp', __name__)
 offcut_schema = OffcutSchema()
@@ -11,10 +13,15 @@ offcuts_schema = OffcutSchema(many=True)
 
 @offcut_bp.route('/', methods=['GET'])
 def get_offcuts():
-    """Retrieve all offcuts."""
-    offcuts = Offcut.query.all()
-    result = offcuts_schema.dump(offcuts)
-    return jsonify(result), 200
+    """Retrieve offcuts a page at a time, in offcut_id order."""
+    try:
+        page = parse_page_args(offcuts_schema.fields)
+        offcuts, next_cursor = fetch_page(Offcut.query, [(Offcut.offcut_id, False)], page)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    schema = OffcutSchema(many=True, only=page.fields) if page.fields else offcuts_schema
+    result = schema.dump(offcuts)
+    return jsonify(result), 200, page_headers(page, next_cursor)
 
 @offcut_bp.route('/available', methods=['GET'])
 def get_available_offcuts():
@@ -50,6 +57,7 @@ def create_offcut():
         batch_detail_id=data['batch_detail_id']
     )
     db.session.add(new_offcut)
+    bump_data_version()
     db.session.commit()
     result = offcut_schema.dump(new_offcut)
     return jsonify(result), 201
@@ -82,6 +90,7 @@ def update_offcut(id):
         offcut.reuse_count = data['reuse_count']
     if 'batch_detail_id' in data:
         offcut.batch_detail_id = data['batch_detail_id']
+    bump_data_version()
     db.session.commit()
     result = offcut_schema.dump(offcut)
     return jsonify(result), 200
@@ -97,6 +106,7 @@ def update_offcut_status(id):
         return jsonify({'error': 'is_available field is required'}), 400
 
     offcut.is_available = is_available
+    bump_data_version()
     db.session.commit()
     result = offcut_schema.dump(offcut)
     return jsonify(result), 200
@@ -106,6 +116,7 @@ def delete_offcut(id):
     """Delete an offcut."""
     offcut = Offcut.query.get_or_404(id)
     db.session.delete(offcut)
+    bump_data_version()
     db.session.commit()
     return '', 204
 
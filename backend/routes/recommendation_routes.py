@@ -2,9 +2,12 @@
 
 from flask import Blueprint, request, jsonify
 from backend.app import db
-from backend.models import Offcut, BatchOffcutSuggestion, OffcutUsageHistory, BatchDetail, BatchItem, Batch
+from backend.models import BatchOffcutSuggestion, BatchDetail, BatchItem, Batch
 from backend.schemas import BatchOffcutSuggestionSchema
-from backend.recommendation_engine import get_recommendations
+from backend.recommendation_engine import get_recommendations, RECOMMENDATION_MODES
+from backend.batch_optimiser import DEFAULT_TIME_BUDGET, MAX_TIME_BUDGET
+from backend.data_version import bump_data_version
+from backend.offcut_usage import reserve_offcuts, InvalidOffcutIds
 from datetime import datetime
 
 recommendation_bp = Blueprint('recommendation_bp', __name__)
@@ -27,6 +30,11 @@ def start_recommendations():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    # Optional optimiser settings: mode=greedy|optimal and a time budget in ms
+    request_data["mode"] = data.get("mode", request.args.get("mode", "greedy"))
+    if "time_budget_ms" in data:
+        request_data["time_budget_ms"] = data["time_budget_ms"]
+
     # Call the recommend_offcuts function with the prepared data
     return recommend_offcuts_internal(request_data)
 
@@ -65,14 +73,25 @@ def recommend_offcuts_internal(request_data):
     # Extract data from the prepared request_data
     batch_id = request_data.get('batch_id')
     cutting_instructions = request_data.get('cutting_instructions')
+    mode = request_data.get('mode', 'greedy')
+
+    if mode not in RECOMMENDATION_MODES:
+        return jsonify({'error': f'mode must be one of {list(RECOMMENDATION_MODES)}'}), 400
+
+    try:
+        time_budget = float(request_data.get('time_budget_ms', DEFAULT_TIME_BUDGET * 1000)) / 1000
+    except (TypeError, ValueError):
+        return jsonify({'error': 'time_budget_ms must be a number'}), 400
+    time_budget = max(0.0, min(time_budget, MAX_TIME_BUDGET))
 
     try:
         # Call the recommendation engine
-        recommendations = get_recommendations(cutting_instructions)
+        recommendations = get_recommendations(cutting_instructions, mode=mode, time_budget=time_budget)
         
         # Return recommendations without saving to database
         return jsonify({
             'batch_id': batch_id,
+            'mode': mode,
             'recommendations': recommendations,
             'message': f'Found {len(recommendations)} potential offcut matches'
         }), 200
@@ -110,38 +129,41 @@ def confirm_recommendations():
         return jsonify({'error': 'batch_id and recommendations are required'}), 400
 
     try:
+        # Claim the offcuts first: if another confirmation got to any of
+        # them, nothing from this one is saved
+        reserved, unavailable = reserve_offcuts(
+            [rec.get('offcut_id') for rec in recommendations if rec.get('offcut_id') is not None],
+            batch_id
+        )
+        if unavailable:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Some offcuts are no longer available',
+                'unavailable_offcut_ids': unavailable
+            }), 409
+
         # Save confirmed recommendations to BatchOffcutSuggestion
-        suggestions = []
-        for rec in recommendations:
-            suggestion = BatchOffcutSuggestion(
+        suggestions = [
+            BatchOffcutSuggestion(
                 batch_id=batch_id,
                 offcut_legacy_id_1=rec.get('offcut_id'),
                 matched_profile=rec.get('matched_profile'),
                 suggested_length_mm=rec.get('suggested_length')
             )
-            db.session.add(suggestion)
-            suggestions.append(suggestion)
-
-            # Update Offcut status
-            offcut = Offcut.query.get(rec.get('offcut_id'))
-            if offcut:
-                offcut.is_available = False
-                offcut.reuse_count += 1
-                
-                # Create usage history entry
-                usage_history = OffcutUsageHistory(
-                    offcut_id=offcut.offcut_id,
-                    batch_id=batch_id,
-                    reuse_success=True
-                )
-                db.session.add(usage_history)
+            for rec in recommendations
+        ]
+        db.session.add_all(suggestions)
 
+        bump_data_version()
         db.session.commit()
         return jsonify({
             'message': 'Recommendations confirmed and saved successfully',
             'suggestions': batch_offcut_suggestions_schema.dump(suggestions)
         }), 200
 
+    except InvalidOffcutIds as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
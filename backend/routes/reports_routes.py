@@ -1,7 +1,11 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from backend.app import db
 from backend.models import Item, BatchItem, Offcut, Batch, BatchDetail
 from sqlalchemy import func
+import csv
+import io
+import json
+import os
 
 reports_bp = Blueprint('reports_bp', __name__)
 
@@ -95,65 +99,113 @@ def get_items_report():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+BATCH_REPORT_COLUMNS = [
+    'batch_code', 'batch_date', 'saw_name', 'item_code', 'item_description',
+    'quantity', 'input_length', 'bar_length', 'used_length', 'offcut_length',
+    'total_offcut_length', 'double_cut', 'waste_percentage', 'efficiency', 'source_file'
+]
+# Rows fetched per round trip when exporting, and bytes buffered per chunk sent
+EXPORT_YIELD_PER = int(os.getenv('EXPORT_YIELD_PER', '1000'))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def batch_report_query(start_date, end_date):
+    return db.session.query(
+        Batch.batch_code,
+        Batch.batch_date,
+        BatchDetail.saw_name,
+        Item.item_code,
+        Item.item_description,
+        BatchItem.quantity,
+        BatchItem.input_bar_length_mm,
+        BatchItem.bar_length_used_mm,
+        BatchItem.total_length_used_mm,
+        BatchItem.offcut_length_created_mm,
+        BatchItem.total_offcut_length_created_mm,
+        BatchItem.double_cut,
+        BatchItem.waste_percentage,
+        BatchItem.usage_efficiency,
+        BatchDetail.source_file
+    ).join(
+        BatchDetail, Batch.batch_id == BatchDetail.batch_id
+    ).join(
+        BatchItem, (Batch.batch_id == BatchItem.batch_id) & 
+                  (BatchDetail.batch_detail_id == BatchItem.batch_items_id)
+    ).join(
+        Item, BatchItem.item_id == Item.item_id
+    ).filter(
+        Batch.batch_date.between(start_date, end_date)
+    ).order_by(
+        Batch.batch_date.desc()
+    )
+
+def _batch_report_row(row):
+    return {
+        'batch_code': row[0],
+        'batch_date': row[1].strftime('%Y-%m-%d'),
+        'saw_name': row[2],
+        'item_code': row[3],
+        'item_description': row[4],
+        'quantity': int(row[5]) if row[5] else 0,
+        'input_length': int(row[6]) if row[6] else 0,
+        'bar_length': int(row[7]) if row[7] else 0,
+        'used_length': int(row[8]) if row[8] else 0,
+        'offcut_length': int(row[9]) if row[9] else 0,
+        'total_offcut_length': int(row[10]) if row[10] else 0,
+        'double_cut': bool(row[11]) if row[11] is not None else False,
+        'waste_percentage': float(row[12]) if row[12] else 0,
+        'efficiency': float(row[13]) if row[13] else 0,
+        'source_file': row[14]
+    }
+
+def _export_chunks(query, export_format):
+    """Encode rows as they come off a server-side cursor, in ~64 KB chunks"""
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=BATCH_REPORT_COLUMNS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            buffer.write(json.dumps(record))
+            buffer.write('\n')
+
+    for row in query.yield_per(EXPORT_YIELD_PER):
+        write(_batch_report_row(row))
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
 @reports_bp.route('/batches', methods=['GET'])
 def get_batch_report():
-    """Retrieve batch report for a date range."""
+    """Retrieve batch report for a date range.
+
+    format=ndjson or format=csv streams the rows instead of building the
+    whole report in memory, for exporting long date ranges.
+    """
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        export_format = request.args.get('format', 'json')
 
         if not start_date or not end_date:
             return jsonify({'error': 'start_date and end_date are required'}), 400
+        if export_format not in ('json', 'ndjson', 'csv'):
+            return jsonify({'error': 'format must be json, ndjson or csv'}), 400
 
-        query = db.session.query(
-            Batch.batch_code,
-            Batch.batch_date,
-            BatchDetail.saw_name,
-            Item.item_code,
-            Item.item_description,
-            BatchItem.quantity,
-            BatchItem.input_bar_length_mm,
-            BatchItem.bar_length_used_mm,
-            BatchItem.total_length_used_mm,
-            BatchItem.offcut_length_created_mm,
-            BatchItem.total_offcut_length_created_mm,
-            BatchItem.double_cut,
-            BatchItem.waste_percentage,
-            BatchItem.usage_efficiency,
-            BatchDetail.source_file
-        ).join(
-            BatchDetail, Batch.batch_id == BatchDetail.batch_id
-        ).join(
-            BatchItem, (Batch.batch_id == BatchItem.batch_id) & 
-                      (BatchDetail.batch_detail_id == BatchItem.batch_items_id)
-        ).join(
-            Item, BatchItem.item_id == Item.item_id
-        ).filter(
-            Batch.batch_date.between(start_date, end_date)
-        ).order_by(
-            Batch.batch_date.desc()
-        ).all()
+        query = batch_report_query(start_date, end_date)
 
-        results = [
-            {
-                'batch_code': row[0],
-                'batch_date': row[1].strftime('%Y-%m-%d'),
-                'saw_name': row[2],
-                'item_code': row[3],
-                'item_description': row[4],
-                'quantity': int(row[5]) if row[5] else 0,
-                'input_length': int(row[6]) if row[6] else 0,
-                'bar_length': int(row[7]) if row[7] else 0,
-                'used_length': int(row[8]) if row[8] else 0,
-                'offcut_length': int(row[9]) if row[9] else 0,
-                'total_offcut_length': int(row[10]) if row[10] else 0,
-                'double_cut': bool(row[11]) if row[11] is not None else False,
-                'waste_percentage': float(row[12]) if row[12] else 0,
-                'efficiency': float(row[13]) if row[13] else 0,
-                'source_file': row[14]
-            }
-            for row in query
-        ]
+        if export_format != 'json':
+            mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+            filename = f"batch_report_{start_date}_{end_date}.{export_format}"
+            return Response(
+                stream_with_context(_export_chunks(query, export_format)),
+                mimetype=mimetype,
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
+
+        results = [_batch_report_row(row) for row in query.all()]
 
         return jsonify(results), 200
 
@@ -1,51 +1,106 @@
 from flask import Blueprint, request, jsonify, make_response, Response
 from backend.graph import create_visualization
+from backend.data_version import get_data_version
+from backend.admission import analytics, AdmissionRejected
 import logging
-import psutil
-import gc
-import json
 import os
+import hashlib
+import threading
 
 visualization_bp = Blueprint('visualization_bp', __name__)
 
+CHUNK_SIZE = 8192
+
+# Rows each chart's query can return, for its admission memory estimate:
+# a fixed allowance for building the Plotly figure plus a per-row cost.
+# The monthly chart has at most one row per month of history.
+VALID_QUERIES = {
+    "Create bar charts showing total material usage over time": 12 * 10,
+    "Create a bar chart showing the top 10 materials by Total Length Used": 10,
+    "Create a bar chart showing top 10 items by total offcut length": 10,
+    "Create a visualization of top and bottom 5 materials by efficiency": 10,
+}
+FIGURE_BASE_MB = float(os.getenv('FIGURE_BASE_MB', '16'))
+FIGURE_ROW_KB = float(os.getenv('FIGURE_ROW_KB', '4'))
+
+def _estimated_cost_mb(query):
+    return FIGURE_BASE_MB + VALID_QUERIES[query] * FIGURE_ROW_KB / 1024
+
+# Serialised figure per query: {query: (data_version, etag, figure_json)}. Entries
+# go stale when bump_data_version() moves the version on ingest or offcut
+# changes, so repeat dashboard loads are a dictionary read.
+_figure_cache = {}
+_figure_cache_lock = threading.Lock()
+
+def _cached_figure(query, version):
+    with _figure_cache_lock:
+        entry = _figure_cache.get(query)
+    if entry and entry[0] == version:
+        return entry[1], entry[2]
+    return None
+
+def _store_figure(query, version, body):
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    with _figure_cache_lock:
+        _figure_cache[query] = (version, etag, body)
+    return etag
+
+_PREFIX = b'{"figure":'
+_SUFFIX = b'}'
+
+def _stream(body):
+    """Wrap the cached figure JSON in the response envelope.
+
+    WSGI servers only accept bytes, so each chunk is a copied slice rather
+    than a memoryview.
+    """
+    yield _PREFIX
+    for i in range(0, len(body), CHUNK_SIZE):
+        yield body[i:i + CHUNK_SIZE]
+    yield _SUFFIX
+
 @visualization_bp.route('/generate', methods=['POST'])
 def create_visualization_route():
     try:
-        gc.collect()
-        
-        # Lower memory threshold
-        mem = psutil.Process().memory_info().rss / 1024 / 1024
-        if mem > 512:
-            return make_response(jsonify({'error': 'Server is busy'}), 503)
-            
         data = request.get_json()
         if not data or not data.get('query'):
             return make_response(jsonify({'error': 'Invalid request'}), 400)
             
         # Validate that the query is one of the predefined options
-        valid_queries = [
-            "Create bar charts showing total material usage over time",
-            "Create a bar chart showing the top 10 materials by Total Length Used",
-            "Create a bar chart showing top 10 items by total offcut length",
-            "Create a visualization of top and bottom 5 materials by efficiency"
-        ]
-        
-        if data['query'] not in valid_queries:
+        if data['query'] not in VALID_QUERIES:
             return make_response(jsonify({'error': 'Invalid visualization type'}), 400)
-            
-        def generate():
-            figure = create_visualization(data['query'])
-            if figure:
-                chunk_size = 8192
-                figure_json = json.dumps({'figure': figure})
-                
-                for i in range(0, len(figure_json), chunk_size):
-                    chunk = figure_json[i:i + chunk_size]
-                    yield chunk
-                    
-        response = Response(generate(), mimetype='application/json')
+        
+        version = get_data_version()
+        cached = _cached_figure(data['query'], version)
+        if cached:
+            etag, body = cached
+        else:
+            try:
+                with analytics.admit(_estimated_cost_mb(data['query'])):
+                    # A request queued ahead of this one may have rendered it already
+                    cached = _cached_figure(data['query'], version)
+                    if cached:
+                        etag, body = cached
+                    else:
+                        body = create_visualization(data['query'])
+                        if not body:
+                            return make_response(jsonify({'error': 'No figure generated'}), 500)
+                        etag = _store_figure(data['query'], version, body)
+            except AdmissionRejected as e:
+                response = make_response(jsonify({'error': str(e)}), 503)
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+        
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = Response(_stream(body), mimetype='application/json')
+            response.headers['Content-Length'] = str(len(_PREFIX) + len(body) + len(_SUFFIX))
+        response.set_etag(etag)
+        # Let browsers keep the figure but revalidate it on every load
+        response.headers['Cache-Control'] = 'no-cache'
         return response
         
     except Exception as e:
         logging.error(f"Visualization error: {str(e)}")
-        return make_response(jsonify({'error': str(e)}), 500)
\ No newline at end of file
+        return make_response(jsonify({'error': str(e)}), 500)
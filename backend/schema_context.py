@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+from sqlalchemy import select
+
+from backend.app import db
+from backend.db_pool import get_analytics_engine
+from backend.migrations import current_version
+
+# A compact description of the reporting tables, injected into the chat
+# agent's prompt so it can write its query straight away instead of
+# listing tables and fetching their DDL first. Built from the model
+# metadata plus the notes below and a few sample values, and rebuilt only
+# when the schema migration version changes. The version only moves on a
+# deploy, so it is re-read at most every SCHEMA_CHECK_SECONDS rather than
+# on every question.
+SCHEMA_CHECK_SECONDS = int(os.getenv('SCHEMA_CHECK_SECONDS', '300'))
+TABLE_NOTES = {
+    'batches': 'one row per optimiser run (batch)',
+    'batch_details': 'saw and source PDF of each batch',
+    'items': 'catalogue of profiles that get cut',
+    'batch_items': 'one row per product cut in a batch; lengths in mm',
+    'offcuts': 'leftover bar pieces kept for reuse',
+    'batch_offcut_suggestions': 'offcut reuse suggested by the optimiser or confirmed in the app',
+    'offcut_usage_history': 'each time an offcut was reused in a batch',
+    'monthly_item_rollups': 'batch_items totals per item per month; prefer it for trends and totals',
+}
+
+COLUMN_NOTES = {
+    'batches': {
+        'batch_code': "e.g. 'BO003643'",
+    },
+    'items': {
+        'item_description': 'profile name; equals offcuts.material_profile',
+    },
+    'batch_items': {
+        'quantity': '2 for double cuts, else 1',
+        'input_bar_length_mm': 'length of one input bar',
+        'total_length_used_mm': 'bar_length_used_mm * quantity',
+        'total_offcut_length_created_mm': 'offcut_length_created_mm * quantity',
+        'waste_percentage': 'percent of input length left as offcut',
+        'usage_efficiency': 'percent of input length used',
+    },
+    'offcuts': {
+        'legacy_offcut_id': 'ID printed on the optimiser reports',
+        'material_profile': 'equals items.item_description',
+        'related_legacy_offcut_id': 'sibling offcut cut from the same double-cut bar',
+        'is_available': 'false once reused',
+    },
+    'batch_offcut_suggestions': {
+        'offcut_legacy_id_1': 'offcuts.legacy_offcut_id',
+        'offcut_legacy_id_2': 'second offcut for double cuts',
+    },
+    'monthly_item_rollups': {
+        'usage_efficiency_sum': 'average efficiency = usage_efficiency_sum / usage_efficiency_count',
+    },
+}
+
+# Text columns whose typical values help the model match user wording
+SAMPLE_COLUMNS = {
+    'batch_details': ['saw_name'],
+    'items': ['item_description'],
+}
+SAMPLE_SIZE = 3
+
+_lock = threading.Lock()
+_cached = None  # (schema version, monotonic time the version was read, text)
+
+
+def _describe_column(column, dialect):
+    text = f"{column.name} {column.type.compile(dialect).lower()}"
+    if column.primary_key:
+        text += ' pk'
+    for foreign_key in column.foreign_keys:
+        text += f' -> {foreign_key.target_fullname}'
+    return text
+
+
+def _samples(connection, table, column_name):
+    column = table.c[column_name]
+    rows = connection.execute(
+        select(column).where(column.isnot(None)).distinct().limit(SAMPLE_SIZE)
+    ).scalars().all()
+    return ', '.join(repr(value) for value in rows)
+
+
+def build_schema_context():
+    """Describe every table in TABLE_NOTES as a few lines of plain text"""
+    tables = db.Model.metadata.tables
+    lines = []
+    with get_analytics_engine().connect() as connection:
+        for name, note in TABLE_NOTES.items():
+            table = tables[name]
+            lines.append(f"{name}: {note}")
+            notes = COLUMN_NOTES.get(name, {})
+            for column in table.columns:
+                description = _describe_column(column, connection.dialect)
+                if column.name in notes:
+                    description += f" ({notes[column.name]})"
+                lines.append(f"  {description}")
+            for column_name in SAMPLE_COLUMNS.get(name, []):
+                samples = _samples(connection, table, column_name)
+                if samples:
+                    lines.append(f"  e.g. {column_name}: {samples}")
+    return "\n".join(lines)
+
+
+def _fresh(cached):
+    return cached is not None and time.monotonic() - cached[1] < SCHEMA_CHECK_SECONDS
+
+
+def get_schema_context():
+    """The schema context for the current migration version, built once per version"""
+    global _cached
+    cached = _cached
+    if _fresh(cached):
+        return cached[2]
+    with _lock:
+        if not _fresh(_cached):
+            with get_analytics_engine().connect() as connection:
+                version = current_version(connection)
+            if _cached is None or _cached[0] != version:
+                _cached = (version, time.monotonic(), build_schema_context())
+            else:
+                _cached = (version, time.monotonic(), _cached[2])
+        return _cached[2]
@@ -0,0 +1,47 @@
+import threading
+import time
+
+# Expensive long-lived objects (the chat agent, its LLM client and schema
+# reflection) are registered here by name and built on first use rather
+# than at import, so a gunicorn worker that never serves chat never pays
+# for them. Each service is built once per process, under its own lock, so
+# concurrent first requests wait for one build instead of racing.
+_factories = {}
+_instances = {}
+_build_seconds = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def service(name):
+    """Register the decorated zero-argument function as the factory for name"""
+    def register(factory):
+        with _registry_lock:
+            _factories[name] = factory
+            _locks[name] = threading.Lock()
+        return factory
+    return register
+
+
+def get(name):
+    """Return the named service, building it on first use"""
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+
+    with _locks[name]:
+        if name not in _instances:
+            start = time.perf_counter()
+            _instances[name] = _factories[name]()
+            _build_seconds[name] = time.perf_counter() - start
+            print(f"Initialised {name} in {_build_seconds[name]:.2f}s")
+    return _instances[name]
+
+
+def status():
+    """Which services have been built in this process, and how long each took"""
+    return {
+        name: {'built': name in _instances, 'build_seconds': round(_build_seconds.get(name, 0), 3)}
+        for name in _factories
+    }
@@ -0,0 +1,228 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from backend.data_version import get_data_version
+from backend.db_pool import get_analytics_engine
+
+# Guardrails for the SQL the chat agent writes. Its queries share the
+# connection pool with the app's endpoints, so each one runs read-only
+# under a statement timeout, at most CHAT_SQL_CONCURRENCY at a time per
+# worker, and hands back a bounded number of rows and bytes. Results are
+# cached by normalised SQL and data version, as the agent often re-runs a
+# query within one conversation.
+CHAT_SQL_TIMEOUT_MS = int(os.getenv('CHAT_SQL_TIMEOUT_MS', '5000'))
+CHAT_SQL_MAX_ROWS = int(os.getenv('CHAT_SQL_MAX_ROWS', '200'))
+CHAT_SQL_MAX_BYTES = int(os.getenv('CHAT_SQL_MAX_BYTES', str(16 * 1024)))
+CHAT_SQL_CONCURRENCY = int(os.getenv('CHAT_SQL_CONCURRENCY', '1'))
+CHAT_SQL_CACHE_SIZE = int(os.getenv('CHAT_SQL_CACHE_SIZE', '128'))
+MAX_VALUE_LENGTH = 300
+
+# Quoted text and comments are matched whole, so a ';' or run of spaces
+# inside them is never mistaken for a statement separator or reformatted
+_TOKEN = re.compile(r"""
+    '(?:[^']|'')*'                       # string literal
+  | "(?:[^"]|"")*"                       # quoted identifier
+  | \$(?P<tag>\w*)\$.*?\$(?P=tag)\$         # PostgreSQL dollar-quoted string
+  | --[^\n]*                             # line comment
+  | /\*.*?\*/                            # block comment
+  | \s+
+  | [A-Za-z_][\w$]*                      # keyword, identifier or function name
+  | [^\w'"$;\s-]+
+  | .
+""", re.VERBOSE | re.DOTALL)
+_READ_STATEMENT = re.compile(r'^\(*\s*(select|with|values)\b', re.IGNORECASE)
+
+# Functions the agent may call. A read-only transaction still lets a query
+# change session state (set_config, advisory locks) or run other SQL
+# (query_to_xml), so any function outside this list is refused.
+ALLOWED_FUNCTIONS = frozenset("""
+    count sum avg min max total stddev stddev_pop stddev_samp variance var_pop var_samp
+    string_agg array_agg group_concat bool_and bool_or every percentile_cont percentile_disc mode
+    row_number rank dense_rank percent_rank cume_dist ntile lag lead first_value last_value nth_value
+    coalesce nullif greatest least ifnull iif cast
+    round ceil ceiling floor abs trunc mod power sqrt div sign
+    lower upper length char_length trim ltrim rtrim substring substr replace concat concat_ws
+    position strpos instr split_part left right lpad rpad initcap printf
+    date_trunc date_part extract age to_char to_date to_timestamp make_date now
+    date datetime strftime julianday
+""".split())
+
+# Keywords that can be followed by "(" without calling a function
+_PAREN_KEYWORDS = frozenset("""
+    select from where join on using in exists any all some values over filter within as
+    and or not is like ilike between when then else case end group order by having
+    union intersect except with recursive lateral distinct limit offset array row
+""".split())
+
+_slots = threading.BoundedSemaphore(CHAT_SQL_CONCURRENCY)
+_cache_lock = threading.Lock()
+_cache = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'rejected': 0, 'timeouts': 0, 'truncated': 0}
+
+
+class QueryRejected(Exception):
+    """The statement is not a single read-only query"""
+
+
+def _tokens(sql):
+    return [match.group() for match in _TOKEN.finditer(sql)]
+
+
+def normalise_sql(sql):
+    """Drop comments and one trailing semicolon, and collapse whitespace outside quotes"""
+    parts = []
+    for token in _tokens(sql):
+        if token.startswith(('--', '/*')) or token.isspace():
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+            continue
+        parts.append(token)
+    sql = ''.join(parts).strip()
+    return sql[:-1].rstrip() if sql.endswith(';') else sql
+
+
+def _called_functions(tokens):
+    """Names of the functions called: a word or quoted identifier followed by "(" """
+    words = [token for token in tokens if not token.isspace() and not token.startswith(('--', '/*'))]
+    for word, following in zip(words, words[1:]):
+        if not following.startswith('('):
+            continue
+        if word.startswith('"'):
+            yield word[1:-1].replace('""', '"').lower()
+        elif (word[0].isalpha() or word[0] == '_') and word.lower() not in _PAREN_KEYWORDS:
+            yield word.lower()
+
+
+def _check_statement(sql):
+    if not _READ_STATEMENT.match(sql):
+        raise QueryRejected('Only SELECT queries are allowed.')
+    tokens = _tokens(sql)
+    if ';' in tokens:
+        raise QueryRejected('Run one statement at a time.')
+    for name in _called_functions(tokens):
+        if name not in ALLOWED_FUNCTIONS:
+            raise QueryRejected(f"Function {name}() is not allowed. "
+                                "Use standard aggregate, date, string and math functions.")
+
+
+def _set_limits(connection):
+    """Make the current transaction read-only with a statement timeout"""
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SET TRANSACTION READ ONLY'))
+        connection.execute(text("SELECT set_config('statement_timeout', :timeout, true)"),
+                           {'timeout': str(CHAT_SQL_TIMEOUT_MS)})
+        return lambda: None
+
+    # SQLite stand-in: refuse writes and interrupt the query once it overruns
+    raw = connection.connection.dbapi_connection
+    deadline = time.monotonic() + CHAT_SQL_TIMEOUT_MS / 1000
+    connection.exec_driver_sql('PRAGMA query_only = ON')
+    raw.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+
+    def reset():
+        raw.set_progress_handler(None, 0)
+        connection.exec_driver_sql('PRAGMA query_only = OFF')
+    return reset
+
+
+def _reset_session(connection):
+    """Undo session state the query left behind before the connection is pooled again.
+
+    Runs after the query's transaction has ended, committed or not, since a
+    rollback does not release session-level advisory locks.
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    try:
+        connection.exec_driver_sql('RESET ALL')
+        connection.exec_driver_sql('SELECT pg_advisory_unlock_all()')
+        connection.commit()
+    except Exception as e:
+        # Never hand a connection in an unknown state back to the pool
+        print(f"Error resetting chat SQL connection, discarding it: {str(e)}")
+        connection.invalidate()
+
+
+def _format_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    value = str(value)
+    return value[:MAX_VALUE_LENGTH] + '...' if len(value) > MAX_VALUE_LENGTH else value
+
+
+def _execute(sql):
+    """Run sql and format at most CHAT_SQL_MAX_ROWS rows in CHAT_SQL_MAX_BYTES"""
+    with get_analytics_engine().connect() as connection:
+        try:
+            with connection.begin():
+                reset = _set_limits(connection)
+                try:
+                    result = connection.execute(text(sql))
+                    rows = result.fetchmany(CHAT_SQL_MAX_ROWS + 1)
+                    result.close()
+                finally:
+                    reset()
+        finally:
+            _reset_session(connection)
+
+    parts, size, truncated = [], 2, len(rows) > CHAT_SQL_MAX_ROWS
+    for row in rows[:CHAT_SQL_MAX_ROWS]:
+        part = repr(tuple(_format_value(value) for value in row))
+        if size + len(part) + 2 > CHAT_SQL_MAX_BYTES:
+            truncated = True
+            break
+        parts.append(part)
+        size += len(part) + 2
+    output = '[' + ', '.join(parts) + ']'
+    if truncated:
+        _stats['truncated'] += 1
+        output += (f"\n(Result truncated to the first {len(parts)} rows. "
+                   "Aggregate or add a LIMIT for a complete answer.)")
+    return output
+
+
+def run_guarded_query(query):
+    """Tool entry point: return query results, or an error message the agent can act on"""
+    sql = normalise_sql(query)
+    try:
+        _check_statement(sql)
+    except QueryRejected as e:
+        _stats['rejected'] += 1
+        return f"Error: {e}"
+
+    key = (sql, get_data_version())
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return _cache[key]
+        _stats['misses'] += 1
+
+    try:
+        with _slots:
+            output = _execute(sql)
+    except Exception as e:
+        message = str(e).lower()
+        if 'statement timeout' in message or 'interrupted' in message:
+            _stats['timeouts'] += 1
+            return (f"Error: query exceeded the {CHAT_SQL_TIMEOUT_MS} ms time limit. "
+                    "Use the monthly_item_rollups table or narrow the query.")
+        return f"Error: {e}"
+
+    with _cache_lock:
+        _cache[key] = output
+        while len(_cache) > CHAT_SQL_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return output
+
+
+def stats():
+    with _cache_lock:
+        return {**_stats, 'entries': len(_cache), 'max_entries': CHAT_SQL_CACHE_SIZE,
+                'timeout_ms': CHAT_SQL_TIMEOUT_MS, 'max_rows': CHAT_SQL_MAX_ROWS,
+                'max_bytes': CHAT_SQL_MAX_BYTES}
@@ -0,0 +1,96 @@
+import os
+import re
+import tempfile
+import time
+import uuid
+
+import pyarrow as pa
+
+# Processed uploads wait here, as Arrow IPC files, between the processing job
+# and the ingest request. Any worker on the instance can pick a stage up by
+# its ID; stages nobody ingests are swept once they pass the TTL.
+STAGING_DIR = os.getenv('STAGING_DIR', os.path.join(tempfile.gettempdir(), 'offcut_staging'))
+STAGING_TTL_SECONDS = int(os.getenv('STAGING_TTL_SECONDS', str(6 * 3600)))
+
+_STAGING_ID = re.compile(r'^[0-9a-f]{32}$')
+_SUFFIX = '.arrow'
+
+
+class StagingNotFound(Exception):
+    """The staging ID is unknown, malformed or has expired"""
+
+
+def _stage_path(staging_id):
+    if not isinstance(staging_id, str) or not _STAGING_ID.match(staging_id):
+        raise StagingNotFound(f"Invalid staging ID: {staging_id!r}")
+    return os.path.join(STAGING_DIR, staging_id + _SUFFIX)
+
+
+def stage_dataframe(df):
+    """Write a processed DataFrame to the staging area and return its staging ID"""
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    sweep_expired()
+
+    staging_id = uuid.uuid4().hex
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fd, tmp_path = tempfile.mkstemp(dir=STAGING_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # Readers only ever see complete files
+        os.replace(tmp_path, _stage_path(staging_id))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return staging_id
+
+
+def load_staged(staging_id):
+    """Read a staged DataFrame back through a memory map.
+
+    Numeric columns are backed directly by the mapped file rather than read
+    into a separate buffer first; the file stays in place until discard().
+    """
+    path = _stage_path(staging_id)
+    try:
+        source = pa.memory_map(path, 'r')
+    except FileNotFoundError:
+        raise StagingNotFound(f"Staged data {staging_id} not found or expired")
+    # The mapping is released once the last column referencing it is freed
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks avoids consolidating columns into fresh 2-D blocks
+    return table.to_pandas(split_blocks=True)
+
+
+def discard(staging_id):
+    """Remove a stage once it has been ingested"""
+    try:
+        os.unlink(_stage_path(staging_id))
+    except FileNotFoundError:
+        pass
+
+
+def sweep_expired(now=None):
+    """Delete stages older than the TTL, returning how many were removed"""
+    cutoff = (time.time() if now is None else now) - STAGING_TTL_SECONDS
+    removed = 0
+    try:
+        names = os.listdir(STAGING_DIR)
+    except FileNotFoundError:
+        return removed
+    for name in names:
+        if not name.endswith((_SUFFIX, '.tmp')):
+            continue
+        path = os.path.join(STAGING_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    if removed:
+        print(f"Removed {removed} expired staged uploads")
+    return removed
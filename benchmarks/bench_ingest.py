@@ -0,0 +1,126 @@
+"""Time bulk ingestion against the previous row-by-row ORM path.
+
+Builds a few thousand synthetic optimiser rows and ingests them into a
+fresh database with each path. Uses SQLite by default; point DATABASE_URL
+at a scratch Postgres database to measure real network round trips.
+
+    python -m benchmarks.bench_ingest [rows]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+from benchmarks.common import setup_environment, report
+
+app = setup_environment()
+
+import pandas as pd  # noqa: E402
+from backend.app import db  # noqa: E402
+from backend.models import Item, Offcut, BatchItem, BatchOffcutSuggestion  # noqa: E402
+from backend.data_pipeline import create_dataframe, ingest_data  # noqa: E402
+
+
+def synthetic_dataframe(n_rows, n_batches=4, n_items=300, seed=0):
+    rng = random.Random(seed)
+    parsed = []
+    next_offcut_id = 500000
+    for n in range(n_rows):
+        double_cut = rng.random() < 0.2
+        bar_length = rng.choice([5000, 6000, 6500])
+        used = rng.randint(1000, bar_length)
+        created = [next_offcut_id, next_offcut_id + 1] if double_cut else [next_offcut_id]
+        next_offcut_id += len(created)
+        parsed.append({
+            'Batch No': f"BENCH{n % n_batches:03d}",
+            'Saw Name': rng.choice(['Saw 1', 'Saw 2']),
+            'Product Code': f"P{n % n_items:04d}",
+            'Product Description': f"Profile {n % n_items:04d}",
+            'Input Bar Length': bar_length,
+            'Suggested Offcut ID(s)': str(rng.randint(1, 400000)) if rng.random() < 0.3 else 'None',
+            'Bar Length Used': used,
+            'Offcut ID(s) Created': ' & '.join(str(i) for i in created),
+            'Double Cut': 'Yes' if double_cut else 'No',
+        })
+    df = create_dataframe(parsed)
+    df['source_file'] = 'benchmark.pdf'
+    df['batch_date'] = '2024-01-15'
+    return df
+
+
+def legacy_ingest(df):
+    """The row-by-row ingest this replaced, kept here for comparison"""
+    from backend.models import Batch, BatchDetail
+    df = df[df['Saw Name'] != 'Steel Saw'].copy()
+    for batch_code, batch_group in df.groupby('Batch No', observed=True):
+        batch = Batch(batch_code=batch_code, batch_date=pd.to_datetime(batch_group['batch_date'].iloc[0]).date())
+        db.session.add(batch)
+        db.session.flush()
+        batch_detail = BatchDetail(batch_id=batch.batch_id, saw_name=batch_group['Saw Name'].iloc[0],
+                                   source_file=batch_group['source_file'].iloc[0])
+        db.session.add(batch_detail)
+        db.session.flush()
+        for _, row in batch_group.iterrows():
+            item = Item.query.filter_by(item_description=row['Item Description']).first()
+            if not item:
+                item = Item(item_code=row['Item Code'], item_description=row['Item Description'])
+                db.session.add(item)
+                db.session.flush()
+            db.session.add(BatchItem(
+                batch_id=batch.batch_id, item_id=item.item_id, quantity=int(row['Quantity']),
+                input_bar_length_mm=int(row['Input Bar Length']), bar_length_used_mm=int(row['Bar Length Used']),
+                total_length_used_mm=int(row['Total Length Used']),
+                offcut_length_created_mm=int(row['Offcut Length Created']),
+                total_offcut_length_created_mm=int(row['Total Offcut Length Created']),
+                double_cut=row['Double Cut'] == 'Yes', waste_percentage=float(row['Waste Percentage']),
+                usage_efficiency=float(row['Usage Efficiency'])
+            ))
+            ids = str(row['Offcut ID(s) Created']).split('&')
+            for i, offcut_id in enumerate(ids):
+                db.session.add(Offcut(
+                    legacy_offcut_id=int(offcut_id.strip()), length_mm=int(row['Offcut Length Created']),
+                    material_profile=row['Item Description'], created_in_batch_detail_id=batch_detail.batch_detail_id,
+                    related_legacy_offcut_id=int(ids[i - 1].strip()) if row['Double Cut'] == 'Yes' and i > 0 else None,
+                    is_available=True, reuse_count=0
+                ))
+            if str(row['Suggested Offcut ID(s)']).lower() != 'none':
+                db.session.add(BatchOffcutSuggestion(
+                    batch_id=batch.batch_id, offcut_legacy_id_1=int(row['Suggested Offcut ID(s)']),
+                    matched_profile=row['Item Description'], suggested_length_mm=int(row['Offcut Length Created']),
+                    batch_detail_id=batch_detail.batch_detail_id
+                ))
+
+
+def run(ingest, df):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest(df)
+        db.session.commit()
+        elapsed = time.perf_counter() - start
+        counts = (BatchItem.query.count(), Offcut.query.count(), BatchOffcutSuggestion.query.count())
+        db.session.remove()
+    return elapsed, counts
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    df = synthetic_dataframe(n_rows)
+
+    legacy_time, legacy_counts = run(legacy_ingest, df)
+    bulk_time, bulk_counts = run(ingest_data, df)
+    assert legacy_counts == bulk_counts, (legacy_counts, bulk_counts)
+
+    report(f"Ingesting {n_rows} rows into {os.environ['DATABASE_URL'].split(':')[0]}",
+           [("row-by-row ORM", f"{legacy_time:.2f} s", "1.0x"),
+            ("bulk", f"{bulk_time:.2f} s", f"{legacy_time / bulk_time:.1f}x")],
+           ["path", "time", "speedup"])
+    print(f"batch_items / offcuts / suggestions written: {bulk_counts}")
+
+
+if __name__ == '__main__':
+    main()
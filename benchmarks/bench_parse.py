@@ -0,0 +1,207 @@
+"""Time the optimiser report parser and DataFrame builder against the previous versions.
+
+Generates a synthetic report (10,000 products by default) split over
+several BAR OPTIMISING sections and padded the way LlamaParse lays out
+text, checks both parsers return identical records, and times each. Small
+randomised reports with missing fields and odd spacing, plus a few
+hand-written oddities, are also compared to catch edge-case drift. The
+parsed records are then turned into a DataFrame with the columnar builder
+and the previous row-dict builder, comparing build time and memory.
+
+    python -m benchmarks.bench_parse [products]
+"""
+import random
+import re
+import sys
+import time
+
+from benchmarks.common import setup_environment, report
+
+setup_environment()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from backend.data_pipeline import parse_data, create_dataframe, _split_sections  # noqa: E402
+
+
+def legacy_parse_data(text_data):
+    """The parser this replaced, kept here for comparison"""
+    data = []
+    batch_no = None
+    saw_name = None
+
+    sections = re.split(r'\s*BAR OPTIMISING\s*', text_data)
+
+    for section in sections:
+        if "BATCH:" in section:
+            batch_no_match = re.search(r'BATCH:\s*(\S+)', section)
+            if batch_no_match:
+                batch_no = batch_no_match.group(1).strip()
+
+        if "Saw:" in section:
+            saw_name_match = re.search(r'Saw:\s*(.+)', section)
+            if saw_name_match:
+                saw_name = saw_name_match.group(1).strip()
+
+        products = re.findall(r'(Product Code:\s*\S+[\s\S]*?)(?=Product Code:|$)', section)
+        for product in products:
+            item = {
+                'Batch No': batch_no,
+                'Saw Name': saw_name,
+            }
+
+            patterns = {
+                'Product Code': r'Product Code:\s*(\S+)',
+                'Product Description': r'Description:\s*(.+)',
+                'Input Bar Length': r'Bar Length:\s*(\d+)',
+                'Suggested Offcut ID(s)': r'Use Offcut[s]?:\s*([\d\s&]*)',
+                'Bar Length Used': r'Total Used:\s*(\d+)',
+                'Offcut ID(s) Created': r'Save Offcut[s]?:\s*([\d\s&]*)'
+            }
+
+            for key, pattern in patterns.items():
+                match = re.search(pattern, product)
+                if match:
+                    value = match.group(1).strip()
+                    if key in ['Input Bar Length', 'Bar Length Used']:
+                        value = int(value)
+                    item[key] = value
+                else:
+                    item[key] = 'None' if 'ID' in key else 0
+
+            item['Double Cut'] = 'Yes' if "*** Double Cut Bars ***" in product else 'No'
+            data.append(item)
+
+    return data
+
+
+def legacy_create_dataframe(parsed_data):
+    """The row-dict DataFrame builder this replaced, kept here for comparison"""
+    rows = []
+    for item in parsed_data:
+        quantity = 2 if item['Double Cut'] == 'Yes' else 1
+        offcut_length_created = item['Input Bar Length'] - item['Bar Length Used']
+        rows.append({
+            'Batch No': item['Batch No'],
+            'Saw Name': item['Saw Name'],
+            'Item Code': item['Product Code'],
+            'Item Description': item['Product Description'],
+            'Input Bar Length': item['Input Bar Length'],
+            'Total Input Length': item['Input Bar Length'] * quantity,
+            'Suggested Offcut ID(s)': item['Suggested Offcut ID(s)'],
+            'Double Cut': item['Double Cut'],
+            'Quantity': quantity,
+            'Bar Length Used': item['Bar Length Used'],
+            'Total Length Used': quantity * item['Bar Length Used'],
+            'Offcut Length Created': offcut_length_created,
+            'Total Offcut Length Created': quantity * offcut_length_created,
+            'Offcut ID(s) Created': item['Offcut ID(s) Created'],
+        })
+    df = pd.DataFrame(rows)
+    df['Waste Percentage'] = (df['Total Offcut Length Created'] / df['Input Bar Length']) * 100
+    df['Usage Efficiency'] = (df['Total Length Used'] / df['Input Bar Length']) * 100
+    return df
+
+
+EDGE_CASES = [
+    "",
+    "BAR OPTIMISING",
+    "Product Code: A Description: same line Bar Length: 10 Total Used: 5\n",
+    "Product Code:\nProduct Code: B\nTotal Used: 7",
+    "Product Code: C Description: runs into Product Code: D\nBar Length: 9",
+    "Product Code: E\nTotal Used:\nProduct Code: F\nTotal Used: 3\n",
+    "Product Code:   \nBAR OPTIMISING  \n  BATCH:\nSaw:\n\nProduct Code: G *** Double Cut Bars ***",
+    "Product Code: H\nUse Offcuts 12\nUse Offcut: 4 & 5\nSave Offcut:\n",
+    "Product Code: I\n*** Double Cut Bars **\nProduct Code: J *** Double Cut Bars ***\n\n",
+]
+
+
+def synthetic_product(rng, n, sloppy=False):
+    lines = [f"Product Code: P{n:05d}"]
+    fields = [
+        f"Description: Profile {rng.randint(1, 400)} White",
+        f"Bar Length: {rng.choice([5000, 6000, 6500])}",
+        f"Use Offcut{'s' if rng.random() < 0.3 else ''}: {rng.randint(1, 99999)}" if rng.random() < 0.3 else None,
+        f"Total Used: {rng.randint(500, 5000)}",
+        f"Save Offcuts: {rng.randint(1, 99999)} & {rng.randint(1, 99999)}" if rng.random() < 0.2
+        else f"Save Offcut: {rng.randint(1, 99999)}",
+        "*** Double Cut Bars ***" if rng.random() < 0.2 else None,
+    ]
+    for field in fields:
+        if field is None or (sloppy and rng.random() < 0.15):
+            continue
+        if sloppy and rng.random() < 0.2:
+            field = field.replace(': ', ':\n  ')
+        lines.append(field)
+    lines.extend(f"  Cut {i + 1}: {rng.randint(100, 2000)} mm" for i in range(rng.randint(1, 4)))
+    # LlamaParse's text mode keeps the PDF layout, so lines carry long runs of padding
+    return "\n".join(line + " " * rng.randint(0, 80) for line in lines)
+
+
+def synthetic_report(n_products, products_per_section=250, seed=0, sloppy=False):
+    rng = random.Random(seed)
+    sections = []
+    for start in range(0, n_products, products_per_section):
+        header = f"BATCH: B{start // 1000:04d}\nSaw: Saw {rng.randint(1, 3)}\n"
+        if sloppy and rng.random() < 0.3:
+            header = ""
+        products = [synthetic_product(rng, n, sloppy) for n in range(start, min(start + products_per_section, n_products))]
+        sections.append(" " * rng.randint(0, 200) + "BAR OPTIMISING\n" + header + "\n\n".join(products) + ("\n" if rng.random() < 0.5 else ""))
+    return "\n".join(sections)
+
+
+def best_of(fn, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    n_products = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    for text in EDGE_CASES:
+        assert parse_data(text) == legacy_parse_data(text), f"records differ for {text!r}"
+
+    for seed in range(200):
+        text = synthetic_report(random.Random(seed).randint(1, 40), products_per_section=7, seed=seed, sloppy=True)
+        assert parse_data(text) == legacy_parse_data(text), f"records differ for edge-case seed {seed}"
+        assert _split_sections(text) == re.split(r'\s*BAR OPTIMISING\s*', text), f"sections differ for seed {seed}"
+
+    text = synthetic_report(n_products)
+    records = parse_data(text)
+    assert records == legacy_parse_data(text), "records differ on the large report"
+    assert len(records) == n_products
+
+    legacy_time = best_of(legacy_parse_data, text)
+    new_time = best_of(parse_data, text)
+    report(f"Parsing a {len(text) / 1e6:.1f} MB report with {n_products} products",
+           [("per-product regex", f"{legacy_time * 1000:.0f} ms", "1.0x"),
+            ("single pass", f"{new_time * 1000:.0f} ms", f"{legacy_time / new_time:.1f}x")],
+           ["parser", "time", "speedup"])
+
+    legacy_df = legacy_create_dataframe(records)
+    df = create_dataframe(iter(records))
+    for column in legacy_df.columns:
+        if column in ('Waste Percentage', 'Usage Efficiency'):
+            continue
+        assert (legacy_df[column].astype(str) == df[column].astype(str)).all(), f"column {column} differs"
+    # The previous builder divided by one bar's length, overstating double cuts
+    expected = np.where(df['Double Cut'] == 'Yes', legacy_df['Waste Percentage'] / 2, legacy_df['Waste Percentage'])
+    assert np.allclose(df['Waste Percentage'], expected)
+
+    legacy_build = best_of(legacy_create_dataframe, records)
+    new_build = best_of(create_dataframe, records)
+    legacy_mb = legacy_df.memory_usage(deep=True).sum() / 1e6
+    new_mb = df.memory_usage(deep=True).sum() / 1e6
+    report(f"Building a DataFrame from {n_products} records",
+           [("row dicts", f"{legacy_build * 1000:.0f} ms", f"{legacy_mb:.1f} MB"),
+            ("typed columns", f"{new_build * 1000:.0f} ms", f"{new_mb:.1f} MB")],
+           ["builder", "time", "memory"])
+
+
+if __name__ == '__main__':
+    main()
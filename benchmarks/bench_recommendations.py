@@ -0,0 +1,122 @@
+"""Compare greedy and optimal offcut assignment on synthetic batches.
+
+Reports, per batch size, how much required length each mode served from
+offcuts, the leftover (offcut length minus required length) on the matched
+instructions, and the runtime. A second table times the vectorised
+double-cut kernel against one index lookup per instruction. Runs entirely
+in memory.
+
+    python -m benchmarks.bench_recommendations
+"""
+import contextlib
+import io
+import random
+import time
+
+from benchmarks.common import setup_environment, report
+
+setup_environment()
+
+from backend.offcut_index import OffcutIndex  # noqa: E402
+from backend.batch_optimiser import optimise_assignments, DEFAULT_TIME_BUDGET  # noqa: E402
+from backend.recommendation_engine import _greedy_assignments  # noqa: E402
+from backend.pair_matching import match_double_cuts  # noqa: E402
+
+PROFILES = [f"PROFILE-{n:02d}" for n in range(8)]
+
+
+def synthetic_batch(n_instructions, n_offcuts, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    legacy_id = 100000
+    while len(rows) < n_offcuts:
+        profile, length_mm = rng.choice(PROFILES), rng.randint(300, 3000)
+        rows.append((profile, length_mm, legacy_id, None))
+        if rng.random() < 0.3:
+            # A double cut leaves two equal offcuts, the second naming the first
+            rows.append((profile, length_mm, legacy_id + 1, legacy_id))
+            legacy_id += 1
+        legacy_id += 1
+    instructions = [
+        {
+            'material_profile': rng.choice(PROFILES),
+            'required_length': rng.randint(250, 2800),
+            'double_cut': rng.random() < 0.2,
+        }
+        for _ in range(n_instructions)
+    ]
+    return rows, instructions
+
+
+def score(instructions, assignments):
+    served = leftover = 0
+    for pos, offcuts in assignments.items():
+        required = instructions[pos]['required_length']
+        served += required * len(offcuts)
+        leftover += sum(length_mm - required for length_mm, _ in offcuts)
+    return served, leftover
+
+
+def run(mode, rows, instructions):
+    index = OffcutIndex(rows)
+    start = time.perf_counter()
+    if mode == 'optimal':
+        assignments = optimise_assignments(instructions, index, DEFAULT_TIME_BUDGET)
+    else:
+        assignments = _greedy_assignments(instructions, index)
+    elapsed = time.perf_counter() - start
+    return assignments, elapsed
+
+
+def main():
+    results = []
+    for n_instructions, n_offcuts in [(50, 80), (200, 300), (1000, 1500), (5000, 6000)]:
+        rows, instructions = synthetic_batch(n_instructions, n_offcuts)
+        total_required = sum(i['required_length'] * (2 if i['double_cut'] else 1) for i in instructions)
+        for mode in ('greedy', 'optimal'):
+            # The greedy path logs every lookup; keep the benchmark output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                assignments, elapsed = run(mode, rows, instructions)
+            served, leftover = score(instructions, assignments)
+            results.append((
+                n_instructions, mode, len(assignments),
+                f"{100 * served / total_required:.1f}%", f"{leftover / 1000:.1f} m",
+                f"{elapsed * 1000:.1f} ms"
+            ))
+
+    report("Greedy vs optimal assignment",
+           results,
+           ["instructions", "mode", "matched", "served", "leftover", "runtime"])
+
+    kernel_results = []
+    for n_doubles in [100, 1000, 10000]:
+        rows = [('P', length_mm, legacy_id, related_id)
+                for _, length_mm, legacy_id, related_id in synthetic_batch(0, n_doubles * 3, seed=n_doubles)[0]]
+        required = [random.Random(n_doubles + i).randint(250, 2800) for i in range(n_doubles)]
+
+        index = OffcutIndex(rows)
+        start = time.perf_counter()
+        looped = sum(1 for r in required if index.take('P', r, n=2))
+        loop_time = time.perf_counter() - start
+
+        offcuts = OffcutIndex(rows).offcuts('P')
+        related = {legacy_id: related_id for _, _, legacy_id, related_id in rows}
+        lengths = [length_mm for length_mm, _ in offcuts]
+        legacy_ids = [legacy_id for _, legacy_id in offcuts]
+        related_ids = [-1 if related[i] is None else related[i] for i in legacy_ids]
+        start = time.perf_counter()
+        first, _, is_sibling = match_double_cuts(required, lengths, legacy_ids, related_ids)
+        kernel_time = time.perf_counter() - start
+
+        kernel_results.append((
+            n_doubles, looped, int((first >= 0).sum()), int(is_sibling.sum()),
+            f"{loop_time * 1000:.1f} ms", f"{kernel_time * 1000:.1f} ms"
+        ))
+
+    report("Double-cut pairing: per-instruction lookups vs vectorised kernel",
+           kernel_results,
+           ["doubles", "loop matched", "kernel matched", "sibling pairs", "loop", "kernel"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Compare peak memory of the batch report as JSON and as a streamed export.
+
+Fills a fresh database with batches whose details and items line up the way
+the report joins them, then requests /api/reports/batches over growing date
+ranges in each format, consuming the streamed responses chunk by chunk.
+Peak Python allocations should grow with the range for json and stay flat
+for ndjson and csv. Every format must return the same rows.
+
+    python -m benchmarks.bench_reports [batches]
+"""
+import contextlib
+import csv
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.common import setup_environment, report
+
+app = setup_environment()
+
+from sqlalchemy import insert  # noqa: E402
+from backend.app import db  # noqa: E402
+from backend.models import Batch, BatchDetail, BatchItem, Item  # noqa: E402
+
+FIRST_DAY = date(2020, 1, 1)
+
+
+def build_history(n_batches, items_per_batch=20, seed=0):
+    rng = random.Random(seed)
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(Item.__table__), [
+        {'item_id': i + 1, 'item_code': f"P{i:04d}", 'item_description': f"Profile {i:04d} White"}
+        for i in range(400)
+    ])
+    db.session.execute(insert(Batch.__table__), [
+        {'batch_id': b + 1, 'batch_code': f"BO{b:06d}", 'batch_date': FIRST_DAY + timedelta(days=b % 1500)}
+        for b in range(n_batches)
+    ])
+    details, items = [], []
+    for n in range(n_batches * items_per_batch):
+        batch_id = n // items_per_batch + 1
+        bar = rng.choice([5000, 6000, 6500])
+        used = rng.randint(1000, bar)
+        # The report pairs each batch item with the detail of the same ID
+        details.append({'batch_detail_id': n + 1, 'batch_id': batch_id,
+                        'saw_name': f"Saw {rng.randint(1, 3)}", 'source_file': f"batch_{batch_id}.pdf"})
+        items.append({'batch_items_id': n + 1, 'batch_id': batch_id, 'item_id': rng.randint(1, 400),
+                      'quantity': 1, 'input_bar_length_mm': bar, 'bar_length_used_mm': used,
+                      'total_length_used_mm': used, 'offcut_length_created_mm': bar - used,
+                      'total_offcut_length_created_mm': bar - used, 'double_cut': False,
+                      'waste_percentage': round((bar - used) * 100 / bar, 2),
+                      'usage_efficiency': round(used * 100 / bar, 2)})
+    db.session.execute(insert(BatchDetail.__table__), details)
+    db.session.execute(insert(BatchItem.__table__), items)
+    db.session.commit()
+
+
+def fetch(client, days, export_format):
+    """Request the report and return (rows, peak bytes, seconds)"""
+    args = {'start_date': FIRST_DAY.isoformat(), 'end_date': (FIRST_DAY + timedelta(days=days)).isoformat()}
+    if export_format != 'json':
+        args['format'] = export_format
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get('/api/reports/batches', query_string=args, base_url='https://localhost', buffered=False)
+    assert response.status_code == 200
+    if export_format == 'json':
+        rows = len(response.get_json())
+    else:
+        # Count rows as chunks arrive rather than holding the whole body
+        rows = -1 if export_format == 'csv' else 0
+        for chunk in response.response:
+            rows += chunk.count(b'\n' if isinstance(chunk, bytes) else '\n')
+    response.close()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, peak, elapsed
+
+
+def check_formats_agree(client, days):
+    args = {'start_date': FIRST_DAY.isoformat(), 'end_date': (FIRST_DAY + timedelta(days=days)).isoformat()}
+    base = client.get('/api/reports/batches', query_string=args, base_url='https://localhost').get_json()
+    ndjson = client.get('/api/reports/batches', query_string={**args, 'format': 'ndjson'},
+                        base_url='https://localhost').get_data(as_text=True)
+    assert [json.loads(line) for line in ndjson.splitlines()] == base
+    text = client.get('/api/reports/batches', query_string={**args, 'format': 'csv'},
+                      base_url='https://localhost').get_data(as_text=True)
+    records = list(csv.DictReader(io.StringIO(text)))
+    assert [r['batch_code'] for r in records] == [r['batch_code'] for r in base]
+    assert [float(r['efficiency']) for r in records] == [r['efficiency'] for r in base]
+
+
+def main():
+    n_batches = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        build_history(n_batches)
+
+    client = app.test_client()
+    check_formats_agree(client, 60)
+
+    rows = []
+    for days in (30, 180, 365, 1500):
+        for export_format in ('json', 'ndjson', 'csv'):
+            count, peak, elapsed = fetch(client, days, export_format)
+            rows.append((days, export_format, count, f"{elapsed * 1000:.0f} ms", f"{peak / 1e6:.1f} MB"))
+
+    report(f"Batch report over {n_batches} batches", rows, ["days", "format", "rows", "time", "peak"])
+
+
+if __name__ == '__main__':
+    main()
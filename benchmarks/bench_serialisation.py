@@ -0,0 +1,107 @@
+"""Time figure serialisation against the previous convert_numpy path.
+
+Builds Plotly Express bar charts shaped like the dashboard's (grouped by
+year, categorical labels) with a growing number of bars, then encodes each
+one the old way -- to_dict(), a recursive NumPy-to-Python walk, json.dumps
+and 8 KB string slices -- and with graph.figure_json plus the route's
+memoryview streaming. Both must decode to the same figure; the table shows
+the time and the peak Python allocations of each.
+
+    python -m benchmarks.bench_serialisation [max_bars]
+"""
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import setup_environment, report
+
+setup_environment()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import plotly.express as px  # noqa: E402
+from backend.graph import figure_json  # noqa: E402
+from backend.routes.visualization_routes import _stream  # noqa: E402
+
+CHUNK_SIZE = 8192
+
+
+def legacy_make_json_serializable(fig):
+    """The conversion this replaced, kept here for comparison"""
+    fig_dict = fig.to_dict()
+
+    def convert_numpy(obj):
+        if isinstance(obj, np.integer):
+            return int(obj)
+        elif isinstance(obj, np.floating):
+            return float(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        elif isinstance(obj, dict):
+            return {key: convert_numpy(value) for key, value in obj.items()}
+        elif isinstance(obj, list):
+            return [convert_numpy(item) for item in obj]
+        return obj
+
+    return convert_numpy(fig_dict)
+
+
+def legacy_response(fig):
+    response_data = json.dumps({'figure': legacy_make_json_serializable(fig)})
+    return b''.join(response_data[i:i + CHUNK_SIZE].encode('utf-8')
+                    for i in range(0, len(response_data), CHUNK_SIZE))
+
+
+def new_response(fig):
+    return b''.join(_stream(figure_json(fig)))
+
+
+def synthetic_figure(n_bars, seed=0):
+    rng = random.Random(seed)
+    df = pd.DataFrame({
+        'item_description': [f"Profile {i:05d} White" for i in range(n_bars)],
+        'total_length_used': np.array([rng.randint(1000, 10 ** 7) for _ in range(n_bars)], dtype=np.int64) / 1000,
+        'year': np.array([2020 + i % 4 for i in range(n_bars)], dtype=np.int64).astype(str),
+    })
+    return px.bar(df, x='item_description', y='total_length_used', color='year', barmode='group')
+
+
+def measure(fn, fig, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(fig)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn(fig)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    max_bars = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = []
+    n_bars = 10
+    while n_bars <= max_bars:
+        fig = synthetic_figure(n_bars)
+        legacy_body, body = legacy_response(fig), new_response(fig)
+        assert json.loads(legacy_body) == json.loads(body), f"figures differ at {n_bars} bars"
+
+        legacy_time, legacy_peak = measure(legacy_response, fig)
+        new_time, new_peak = measure(new_response, fig)
+        rows.append((n_bars, f"{len(body) / 1e3:.0f} KB",
+                     f"{legacy_time * 1000:.2f} ms", f"{new_time * 1000:.2f} ms",
+                     f"{legacy_time / new_time:.1f}x",
+                     f"{legacy_peak / 1e6:.2f} MB", f"{new_peak / 1e6:.2f} MB"))
+        n_bars *= 10
+
+    report("Serialising a grouped bar chart",
+           rows, ["bars", "body", "convert_numpy", "figure_json", "speedup", "peak (old)", "peak (new)"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Measure worker cold start: import time and RSS of the Flask app.
+
+Each measurement runs in a fresh interpreter, like a gunicorn worker
+booting. "lazy" imports the app as it now starts. "eager" then builds every
+registered service and imports the modules that backend.app used to pull
+in at boot (llama_parse, pandasai, plotly.express, openai), which is the
+cold start every worker paid before services were deferred.
+
+    python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import setup_environment, report
+
+CHILD = r"""
+import json, os, sys, time
+import psutil
+process = psutil.Process()
+rss_before = process.memory_info().rss
+start = time.perf_counter()
+import wsgi
+imported = time.perf_counter() - start
+rss_imported = process.memory_info().rss
+if sys.argv[1] == 'eager':
+    import importlib
+    from backend import services
+    for name in services.status():
+        services.get(name)
+    for module in ('llama_parse', 'pandasai', 'plotly.express', 'openai'):
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+print(json.dumps({
+    'import_seconds': imported,
+    'total_seconds': time.perf_counter() - start,
+    'rss_before_mb': rss_before / 2 ** 20,
+    'rss_imported_mb': rss_imported / 2 ** 20,
+    'rss_after_mb': process.memory_info().rss / 2 ** 20,
+}))
+"""
+
+
+def measure(mode):
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, mode],
+        capture_output=True, text=True, check=True, env=os.environ,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    # Configure the environment the child processes inherit
+    setup_environment()
+
+    rows = []
+    for mode in ('lazy', 'eager'):
+        samples = [measure(mode) for _ in range(runs)]
+        best = min(samples, key=lambda sample: sample['total_seconds'])
+        rows.append((mode, f"{best['import_seconds']:.2f} s", f"{best['total_seconds']:.2f} s",
+                     f"{best['rss_before_mb']:.0f} MB", f"{best['rss_after_mb']:.0f} MB"))
+
+    report(f"Worker cold start (best of {runs})", rows,
+           ["mode", "import app", "ready", "RSS at start", "RSS when ready"])
+
+
+if __name__ == '__main__':
+    main()
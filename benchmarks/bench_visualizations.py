@@ -0,0 +1,153 @@
+"""Time the chart aggregations against the previous pandas chunk pipeline.
+
+Fills a fresh database with a synthetic multi-year history (200,000 batch
+items by default), builds the monthly rollups, then computes the data
+behind each of the four charts both ways and checks they agree.
+
+    python -m benchmarks.bench_visualizations [batch_items]
+"""
+import calendar
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import date
+
+from benchmarks.common import setup_environment, report
+
+app = setup_environment()
+
+import pandas as pd  # noqa: E402
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from backend.app import db  # noqa: E402
+from backend.models import Batch, BatchItem, Item  # noqa: E402
+from backend.data_pipeline import rebuild_monthly_rollups  # noqa: E402
+from backend import graph  # noqa: E402
+
+
+def build_history(n_batch_items, n_items=400, n_batches=2000, years=5, seed=0):
+    rng = random.Random(seed)
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(Item.__table__), [
+        {'item_id': i + 1, 'item_code': f"P{i:04d}", 'item_description': f"Profile {i:04d}"}
+        for i in range(n_items)
+    ])
+    db.session.execute(insert(Batch.__table__), [
+        {'batch_id': b + 1, 'batch_code': f"H{b:05d}",
+         'batch_date': date(2020 + b * years // n_batches, rng.randint(1, 12), rng.randint(1, 28))}
+        for b in range(n_batches)
+    ])
+    rows = []
+    for _ in range(n_batch_items):
+        quantity = 2 if rng.random() < 0.2 else 1
+        bar = rng.choice([5000, 6000, 6500])
+        used = rng.randint(1000, bar)
+        rows.append({
+            'batch_id': rng.randint(1, n_batches), 'item_id': rng.randint(1, n_items),
+            'quantity': quantity, 'input_bar_length_mm': bar, 'bar_length_used_mm': used,
+            'total_length_used_mm': used * quantity, 'offcut_length_created_mm': bar - used,
+            'total_offcut_length_created_mm': (bar - used) * quantity, 'double_cut': quantity == 2,
+            'waste_percentage': round((bar - used) * 100 / bar, 2), 'usage_efficiency': round(used * 100 / bar, 2)
+        })
+    db.session.execute(insert(BatchItem.__table__), rows)
+    rebuild_monthly_rollups()
+    db.session.commit()
+
+
+def legacy_chunks(chunk_size=1000):
+    """The full batch_items join the charts used to stream, kept here for comparison"""
+    engine = create_engine(os.environ['DATABASE_URL'])
+    try:
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True).execute(text("""
+                SELECT b.batch_date, i.item_description,
+                       bi.total_length_used_mm as total_length_used,
+                       bi.total_offcut_length_created_mm as total_offcut_length_created,
+                       bi.usage_efficiency
+                FROM batch_items bi
+                JOIN batches b ON bi.batch_id = b.batch_id
+                JOIN items i ON bi.item_id = i.item_id
+                ORDER BY b.batch_date
+            """))
+            while True:
+                chunk = result.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield pd.DataFrame(chunk)
+    finally:
+        engine.dispose()
+
+
+def legacy_usage_over_time():
+    parts = []
+    for chunk in list(legacy_chunks()):
+        chunk['batch_date'] = pd.to_datetime(chunk['batch_date'])
+        chunk['year'] = chunk['batch_date'].dt.year
+        chunk['month_num'] = chunk['batch_date'].dt.month
+        parts.append(chunk.groupby(['year', 'month_num'])['total_length_used'].sum().reset_index())
+    agg = pd.concat(parts).groupby(['year', 'month_num'])['total_length_used'].sum().reset_index()
+    return agg.sort_values(['month_num', 'year'])
+
+
+def legacy_totals(column):
+    totals = {}
+    for chunk in list(legacy_chunks()):
+        for item, total in chunk.groupby('item_description')[column].sum().items():
+            totals[item] = totals.get(item, 0) + total
+    return pd.Series(totals)
+
+
+def legacy_efficiency():
+    sums, counts = {}, {}
+    for chunk in list(legacy_chunks()):
+        for name, group in chunk.groupby('item_description'):
+            values = pd.to_numeric(group['usage_efficiency'], errors='coerce')
+            sums[name] = sums.get(name, 0) + values.sum()
+            counts[name] = counts.get(name, 0) + values.count()
+    average = pd.Series({name: sums[name] / counts[name] for name in sums if counts[name]}, dtype=float)
+    return pd.concat([average.nlargest(5), average.nsmallest(5).sort_values(ascending=False)])
+
+
+def timed_call(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    n_batch_items = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        build_history(n_batch_items)
+
+    rows = []
+    with app.app_context():
+        legacy_time, legacy = timed_call(legacy_usage_over_time)
+        new_time, new = timed_call(graph.usage_over_time_data)
+        assert legacy['total_length_used'].tolist() == (new['total_length_used'] * 1000).round().astype(int).tolist()
+        assert new['month_name'].tolist() == [calendar.month_abbr[m] for m in legacy['month_num']]
+        rows.append(("usage over time", f"{legacy_time * 1000:.0f} ms", f"{new_time * 1000:.1f} ms", len(new)))
+
+        legacy_time, legacy = timed_call(lambda: legacy_totals('total_length_used').nlargest(10))
+        new_time, new = timed_call(graph.top_materials_by_usage_data)
+        assert sorted(legacy.index) == sorted(new['item_description'])
+        rows.append(("top 10 by usage", f"{legacy_time * 1000:.0f} ms", f"{new_time * 1000:.1f} ms", len(new)))
+
+        legacy_time, legacy = timed_call(lambda: legacy_totals('total_offcut_length_created').nlargest(10))
+        new_time, new = timed_call(graph.top_items_by_offcut_data)
+        assert sorted(legacy.index) == sorted(new['item_description'])
+        rows.append(("top 10 by offcut", f"{legacy_time * 1000:.0f} ms", f"{new_time * 1000:.1f} ms", len(new)))
+
+        legacy_time, legacy = timed_call(legacy_efficiency)
+        new_time, new = timed_call(graph.efficiency_extremes_data)
+        assert all(abs(a - b) < 1e-6 for a, b in zip(legacy.tolist(), new['usage_efficiency']))
+        rows.append(("efficiency top/bottom 5", f"{legacy_time * 1000:.0f} ms", f"{new_time * 1000:.1f} ms", len(new)))
+
+    report(f"Chart data over {n_batch_items} batch items",
+           rows, ["chart", "pandas chunks", "SQL on rollups", "rows returned"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Shared setup for the benchmark scripts.
+
+The backend reads its configuration from the environment at import time, so
+these defaults point it at a throwaway SQLite database when no real
+DATABASE_URL is configured. Run scripts from the repository root, e.g.
+
+    python -m benchmarks.bench_recommendations
+"""
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_environment(database_url='sqlite:////tmp/offcut_benchmark.db'):
+    """Configure the environment and return the Flask app.
+
+    backend.app must be imported before any other backend module, as the
+    models and routes import it in turn.
+    """
+    os.environ.setdefault('DATABASE_URL', database_url)
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+    from backend.app import app
+    return app
+
+
+@contextmanager
+def timed(label, results):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def report(title, rows, columns):
+    """Print a small fixed-width table of benchmark results"""
+    print(f"\n{title}")
+    widths = [max(len(str(col)), *(len(str(row[i])) for row in rows)) for i, col in enumerate(columns)]
+    print("  ".join(str(col).ljust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(value).ljust(w) for value, w in zip(row, widths)))
@@ -37,8 +37,46 @@ interface DatabaseStats {
   }>;
 }
 
+interface ProcessingJob {
+  job_id: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  stage: string | null;
+  progress: number;
+  message: string | null;
+  result?: { preview: any[] };
+  error?: { error: string; batch_code?: string; message?: string };
+}
+
+// Reconnection attempts in a row without any progress before giving up
+const MAX_JOB_STREAM_FAILURES = 5;
+
+// Follow a background processing job over server-sent events until it finishes.
+// The server ends each stream after a few seconds and EventSource reconnects.
+const waitForJob = (statusUrl: string, onProgress: (job: ProcessingJob) => void) =>
+  new Promise<ProcessingJob>((resolve, reject) => {
+    const source = new EventSource(`${API_URL}${statusUrl}`);
+    let failures = 0;
+    source.onmessage = (event) => {
+      failures = 0;
+      const job: ProcessingJob = JSON.parse(event.data);
+      onProgress(job);
+      if (job.status === 'succeeded' || job.status === 'failed') {
+        source.close();
+        resolve(job);
+      }
+    };
+    source.onerror = () => {
+      failures += 1;
+      // A stream ending normally also lands here; EventSource then reconnects on its own
+      if (source.readyState === EventSource.CLOSED || failures > MAX_JOB_STREAM_FAILURES) {
+        source.close();
+        reject(new Error('Lost connection while processing the file'));
+      }
+    };
+  });
+
 const Admin: React.FC = () => {
-  const [file, setFile] = useState<File | null>(null);
+  const [files, setFiles] = useState<File[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [stats, setStats] = useState<DatabaseStats | null>(null);
@@ -46,6 +84,8 @@ const Admin: React.FC = () => {
   const [batchDate, setBatchDate] = useState<Date | null>(null);
   const [currentFilename, setCurrentFilename] = useState<string | null>(null);
   const [successMessage, setSuccessMessage] = useState<string | null>(null);
+  const [jobId, setJobId] = useState<string | null>(null);
+  const [jobProgress, setJobProgress] = useState<ProcessingJob | null>(null);
 
   const fetchStats = async () => {
     try {
@@ -63,19 +103,9 @@ const Admin: React.FC = () => {
 
   const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     if (event.target.files && event.target.files.length > 0) {
-      // Store first file
-      setFile(event.target.files[0]);
+      // Several reports can be processed together into one preview
+      setFiles(Array.from(event.target.files));
       setProcessedData(null);
-      
-      // Show warning if multiple files selected
-      if (event.target.files.length > 1) {
-        setError('Only one PDF file can be processed at a time. The first file has been selected.');
-        
-        // Clear error after 5 seconds
-        setTimeout(() => {
-          setError(null);
-        }, 5000);
-      }
     }
   };
 
@@ -85,7 +115,7 @@ const Admin: React.FC = () => {
     setProcessedData(null);
 
     // Validate required inputs
-    if (!file) {
+    if (files.length === 0) {
         setError('Please select a PDF file');
         return;
     }
@@ -98,9 +128,9 @@ const Admin: React.FC = () => {
     setLoading(true);
 
     try {
-        // Upload file
+        // Upload files
         const formData = new FormData();
-        formData.append('file', file);
+        files.forEach((f) => formData.append('files', f));
         
         const uploadResponse = await fetch(`${API_URL}/api/admin/upload`, {
             method: 'POST',
@@ -113,36 +143,43 @@ const Admin: React.FC = () => {
         }
         const uploadData = await uploadResponse.json();
 
-        // Process file
-        const processResponse = await fetch(`${API_URL}/api/admin/process`, {
+        // Process files; several files are parsed concurrently on the server
+        const multiple = uploadData.filenames.length > 1;
+        const processResponse = await fetch(`${API_URL}/api/admin/${multiple ? 'process-multiple' : 'process'}`, {
             method: 'POST',
             credentials: 'include',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 batch_date: batchDate.toISOString().split('T')[0],
-                filename: uploadData.filename
+                ...(multiple ? { filenames: uploadData.filenames } : { filename: uploadData.filename })
             })
         });
 
-        if (processResponse.status === 409) {
-            const data = await processResponse.json();
-            setError(`Batch ${data.batch_code} already exists in the database. Please choose a different file.`);
-            return;
-        }
-
         if (!processResponse.ok) {
             const errorData = await processResponse.json();
             throw new Error(errorData.error || 'Processing failed');
         }
 
-        const data = await processResponse.json();
-        setProcessedData(data.preview);
-        setCurrentFilename(uploadData.filename);
+        const { job_id, status_url } = await processResponse.json();
+        const job = await waitForJob(status_url, setJobProgress);
+
+        if (job.status === 'failed') {
+            if (job.error?.error === 'duplicate_batch') {
+                setError(`${job.error.message || `Batch ${job.error.batch_code} already exists in the database.`} Please choose a different file.`);
+                return;
+            }
+            throw new Error(job.error?.error || 'Processing failed');
+        }
+
+        setProcessedData(job.result?.preview ?? []);
+        setJobId(job_id);
+        setCurrentFilename(uploadData.filenames.join(', '));
 
     } catch (err) {
         setError(err instanceof Error ? err.message : 'Failed to process file');
     } finally {
         setLoading(false);
+        setJobProgress(null);
     }
   };
 
@@ -157,7 +194,8 @@ const Admin: React.FC = () => {
         credentials: 'include',
         headers: {
           'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({ job_id: jobId })
       });
 
       if (response.status === 409) {
@@ -176,9 +214,10 @@ const Admin: React.FC = () => {
       
       // Clear processed data after successful ingestion
       setProcessedData(null);
-      setFile(null);
+      setFiles([]);
       setBatchDate(null);
       setCurrentFilename(null);
+      setJobId(null);
       
     } catch (err) {
       setError('Failed to ingest data');
@@ -206,6 +245,7 @@ const Admin: React.FC = () => {
               <input
                 type="file"
                 accept=".pdf"
+                multiple
                 onChange={handleFileUpload}
                 style={{ display: 'none' }}
                 id="file-upload"
@@ -219,16 +259,16 @@ const Admin: React.FC = () => {
                   size="large"
                   sx={{ minWidth: 200 }}
                 >
-                  Select PDF File
+                  Select PDF Files
                 </Button>
               </label>
             </Box>
 
             {/* File Processing Section */}
-            {file && (
+            {files.length > 0 && (
               <Box sx={{ mb: 3 }}>
                 <Typography variant="body1" sx={{ mb: 2, fontWeight: 500 }}>
-                  Selected file: {file.name}
+                  Selected {files.length === 1 ? 'file' : 'files'}: {files.map((f) => f.name).join(', ')}
                 </Typography>
                 
                 <LocalizationProvider dateAdapter={AdapterDateFns}>
@@ -407,6 +447,11 @@ const Admin: React.FC = () => {
         {loading && (
           <Box sx={{ mb: 2 }}>
             <CircularProgress />
+            {jobProgress && (
+              <Typography variant="body2">
+                {jobProgress.message || jobProgress.stage} ({jobProgress.progress}%)
+              </Typography>
+            )}
           </Box>
         )}
 
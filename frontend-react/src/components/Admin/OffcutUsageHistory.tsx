@@ -39,22 +39,34 @@ const OffcutUsageHistory: React.FC = () => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [success, setSuccess] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchAvailableOffcuts();
   }, []);
 
-  const fetchAvailableOffcuts = async () => {
+  // Offcuts come a page at a time; a cursor continues after the last page loaded
+  const fetchAvailableOffcuts = async (cursor?: string) => {
     try {
-      const response = await fetch(`${API_URL}/api/admin/available-offcuts`);
+      const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_URL}/api/admin/available-offcuts${params}`);
       if (!response.ok) throw new Error('Failed to fetch offcuts');
       const data = await response.json();
-      setOffcuts(data);
+      setOffcuts(prev => cursor ? [...prev, ...data] : data);
+      setNextCursor(response.headers.get('X-Has-More') === 'true' ? response.headers.get('X-Next-Cursor') : null);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch offcuts');
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchAvailableOffcuts(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleToggleOffcut = (offcutId: number) => {
     setSelectedOffcuts(prev => 
       prev.includes(offcutId)
@@ -124,6 +136,13 @@ const OffcutUsageHistory: React.FC = () => {
 
       if (!response.ok) {
         const data = await response.json();
+        if (response.status === 409) {
+          // Someone else used these offcuts first; drop them and refresh the list
+          const unavailable: number[] = data.unavailable_offcut_ids || [];
+          setSelectedOffcuts(prev => prev.filter(id => !unavailable.includes(id)));
+          fetchAvailableOffcuts();
+          throw new Error(`${data.error}: ${unavailable.join(', ')}`);
+        }
         throw new Error(data.error || 'Failed to update offcut usage');
       }
 
@@ -208,6 +227,14 @@ const OffcutUsageHistory: React.FC = () => {
           </Table>
         </TableContainer>
 
+        {nextCursor && (
+          <Box sx={{ mt: 2, display: 'flex', justifyContent: 'center' }}>
+            <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? <CircularProgress size={24} /> : 'Load more offcuts'}
+            </Button>
+          </Box>
+        )}
+
         <Box sx={{ mt: 3 }}>
           <Button
             variant="contained"
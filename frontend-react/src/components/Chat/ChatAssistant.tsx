@@ -17,6 +17,13 @@ import userAvatar from '../../assets/user.png';  // Changed from '../assets/user
 import assistantAvatar from '../../assets/chatbot.png';  // Changed from '../assets/chatbot.png'
 import API_URL from '../../config/api';
 
+// One server-sent event from /api/chat/stream
+type ChatEvent =
+  | { type: 'status', text: string }
+  | { type: 'token', text: string }
+  | { type: 'done', answer: string }
+  | { type: 'error', error: string };
+
 
 const ChatAssistant: React.FC = () => {
   const [messages, setMessages] = useState<Array<{role: string, content: string}>>(() => {
@@ -31,6 +38,8 @@ const ChatAssistant: React.FC = () => {
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // What the agent is doing while the answer is being prepared
+  const [status, setStatus] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const scrollToBottom = () => {
@@ -39,7 +48,7 @@ const ChatAssistant: React.FC = () => {
 
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [messages, status]);
 
   const streamResponse = async (prompt: string) => {
     try {
@@ -61,28 +70,63 @@ const ChatAssistant: React.FC = () => {
       if (!reader) throw new Error('No response stream available');
 
       let accumulatedMessage = '';
-      
+      let buffered = '';
+      const decoder = new TextDecoder();
+
       setMessages(prev => [...prev, { role: 'assistant', content: '' }]);
 
+      const showMessage = (content: string) => {
+        setMessages(prev => [
+          ...prev.slice(0, -1),
+          { role: 'assistant', content }
+        ]);
+      };
+
+      const handleEvent = (event: ChatEvent) => {
+        switch (event.type) {
+          case 'status':
+            setStatus(event.text);
+            break;
+          case 'token':
+            setStatus(null);
+            accumulatedMessage += event.text;
+            showMessage(accumulatedMessage);
+            break;
+          case 'done':
+            // The complete answer replaces whatever was streamed
+            accumulatedMessage = event.answer;
+            showMessage(accumulatedMessage);
+            break;
+          case 'error':
+            throw new Error(event.error);
+        }
+      };
+
       // eslint-disable-next-line no-constant-condition
       while (true) {
         const { done, value } = await reader.read();
         if (done) break;
 
-        const text = new TextDecoder().decode(value);
-        accumulatedMessage += text;
-        
-        // Create a new constant to avoid the closure issue
-        const currentMessage = accumulatedMessage;
-        
-        setMessages(prev => [
-          ...prev.slice(0, -1),
-          { role: 'assistant', content: currentMessage }
-        ]);
+        buffered += decoder.decode(value, { stream: true });
+
+        // Frames end with a blank line; keep any partial frame for the next read
+        const frames = buffered.split('\n\n');
+        buffered = frames.pop() ?? '';
+        for (const frame of frames) {
+          // Lines starting with ':' are keep-alive comments
+          const data = frame
+            .split('\n')
+            .filter(line => line.startsWith('data:'))
+            .map(line => line.slice(5).trimStart())
+            .join('\n');
+          if (data) handleEvent(JSON.parse(data) as ChatEvent);
+        }
       }
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred');
       setMessages(prev => prev.slice(0, -1));
+    } finally {
+      setStatus(null);
     }
   };
 
@@ -245,6 +289,14 @@ const ChatAssistant: React.FC = () => {
             </Paper>
           </Box>
         ))}
+        {status && (
+          <Box sx={{ display: 'flex', alignItems: 'center', gap: 1, ml: 5, mb: 2 }}>
+            <CircularProgress size={16} />
+            <Typography variant="body2" color="text.secondary" sx={{ fontStyle: 'italic' }}>
+              {status}
+            </Typography>
+          </Box>
+        )}
         <div ref={messagesEndRef} />
       </Paper>
 
@@ -210,6 +210,16 @@ const Reports: React.FC = () => {
       } catch (err) {
         setError(err instanceof Error ? err.message : 'An error occurred while downloading');
       }
+    } else if (filename === 'batch_report') {
+      // The server streams the CSV for the whole range, however long
+      const start = dateRange.start?.toISOString().split('T')[0];
+      const end = dateRange.end?.toISOString().split('T')[0];
+      const link = document.createElement('a');
+      link.setAttribute('href', `${API_URL}/api/reports/batches?format=csv&start_date=${start}&end_date=${end}`);
+      link.setAttribute('download', `${filename}.csv`);
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
     } else {
       // Original download logic for other data types
       const csvContent = 
@@ -17,6 +17,9 @@ import API_URL from '../../config/api';
 
 type VizOption = "Top Materials" | "Top Offcuts" | "Monthly Material Usage" | "Material Efficiency";
 
+// Last figure received per query with its ETag, so an unchanged chart is a 304
+const figureCache = new Map<string, { etag: string; figure: any }>();
+
 const Visualizations: React.FC = () => {
   const [selectedViz, setSelectedViz] = useState<VizOption>('Top Materials');
   const [loading, setLoading] = useState(false);
@@ -52,20 +55,30 @@ const Visualizations: React.FC = () => {
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), TIMEOUT_MS);
 
+    const query = vizOptions[selectedViz];
+    const cached = figureCache.get(query);
+
     try {
       const response = await fetch(`${API_URL}/api/visualizations/generate`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Accept': 'application/json'
+          'Accept': 'application/json',
+          ...(cached ? { 'If-None-Match': cached.etag } : {})
         },
         credentials: 'include',
-        body: JSON.stringify({
-          query: vizOptions[selectedViz]
-        }),
+        body: JSON.stringify({ query }),
         signal: controller.signal
       });
 
+      if (response.status === 304 && cached) {
+        setPlotData(cached.figure);
+        return;
+      }
+      if (response.status === 503) {
+        const retryAfter = response.headers.get('Retry-After');
+        throw new Error(`Server is busy, please try again${retryAfter ? ` in ${retryAfter} seconds` : ' shortly'}`);
+      }
       if (!response.ok) throw new Error('Failed to fetch visualization data');
 
       const reader = response.body?.getReader();
@@ -83,6 +96,8 @@ const Visualizations: React.FC = () => {
         throw new Error('Invalid visualization data');
       }
 
+      const etag = response.headers.get('ETag');
+      if (etag) figureCache.set(query, { etag, figure: data.figure });
       setPlotData(data.figure);
     } catch (err) {
       console.error('Visualization error:', err);
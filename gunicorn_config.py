@@ -1,6 +1,9 @@
+import os
+
 bind = "0.0.0.0:10000"
-workers = 2
-threads = 2
+# Keep GUNICORN_THREADS in the environment too: the database pool is sized from it
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '2'))
 timeout = 120
 max_requests = 1000
 max_requests_jitter = 50